@@ -5,3 +5,5 @@ class ConsoleAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'console_app'
 
+    def ready(self):
+        from . import signals  # noqa: F401
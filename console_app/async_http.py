@@ -0,0 +1,54 @@
+"""
+异步出站 HTTP 客户端 - 供 async 视图访问上游接口
+
+每个事件循环一个共享的 httpx.AsyncClient（连接池不能跨事件循环使用）。
+ASGI（uvicorn）部署下整个 worker 进程只有一个事件循环，连接在请求间复用。
+WSGI 部署或同步视图中的 async_to_sync 每次调用都新建事件循环，共享客户端
+会随事件循环一起泄漏，这些路径通过 upstream_client() 使用用后即关的客户端。
+"""
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+
+import httpx
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def _new_client():
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(
+            settings.UPSTREAM_HTTP_READ_TIMEOUT,
+            connect=settings.UPSTREAM_HTTP_CONNECT_TIMEOUT,
+        ),
+        limits=httpx.Limits(
+            max_connections=settings.UPSTREAM_HTTP_POOL_SIZE,
+            max_keepalive_connections=settings.UPSTREAM_HTTP_POOL_SIZE,
+        ),
+        transport=httpx.AsyncHTTPTransport(retries=settings.UPSTREAM_HTTP_RETRIES),
+    )
+
+
+def get_async_client():
+    """当前事件循环共享的客户端，只应在 ASGI 服务的常驻事件循环中使用"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _new_client()
+        _clients[loop] = client
+    return client
+
+
+@asynccontextmanager
+async def upstream_client(request=None):
+    """
+    ASGI 请求中返回共享客户端；其他情况（WSGI、async_to_sync）返回
+    本次调用专用的客户端，退出时关闭连接。
+    """
+    if isinstance(request, ASGIRequest):
+        yield get_async_client()
+        return
+    async with _new_client() as client:
+        yield client
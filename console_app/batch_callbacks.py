@@ -0,0 +1,210 @@
+"""
+批量回调 - worker 按固定节奏汇总上报多个任务的状态 / 进度
+
+一次请求包含多类更新：
+    tts_orders          TTSOrder 的 state / status / output_file
+    seminars            Seminar 的 state / status
+    generation_orders   GenerationOrder 的 state / status
+在一个事务内按类型各做一次查询和一次 bulk_update，按提交顺序返回每条更新的处理结果
+（index 为该条在列表中的位置；同一 id 的多条更新合并应用，各条的结果相同）：
+    applied     已写入
+    skipped     无变化（重复、乱序或已是终态）
+    not_found   任务不存在（微课还未提交生成时同样视为不存在）
+    invalid     id 格式错误、包含不允许的字段或字段值无效（附 code=400 与 error）
+worker 只能上报生成过程中的状态：微课限于已提交生成（非 empty / draft）的行，
+也不能把状态改回 empty / draft。
+"""
+import uuid
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import TTSOrder, Seminar, GenerationOrder
+from .notify import push_tts_order, push_seminar
+from .tts_callbacks import compute_changes, validate_callback
+
+logger = logging.getLogger(__name__)
+
+APPLIED = 'applied'
+SKIPPED = 'skipped'
+NOT_FOUND = 'not_found'
+INVALID = 'invalid'
+
+TTS_ORDER_FIELDS = {'id', 'state', 'status', 'output_file'}
+STATE_STATUS_FIELDS = {'id', 'state', 'status'}
+
+# 用户编辑中的微课状态：worker 既不能修改处于这些状态的微课，也不能把状态改回去
+EDITING_STATES = ('empty', 'draft')
+
+
+def _invalid(raw_id, error):
+    return {'id': raw_id, 'result': INVALID, 'code': 400, 'error': error}
+
+
+def _validate_tts_order(item):
+    return validate_callback(item.get('state'), item.get('status'), item.get('output_file', ''))
+
+
+def _validate_state_status(item):
+    state = item.get('state')
+    if state is not None and (not isinstance(state, str) or len(state) > 50):
+        return "state 必须为不超过 50 个字符的字符串"
+    if state in EDITING_STATES:
+        return f"不允许回调为 {state} 状态"
+    if item.get('status') is not None and not isinstance(item['status'], dict):
+        return "status 必须为对象"
+    return None
+
+
+def _parse_updates(items, allowed_fields, validate):
+    """
+    解析并校验一类更新，返回 ({id: [update, ...]}, {id: [index, ...]}, 结果列表)。
+
+    结果列表与 items 一一对应，校验失败的位置已填入 invalid，其余位置为 None，
+    由 _fill_results 按 id 填入。
+    同一 id 的多条更新按提交顺序保留，依次应用；校验失败的条目不影响同一批次的其他条目。
+    """
+    by_id = {}
+    positions = {}
+    results = [None] * len(items)
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = _invalid(None, "更新必须为对象")
+            continue
+        raw_id = item.get('id')
+        try:
+            order_id = uuid.UUID(str(raw_id))
+        except (TypeError, ValueError):
+            results[index] = _invalid(raw_id, "id 格式错误")
+            continue
+        unknown = set(item) - allowed_fields
+        error = f"不允许的字段: {', '.join(sorted(unknown))}" if unknown else validate(item)
+        if error:
+            results[index] = _invalid(str(order_id), error)
+            continue
+        by_id.setdefault(order_id, []).append(item)
+        positions.setdefault(order_id, []).append(index)
+    return by_id, positions, results
+
+
+def _fill_results(results, positions, outcomes):
+    """把每个 id 的处理结果填回其各条更新的位置，并标上 index"""
+    for object_id, indexes in positions.items():
+        for index in indexes:
+            results[index] = dict(outcomes[object_id])
+    for index, result in enumerate(results):
+        result['index'] = index
+    return results
+
+
+def _progress_not_behind(new_status, current_status):
+    try:
+        return float(new_status.get('progress', 0) or 0) >= float((current_status or {}).get('progress', 0) or 0)
+    except (AttributeError, TypeError, ValueError):
+        return True
+
+
+def _apply_tts_orders(items):
+    by_id, positions, results = _parse_updates(items, TTS_ORDER_FIELDS, _validate_tts_order)
+    if not by_id:
+        return _fill_results(results, positions, {}), []
+    orders = TTSOrder.objects.select_for_update().only(
+        'id', 'owner_id', 'state', 'status', 'output_file', 'updated_at'
+    ).in_bulk(list(by_id))
+
+    changed, fields, outcomes = [], set(), {}
+    for order_id, updates in by_id.items():
+        order = orders.get(order_id)
+        if order is None:
+            outcomes[order_id] = {'id': str(order_id), 'result': NOT_FOUND}
+            continue
+        order_changes = {}
+        for update in updates:
+            current = {'state': order.state, 'status': order.status, 'output_file': order.output_file}
+            changes = compute_changes(current, update.get('state'), update.get('status'), update.get('output_file', ''))
+            for field, value in changes.items():
+                setattr(order, field, value)
+            order_changes.update(changes)
+        if order_changes:
+            changed.append(order)
+            fields.update(order_changes)
+        outcomes[order_id] = {'id': str(order_id), 'result': APPLIED if order_changes else SKIPPED, 'state': order.state}
+
+    if changed:
+        now = timezone.now()
+        for order in changed:
+            order.updated_at = now
+        TTSOrder.objects.bulk_update(changed, sorted(fields) + ['updated_at'])
+    return _fill_results(results, positions, outcomes), changed
+
+
+def _apply_state_status(model, items):
+    """Seminar / GenerationOrder：写入变化的 state / status，非状态切换时进度只增不减"""
+    by_id, positions, results = _parse_updates(items, STATE_STATUS_FIELDS, _validate_state_status)
+    if not by_id:
+        return _fill_results(results, positions, {}), []
+    queryset = model.objects.select_for_update()
+    if model is Seminar:
+        queryset = queryset.exclude(state__in=EDITING_STATES).only('id', 'owner_id', 'state', 'status')
+    else:
+        queryset = queryset.only('id', 'state', 'status')
+    objects = queryset.in_bulk(list(by_id))
+
+    changed, fields, outcomes = [], set(), {}
+    for object_id, updates in by_id.items():
+        obj = objects.get(object_id)
+        if obj is None:
+            outcomes[object_id] = {'id': str(object_id), 'result': NOT_FOUND}
+            continue
+        obj_fields = set()
+        for update in updates:
+            state = update.get('state')
+            status_data = update.get('status')
+            state_changed = bool(state) and state != obj.state
+            if state_changed:
+                obj.state = state
+                obj_fields.add('state')
+            if status_data and status_data != obj.status and (
+                state_changed or _progress_not_behind(status_data, obj.status)
+            ):
+                obj.status = status_data
+                obj_fields.add('status')
+        if obj_fields:
+            changed.append(obj)
+            fields.update(obj_fields)
+        outcomes[object_id] = {'id': str(object_id), 'result': APPLIED if obj_fields else SKIPPED, 'state': obj.state}
+
+    if changed:
+        model.objects.bulk_update(changed, sorted(fields))
+    return _fill_results(results, positions, outcomes), changed
+
+
+def apply_batch(tts_orders=(), seminars=(), generation_orders=()):
+    """
+    在一个事务中应用一批回调。
+
+    Returns:
+        {'tts_orders': [...], 'seminars': [...], 'generation_orders': [...]}，每个列表与提交的列表一一对应，每项为 {'index', 'id', 'result', 'state'}
+    """
+    with transaction.atomic():
+        tts_results, changed_orders = _apply_tts_orders(tts_orders)
+        seminar_results, changed_seminars = _apply_state_status(Seminar, seminars)
+        generation_results, _ = _apply_state_status(GenerationOrder, generation_orders)
+
+        def push():
+            for order in changed_orders:
+                push_tts_order(order)
+            for seminar in changed_seminars:
+                push_seminar(seminar)
+
+        transaction.on_commit(push)
+
+    logger.info(
+        f"Applied callback batch: {len(changed_orders)} tts orders, {len(changed_seminars)} seminars updated"
+    )
+    return {
+        'tts_orders': tts_results,
+        'seminars': seminar_results,
+        'generation_orders': generation_results,
+    }
@@ -0,0 +1,146 @@
+"""
+资源目录缓存 - 声音 / 头像 / 讲师列表
+
+系统资源（type='system'）全局缓存一份，用户自己的资源按用户缓存，
+请求时合并。缓存键带版本号：
+    - 本进程写入时由 post_save / post_delete 信号更新版本号，立即失效
+    - geminar-admin 直接写库不会触发信号，版本号按 CATALOG_CACHE_TTL 过期，
+      过期后生成新版本重新查询，因此外部修改最迟 TTL 秒后可见
+版本号的失效只对使用同一缓存的进程可见：多 worker 部署时缓存必须是共享的
+（如 Redis），CATALOG_CACHE_ALIAS 指向进程内缓存时目录缓存停用，每次直接查询。
+"""
+import uuid
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def cache_enabled():
+    """进程内缓存只在单 worker 部署时可用，否则其他 worker 收不到失效"""
+    cache = _cache()
+    if isinstance(cache, DummyCache):
+        return False
+    return settings.WEB_CONCURRENCY <= 1 or not isinstance(cache, LocMemCache)
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def catalog_cache_stats():
+    """本进程的缓存命中统计"""
+    with _stats_lock:
+        stats = dict(_stats)
+    total = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / total, 4) if total else None
+    stats['enabled'] = cache_enabled()
+    return stats
+
+
+def _version_key(catalog, user_id=None):
+    if user_id is None:
+        return f"catalog:{catalog}:system:version"
+    return f"catalog:{catalog}:user:{user_id}:version"
+
+
+def _get_version(catalog, user_id=None):
+    key = _version_key(catalog, user_id)
+    cache = _cache()
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex[:12]
+        if not cache.add(key, version, settings.CATALOG_CACHE_TTL):
+            version = cache.get(key) or version
+    return version
+
+
+def bump_version(catalog, user_id=None):
+    """使系统（user_id 为 None）或某个用户的目录缓存失效"""
+    _cache().delete(_version_key(catalog, user_id))
+
+
+def _get_or_build(key, build):
+    cache = _cache()
+    data = cache.get(key)
+    if data is not None:
+        _count('hits')
+        return data, True
+    _count('misses')
+    data = build()
+    cache.set(key, data, settings.CATALOG_CACHE_TTL)
+    return data, False
+
+
+def get_catalog(catalog, user_id, build_system, build_user=None, variant=''):
+    """
+    获取合并后的目录列表。
+
+    Args:
+        catalog: 目录名（voice / avatar / speaker）
+        user_id: 当前用户 id
+        build_system: 生成系统资源序列化列表的函数
+        build_user: 生成用户资源序列化列表的函数，None 表示无用户资源
+        variant: 同一目录的不同表示（如展开了外键），分别缓存
+
+    Returns:
+        (data, hit)
+    """
+    if not cache_enabled():
+        _count('misses')
+        data = build_system()
+        if build_user is not None:
+            data = data + build_user()
+        return data, False
+    system_version = _get_version(catalog)
+    data, hit = _get_or_build(f"catalog:{catalog}:system:{system_version}:{variant}", build_system)
+    if build_user is not None:
+        user_version = _get_version(catalog, user_id)
+        user_data, user_hit = _get_or_build(f"catalog:{catalog}:user:{user_id}:{user_version}:{variant}", build_user)
+        data = data + user_data
+        hit = hit and user_hit
+    return data, hit
+
+
+def get_etag(catalog, user_id=None, *extra):
+    """
+    不构建数据，仅根据当前版本号计算 ETag，用于提前处理条件请求。
+
+    extra 用于区分同一目录的不同视图（如分页参数）。
+    目录缓存停用时返回 None。
+    """
+    if not cache_enabled():
+        return None
+    versions = [_get_version(catalog)]
+    if user_id is not None:
+        versions.append(_get_version(catalog, user_id))
+    return make_etag(catalog, *versions, *extra)
+
+
+def dependency_stamp(catalogs, user_id=None):
+    """
+    依赖目录的当前版本，拼入 variant 后，依赖目录变化时（如展开的头像被修改）缓存自动失效
+    """
+    if not cache_enabled():
+        return ''
+    parts = []
+    for catalog in catalogs:
+        parts.append(_get_version(catalog))
+        if user_id is not None:
+            parts.append(_get_version(catalog, user_id))
+    return '.'.join(parts)
+
+
+def make_etag(*parts):
+    return '"%s"' % hashlib.md5(':'.join(str(p) for p in parts).encode()).hexdigest()
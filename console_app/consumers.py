@@ -0,0 +1,37 @@
+"""
+WebSocket 推送 - TTS 任务和微课进度
+"""
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+
+def user_group_name(user_id):
+    return f"user-{user_id}"
+
+
+class ProgressConsumer(AsyncJsonWebsocketConsumer):
+    """
+    每个登录用户一个连接，接收自己的 TTS 任务和微课状态变化。
+
+    推送消息格式：{"type": "tts_order" | "seminar", "data": {...}}
+    """
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+        self.group_name = user_group_name(user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        # 仅支持心跳
+        if content.get('type') == 'ping':
+            await self.send_json({'type': 'pong'})
+
+    async def progress_update(self, event):
+        await self.send_json({'type': event['kind'], 'data': event['data']})
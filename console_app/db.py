@@ -0,0 +1,124 @@
+"""
+数据库连接调优 - 共享 SQLite 部署
+
+db.sqlite3 与 geminar-admin 共享，默认的 rollback journal 模式下写操作会
+锁住整个库，并发写时容易出现 "database is locked"。
+连接建立时设置 busy_timeout 等 pragma（见 SQLITE_PRAGMAS），写路径再用
+retry_on_locked 在短暂锁冲突时重试。
+WAL 需通过 DB_SQLITE_JOURNAL_MODE 显式开启：WAL 依赖与数据库同目录的 -wal / -shm 文件，
+所有访问该库的容器必须挂载整个目录（而不是单个 db.sqlite3 文件）且位于同一主机。
+
+配置了副本库（DB_REPLICA_*）时，ReplicaRouter 将只读视图的查询路由到副本。
+"""
+import time
+import random
+import contextlib
+import contextvars
+import logging
+import functools
+
+from django.conf import settings
+from django.db import OperationalError, connections, router, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def configure_sqlite(connection):
+    """对新建的 SQLite 连接应用 SQLITE_PRAGMAS"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def _is_locked(error):
+    message = str(error).lower()
+    return 'database is locked' in message or 'database table is locked' in message
+
+
+def retry_on_locked(func=None, *, attempts=None, backoff=None, model=None):
+    """
+    写操作遇到 SQLite 锁冲突时重试。
+
+    每次尝试都在一个事务中执行，锁冲突时整体回滚后重来，不会留下前一次尝试的部分写入；
+    推送等副作用应通过 transaction.on_commit 在提交后执行（见 notify）。
+    已在外层事务中时无法局部重试，只执行一次。
+
+    Args:
+        attempts: 最多尝试次数，默认 DB_LOCKED_RETRIES
+        backoff: 首次重试等待秒数，之后指数增长并加随机抖动
+        model: 用于确定写入的数据库连接，默认 default
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            max_attempts = attempts or settings.DB_LOCKED_RETRIES
+            delay = backoff or settings.DB_LOCKED_RETRY_BACKOFF
+            alias = router.db_for_write(model) if model is not None else 'default'
+            if connections[alias].in_atomic_block:
+                return func(*args, **kwargs)
+            for attempt in range(1, max_attempts + 1):
+                try:
+                    with transaction.atomic(using=alias):
+                        return func(*args, **kwargs)
+                except OperationalError as e:
+                    if not _is_locked(e) or attempt == max_attempts:
+                        raise
+                    wait = delay * (2 ** (attempt - 1)) * (1 + random.random())
+                    logger.warning(f"{func.__qualname__}: database is locked, retry {attempt}/{max_attempts} in {wait:.2f}s")
+                    time.sleep(wait)
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+# 当前请求是否允许读副本，由 ReplicaRoutingMiddleware 设置
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+
+
+class ReplicaRouter:
+    """
+    读写分离：标记为 read_replica 的只读视图读副本，其余读写都走主库。
+    """
+    replica_alias = 'replica'
+    # 登录状态相关的表始终读主库，避免登录后副本未同步导致会话丢失
+    primary_only_apps = ('sessions', 'auth', 'contenttypes')
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and model._meta.app_label not in self.primary_only_apps:
+            return self.replica_alias
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 副本与主库数据相同
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def set_replica(enabled):
+    """
+    设置当前上下文是否读副本，返回之前的值，由调用方在请求结束时传回恢复。
+
+    不使用 ContextVar.reset 的 token：ASGI 下中间件的各个钩子在不同的
+    sync_to_async 上下文中执行，token 不能跨上下文使用。
+    """
+    previous = _use_replica.get()
+    _use_replica.set(enabled)
+    return previous
+
+
+@contextlib.contextmanager
+def use_replica(enabled=True):
+    token = _use_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
@@ -0,0 +1,76 @@
+"""
+出站 HTTP 客户端 - 同步代码（服务 token、人脸比对）访问上游接口时共用
+
+每个上游 host 一个 keep-alive 连接池，进程内复用，避免每次请求都重新
+进行 TCP + TLS 握手。requests.Session 和 OAuth2Session 都可以通过
+pooled() 接入同一组连接池。async 视图使用 async_http 中的 httpx 客户端。
+"""
+import threading
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+
+
+class PooledAdapter(HTTPAdapter):
+    """带默认超时的连接池 adapter"""
+
+    def __init__(self, host, timeout, **kwargs):
+        self.host = host
+        self.default_timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.default_timeout
+        return super().send(request, **kwargs)
+
+
+_adapters = {}
+_adapters_lock = threading.Lock()
+
+
+def _retry():
+    # 只对幂等请求重试，token / 人脸比对等 POST 请求不自动重发
+    return Retry(
+        total=settings.UPSTREAM_HTTP_RETRIES,
+        connect=settings.UPSTREAM_HTTP_RETRIES,
+        backoff_factor=0.2,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        raise_on_status=False,
+    )
+
+
+def get_adapter(url):
+    """获取 url 所在 host 的共享连接池"""
+    parts = urlsplit(url)
+    host = f"{parts.scheme}://{parts.netloc}".lower()
+    adapter = _adapters.get(host)
+    if adapter is None:
+        with _adapters_lock:
+            adapter = _adapters.get(host)
+            if adapter is None:
+                adapter = PooledAdapter(
+                    host,
+                    timeout=(settings.UPSTREAM_HTTP_CONNECT_TIMEOUT, settings.UPSTREAM_HTTP_READ_TIMEOUT),
+                    pool_connections=1,
+                    pool_maxsize=settings.UPSTREAM_HTTP_POOL_SIZE,
+                    max_retries=_retry(),
+                )
+                _adapters[host] = adapter
+    return adapter
+
+
+def pooled(session):
+    """让 session（requests.Session / OAuth2Session）使用共享连接池"""
+    session.get_adapter = get_adapter
+    return session
+
+
+def oauth2_session(*args, **kwargs):
+    """创建使用共享连接池的 OAuth2Session"""
+    from requests_oauthlib import OAuth2Session
+    return pooled(OAuth2Session(*args, **kwargs))
+
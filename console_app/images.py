@@ -0,0 +1,124 @@
+"""
+图片处理 - 讲师照片上传
+
+上传文件由 TemporaryFileUploadHandler 落盘，不整体读入内存；
+Pillow 按 SPEAKER_PORTRAIT_MAX_SIDE 缩小、按 EXIF 转正并统一转为 JPEG，
+处理结果写入临时文件，人脸比对与 Avatar.portrait 保存共用这一份文件。
+人脸比对请求体由 Base64JSONBody 边读文件边编码，不在内存中拼接 base64 字符串。
+"""
+import os
+import json
+import base64
+import tempfile
+
+from django.core.files import File
+from PIL import Image, ImageOps
+
+# 3 的倍数，保证分块 base64 编码结果可以直接拼接
+_B64_CHUNK = 3 * 64 * 1024
+
+
+class InvalidImage(Exception):
+    pass
+
+
+def normalize_image(source, max_side, quality=90):
+    """
+    缩小并规范化图片。
+
+    Args:
+        source: 文件路径或文件对象
+        max_side: 长边最大像素
+
+    Returns:
+        临时文件对象（JPEG，调用方负责关闭，关闭后自动删除）
+
+    Raises:
+        InvalidImage
+    """
+    try:
+        with Image.open(source) as image:
+            # JPEG 解码时直接按 1/2、1/4、1/8 缩小，大图不需要完整解码
+            image.draft('RGB', (max_side, max_side))
+            # 原地转正，不额外复制一份解码后的图片
+            ImageOps.exif_transpose(image, in_place=True)
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            image.thumbnail((max_side, max_side), Image.LANCZOS)
+            output = tempfile.NamedTemporaryFile(suffix='.jpg')
+            image.save(output, format='JPEG', quality=quality, optimize=True)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise InvalidImage(str(e))
+    output.seek(0)
+    return output
+
+
+def processed_file(output, original_name):
+    """将处理后的临时文件包装为 Django File，用于 FileField 保存"""
+    stem = os.path.splitext(os.path.basename(original_name or 'portrait'))[0] or 'portrait'
+    output.seek(0)
+    return File(output, name=f'{stem}.jpg')
+
+
+def _file_size(fileobj):
+    position = fileobj.tell()
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(position)
+    return size
+
+
+def _b64_length(size):
+    return (size + 2) // 3 * 4
+
+
+class Base64JSONBody:
+    """
+    以流的方式生成 {"key": "<base64>", ...} 请求体。
+
+    实现 read() 和 __len__()，requests 据此设置 Content-Length 并分块发送，
+    不会使用 chunked 编码。
+    """
+
+    def __init__(self, files):
+        """files: [(key, 文件对象)]，文件对象需支持 seek"""
+        self._files = files
+        # {} + 每项 "key": "<base64>" + 项之间的 ", "
+        self._length = 2 + sum(len(json.dumps(key)) + 4 + _b64_length(_file_size(f)) for key, f in files)
+        self._length += 2 * max(len(files) - 1, 0)
+        self._parts = self._generate()
+        self._chunk = b''
+        self._offset = 0
+
+    def __len__(self):
+        return self._length
+
+    def _generate(self):
+        yield b'{'
+        for index, (key, fileobj) in enumerate(self._files):
+            if index:
+                yield b', '
+            yield json.dumps(key).encode() + b': "'
+            fileobj.seek(0)
+            while True:
+                chunk = fileobj.read(_B64_CHUNK)
+                if not chunk:
+                    break
+                yield base64.b64encode(chunk)
+            yield b'"'
+        yield b'}'
+
+    def read(self, size=-1):
+        parts = []
+        while size != 0:
+            if self._offset >= len(self._chunk):
+                try:
+                    self._chunk, self._offset = next(self._parts), 0
+                except StopIteration:
+                    break
+            end = len(self._chunk) if size < 0 else min(len(self._chunk), self._offset + size)
+            parts.append(self._chunk[self._offset:end])
+            if size > 0:
+                size -= end - self._offset
+            self._offset = end
+        return b''.join(parts)
@@ -0,0 +1,54 @@
+"""
+创建 console 自己管理的表（managed = True）
+
+共享表由 geminar-admin 创建，本项目不运行 migrate；
+console 自有的表（TTS 任务、outbox 消息）以及微课搜索索引由本命令创建，--sql 同样输出两者的 DDL。
+已存在的表跳过，可重复执行，部署时在服务启动前运行一次。
+
+用法：
+    python manage.py create_console_tables
+    python manage.py create_console_tables --sql    # 只输出 DDL，不执行
+"""
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from console_app import search
+
+
+def console_models():
+    """console 管理的模型"""
+    return [model for model in apps.get_app_config('console_app').get_models() if model._meta.managed]
+
+
+class Command(BaseCommand):
+    help = '创建 console 管理的表（TTS 任务、outbox 消息、搜索索引）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--sql', action='store_true', help='只输出 DDL，不执行')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        existing = set(connection.introspection.table_names())
+        missing = [model for model in console_models() if model._meta.db_table not in existing]
+
+        if options['sql']:
+            if missing:
+                with connection.schema_editor(collect_sql=True) as editor:
+                    for model in missing:
+                        editor.create_model(model)
+                for statement in editor.collected_sql:
+                    self.stdout.write(statement)
+            # 搜索索引表不是模型，DDL 单独输出（IF NOT EXISTS，已存在时执行无影响）
+            for statement in search.index_ddl(connection):
+                self.stdout.write(f"{statement};")
+            return
+
+        if missing:
+            with connection.schema_editor() as editor:
+                for model in missing:
+                    editor.create_model(model)
+                    self.stdout.write(f"Created {model._meta.db_table}")
+        search.ensure_index(connection)
+        self.stdout.write(f"{len(missing)} tables created, {len(console_models()) - len(missing)} already exist")
@@ -0,0 +1,72 @@
+"""
+批量生成缩略图（头像 portrait 与讲师封面 covers），用于补齐历史数据
+
+用法：
+    python manage.py generate_thumbnails                # 只生成缺失的
+    python manage.py generate_thumbnails --force        # 全部重新生成
+    python manage.py generate_thumbnails --workers 8
+"""
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from console_app import thumbnails
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker():
+    # spawn 方式启动的子进程需要重新初始化 Django；子进程只读写文件，不访问数据库
+    if not apps.ready:
+        django.setup()
+
+
+def _generate(name, force, record):
+    return thumbnails.generate_thumbnails(name, force=force, record=record)
+
+
+class Command(BaseCommand):
+    help = '批量生成头像与讲师封面的缩略图'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='并行进程数')
+        parser.add_argument('--force', action='store_true', help='重新生成已存在的缩略图')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        # 进程内缓存中的状态记录到不了 web 进程：不写入，web 进程首次序列化时检查文件
+        record = thumbnails.state_shared()
+        if not record:
+            self.stdout.write(self.style.WARNING(
+                "Cache is not shared (CACHE_REDIS_URL not set): thumbnail states are not recorded, "
+                "web workers check the files once per process"
+            ))
+        names = sorted(set(thumbnails.original_names()))
+        # 子进程不应继承父进程的数据库连接
+        connections.close_all()
+
+        generated = missing = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as executor:
+            futures = {executor.submit(_generate, name, options['force'], record): name for name in names}
+            for future in as_completed(futures):
+                try:
+                    generated += future.result()
+                except FileNotFoundError:
+                    # 共享缓存中已记录为原图缺失，序列化时直接返回原图 URL，不再重试
+                    missing += 1
+                    logger.warning(f"Source image missing: {futures[future]}")
+                except Exception as e:
+                    failed += 1
+                    logger.warning(f"Failed to generate thumbnails for {futures[future]}: {e}")
+
+        self.stdout.write(
+            f"Processed {len(names)} images: {generated} thumbnails generated, "
+            f"{missing} missing sources, {failed} failed "
+            f"in {time.monotonic() - started:.1f}s"
+        )
@@ -0,0 +1,103 @@
+"""
+清理内容寻址存储中不再被引用的文件
+
+引用来自数据库中的 Avatar.portrait 与 Voice.sample（包括 geminar-admin 写入的记录），
+文件的缩略图随原文件一起保留或删除。
+新上传的文件在记录提交前也是"未引用"状态，只清理修改时间早于 --grace 秒的文件
+（上传内容与已有文件相同时会更新该文件的修改时间）。
+先遍历目录找出过了 grace 的文件，遍历结束后再读取引用，删除前重新检查修改时间，
+遍历期间提交的记录和重新上传的文件都不会被删除。
+
+用法：
+    python manage.py prune_media --dry-run
+    python manage.py prune_media --grace 86400
+"""
+import os
+import time
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from console_app.models import Avatar, Voice
+from console_app.storage import content_prefix, is_content_addressed
+from console_app.thumbnails import original_of
+
+logger = logging.getLogger(__name__)
+
+
+def referenced_names():
+    names = set()
+    for name in Avatar.objects.values_list('portrait', flat=True).iterator():
+        if is_content_addressed(name):
+            names.add(name)
+    for name in Voice.objects.values_list('sample', flat=True).iterator():
+        if is_content_addressed(name):
+            names.add(name)
+    return names
+
+
+def _modified_after(name, cutoff):
+    try:
+        return os.stat(os.path.join(settings.MEDIA_ROOT, name)).st_mtime > cutoff
+    except FileNotFoundError:
+        return False
+
+
+class Command(BaseCommand):
+    help = '清理内容寻址存储中不再被引用的文件'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=float, default=86400, help='只清理修改时间早于此秒数的文件')
+        parser.add_argument('--dry-run', action='store_true', help='只列出，不删除')
+
+    def handle(self, *args, **options):
+        root = os.path.join(settings.MEDIA_ROOT, content_prefix())
+        if not os.path.isdir(root):
+            self.stdout.write("Nothing to prune")
+            return
+
+        cutoff = time.time() - options['grace']
+        candidates = []
+        kept = 0
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                try:
+                    mtime = os.stat(path).st_mtime
+                except FileNotFoundError:
+                    continue
+                if mtime > cutoff:
+                    kept += 1
+                    continue
+                candidates.append((path, filename))
+
+        # 引用在遍历之后读取，遍历期间提交的记录也会被计入
+        referenced = referenced_names()
+        removed = freed = 0
+        for path, filename in candidates:
+            name = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, '/')
+            # 中断的上传留下的临时文件同样按 grace 清理
+            if not filename.startswith('.upload-') and original_of(name) in referenced:
+                kept += 1
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            # 缩略图跟随原图：原图刚被重新上传时一起保留
+            if stat.st_mtime > cutoff or _modified_after(original_of(name), cutoff):
+                kept += 1
+                continue
+            if options['dry_run']:
+                self.stdout.write(f"Would remove {name}")
+            else:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    continue
+            removed += 1
+            freed += stat.st_size
+
+        action = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(f"{action} {removed} files ({freed / 1024 / 1024:.1f} MB), kept {kept}")
@@ -0,0 +1,43 @@
+"""
+对账微课搜索索引（同步 geminar-admin 直接写入的数据）
+
+按批比较微课表与索引，只写入有变化的行，每批一个短事务。
+
+用法：
+    python manage.py reindex_seminars               # 对账一次
+    python manage.py reindex_seminars --every 600   # 每 600 秒对账一次
+"""
+import time
+import logging
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from console_app import search
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = '对账微课搜索索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, default=0, help='常驻运行，每隔指定秒数对账一次')
+        parser.add_argument('--batch-size', type=int, default=500, help='每个写事务处理的行数')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            started = time.monotonic()
+            try:
+                stats = search.rebuild_index(options['batch_size'])
+                self.stdout.write(
+                    f"Checked {stats['checked']} seminars, updated {stats['updated']}, removed {stats['removed']} "
+                    f"in {time.monotonic() - started:.1f}s"
+                )
+            except Exception as e:
+                logger.error(f"Failed to reconcile seminar search index: {e}", exc_info=True)
+                if not options['every']:
+                    raise
+            if not options['every']:
+                break
+            time.sleep(options['every'])
@@ -0,0 +1,49 @@
+"""
+将 outbox 中待发送的任务持续发送到 Celery
+
+用法：
+    python manage.py relay_outbox           # 常驻运行
+    python manage.py relay_outbox --once    # 发送完当前积压后退出
+"""
+import time
+import logging
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from console_app import outbox
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = '将 outbox 中待发送的任务发送到 Celery'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='发送完当前积压后退出')
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_RELAY_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=settings.OUTBOX_RELAY_INTERVAL,
+                            help='无待发送消息时的轮询间隔（秒）')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        interval = options['interval']
+        last_purge = 0
+        while True:
+            close_old_connections()
+            try:
+                count = outbox.relay_pending(batch_size)
+            except Exception as e:
+                logger.error(f"Outbox relay failed: {e}", exc_info=True)
+                count = 0
+
+            if options['once'] and count < batch_size:
+                break
+
+            if time.time() - last_purge > 3600:
+                outbox.purge_sent(settings.OUTBOX_RETENTION_SECONDS)
+                last_purge = time.time()
+
+            # 满批说明还有积压，立即继续
+            if count < batch_size:
+                time.sleep(interval)
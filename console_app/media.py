@@ -0,0 +1,175 @@
+"""
+媒体文件访问 - 带权限检查的下载
+
+权限检查在 Django 中完成，文件传输交给 nginx：
+    MEDIA_ACCEL_REDIRECT_PREFIX 非空时返回 X-Accel-Redirect，由 nginx 的 internal location 发送文件，
+    否则由 FileResponse 发送（WSGI 下使用 wsgi.file_wrapper / sendfile），
+    并支持单个 Range 请求，音频可以拖动播放。
+"""
+import os
+import re
+import mimetypes
+import posixpath
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import content_disposition_header, http_date
+
+from .models import Avatar, Speaker, Voice, ResourceType
+from .storage import is_content_addressed, immutable_cache_control
+from .thumbnails import original_of
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+_CHUNK_SIZE = 64 * 1024
+
+
+def media_path(name):
+    """存储路径 -> 绝对路径，越出 MEDIA_ROOT 时返回 None"""
+    if not name:
+        return None
+    try:
+        return safe_join(settings.MEDIA_ROOT, name)
+    except ValueError:
+        return None
+
+
+def is_safe_name(name):
+    """
+    存储路径是否规范：相对路径、不含 .. 与多余的 / 或 .，规范化后不变。
+
+    权限按路径前缀判断，avatars/<me>/../<other>/x.jpg 这类路径必须在判断前拒绝。
+    """
+    if not name or '\\' in name or '\0' in name or posixpath.isabs(name):
+        return False
+    if '..' in name.split('/'):
+        return False
+    return posixpath.normpath(name) == name
+
+
+def _visible(queryset, user):
+    return queryset.filter(Q(type=ResourceType.SYSTEM) | Q(owner=user)).exists()
+
+
+def can_access(user, name):
+    """
+    用户是否可以访问媒体文件（缩略图跟随原图的权限）：
+        avatars/<username>/  本人
+        头像 portrait        头像为系统资源或属于本人
+        讲师封面 covers       讲师为系统资源或属于本人
+        音色样本 sample       所有登录用户（音色均为系统资源）
+    不规范的路径（见 is_safe_name）一律拒绝。
+    """
+    if not is_safe_name(name):
+        return False
+    if user.is_staff:
+        return True
+    name = original_of(name)
+    parts = name.split('/')
+    if len(parts) > 2 and parts[0] == 'avatars' and parts[1] == user.username:
+        return True
+    if _visible(Avatar.objects.filter(portrait=name), user):
+        return True
+    if (name.startswith('voices/') or is_content_addressed(name)) and Voice.objects.filter(sample=name).exists():
+        return True
+    covers = Q()
+    for value in (name, f"{settings.MEDIA_URL}{name}"):
+        covers |= Q(covers___16x9=value) | Q(covers___4x3=value)
+    return _visible(Speaker.objects.filter(covers), user)
+
+
+def _cache_control(name):
+    if is_content_addressed(original_of(name)):
+        # 内容寻址的文件不会改变；需要登录访问，只允许浏览器缓存
+        return immutable_cache_control().replace('public', 'private')
+    return 'private, no-cache'
+
+
+def _parse_range(header, size):
+    """
+    解析单个 Range，返回 (start, end)（含 end）；不支持的格式（如多个区间）返回 None，按完整文件发送。
+
+    Raises:
+        ValueError: 区间无法满足
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        length = int(end)
+        if length == 0 or size == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def output_name(value):
+    """TTS 任务的 output_file（存储路径、MEDIA_URL 下的 URL 或 MEDIA_ROOT 下的绝对路径）-> 存储路径"""
+    if not value:
+        return None
+    if value.startswith(settings.MEDIA_URL):
+        return value[len(settings.MEDIA_URL):]
+    if os.path.isabs(value):
+        root = os.path.abspath(settings.MEDIA_ROOT)
+        path = os.path.abspath(value)
+        if os.path.commonpath([root, path]) != root:
+            return None
+        return os.path.relpath(path, root).replace(os.sep, '/')
+    return value
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_file(request, name, filename=None):
+    """
+    发送 MEDIA_ROOT 下的文件，调用方负责权限检查。
+    """
+    path = media_path(name)
+    if path is None or not os.path.isfile(path):
+        return HttpResponse(status=404)
+
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    headers = {'Cache-Control': _cache_control(name)}
+    if filename:
+        headers['Content-Disposition'] = content_disposition_header(False, filename)
+
+    if settings.MEDIA_ACCEL_REDIRECT_PREFIX:
+        # nginx 根据 X-Accel-Redirect 发送文件（包括 Range 请求），Python 进程不读取文件内容
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response['X-Accel-Redirect'] = quote(f"{settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{name}")
+        return response
+
+    stat = os.stat(path)
+    headers['Accept-Ranges'] = 'bytes'
+    headers['Last-Modified'] = http_date(stat.st_mtime)
+    try:
+        byte_range = _parse_range(request.headers.get('Range', ''), stat.st_size)
+    except ValueError:
+        return HttpResponse(status=416, headers={'Content-Range': f"bytes */{stat.st_size}"})
+    if byte_range is not None:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read_range(path, start, end - start + 1), status=206, content_type=content_type, headers=headers
+        )
+        response['Content-Range'] = f"bytes {start}-{end}/{stat.st_size}"
+        response['Content-Length'] = str(end - start + 1)
+        return response
+
+    headers.pop('Content-Disposition', None)
+    return FileResponse(open(path, 'rb'), content_type=content_type, headers=headers, filename=filename or '')
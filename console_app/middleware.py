@@ -0,0 +1,97 @@
+"""
+中间件
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+from .db import set_replica
+from .user_cache import get_user_cache
+
+# 写操作后一段时间内该客户端的读请求仍走主库（read-your-writes）
+PRIMARY_STICKY_COOKIE = 'db_primary_until'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """
+    只读视图（视图类设置 read_replica = True）的 GET 请求读副本库。
+
+    同一客户端发生写请求后，DB_REPLICA_STICKY_SECONDS 秒内的读请求仍读主库，
+    避免副本复制延迟导致刚写入的数据读不到。
+    process_view 只设置路由标记、不调用视图，视图仍由 Django 按完整的中间件链调用
+    （其他中间件的 process_view / process_exception / 模板响应照常执行）；
+    视图异常由内层转换为响应，process_response 总会执行并恢复标记。
+    同时支持同步与异步请求（MiddlewareMixin），ASGI 下不会把整个中间件链切换为同步。
+    """
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in SAFE_METHODS:
+            return None
+        view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        if not getattr(view_class, 'read_replica', False):
+            return None
+        try:
+            primary_until = int(request.COOKIES.get(PRIMARY_STICKY_COOKIE, 0))
+        except ValueError:
+            primary_until = 0
+        if primary_until > time.time():
+            return None
+        request._replica_previous = set_replica(True)
+        return None
+
+    def process_response(self, request, response):
+        if hasattr(request, '_replica_previous'):
+            set_replica(request._replica_previous)
+            del request._replica_previous
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            until = int(time.time() + settings.DB_REPLICA_STICKY_SECONDS)
+            response.set_cookie(
+                PRIMARY_STICKY_COOKIE, str(until),
+                max_age=settings.DB_REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
+
+
+def _load_user(request):
+    session_key = request.session.session_key
+    user_id = request.session.get(auth.SESSION_KEY)
+    if not session_key or user_id is None:
+        return auth.get_user(request)
+    session_hash = request.session.get(auth.HASH_SESSION_KEY)
+    cache = get_user_cache()
+    user = cache.get(session_key, str(user_id), session_hash)
+    if user is None:
+        user = auth.get_user(request)
+        if user.is_authenticated:
+            cache.set(session_key, str(user_id), session_hash, user)
+    return user
+
+
+def _get_user(request):
+    # 与 AuthenticationMiddleware 使用相同的属性，login / logout 对 request.user 的修改照常生效
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = _load_user(request)
+    return request._cached_user
+
+
+async def _aget_user(request):
+    return await sync_to_async(_get_user)(request)
+
+
+class CachedUserMiddleware(MiddlewareMixin):
+    """
+    替换 AuthenticationMiddleware 设置的 request.user / request.auser，
+    登录用户按会话缓存 USER_CACHE_TTL 秒（见 user_cache），避免每个请求查询 auth_user。
+    需放在 AuthenticationMiddleware 之后。
+    与 AuthenticationMiddleware 一样同时支持同步与异步请求（MiddlewareMixin）。
+    """
+
+    def process_request(self, request):
+        request.user = SimpleLazyObject(lambda: _get_user(request))
+        request.auser = lambda: _aget_user(request)
@@ -6,9 +6,11 @@ managed = False，不负责创建/修改数据库表
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils.translation import gettext_lazy as _
+from django.utils import timezone
+
+from .storage import content_storage
 
 import os
-import hashlib
 import uuid
 
 
@@ -22,7 +24,7 @@ class Voice(models.Model):
     title = models.CharField(max_length=100)
     code = models.CharField(max_length=100, default=uuid.uuid4)
     description = models.TextField()
-    sample = models.FileField(upload_to='voices/')
+    sample = models.FileField(upload_to='voices/', storage=content_storage)
 
     class Meta:
         managed = False
@@ -41,15 +43,15 @@ def _default_covers():
 
 
 def _avatar_upload_path(instance, filename):
-    ext = os.path.splitext(filename)[1]
-    md5_name = hashlib.md5(filename.encode()).hexdigest()
-    return os.path.join('avatars', instance.owner.username, f'{md5_name}{ext}')
+    # 使用 content_storage 时实际路径由内容哈希决定，这里只提供扩展名
+    # 固定文件名：'avatars/.png' 会被 splitext 当作没有扩展名的隐藏文件
+    return f'avatars/portrait{os.path.splitext(filename)[1]}'
 
 
 class Avatar(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=100)
-    portrait = models.ImageField(upload_to=_avatar_upload_path)
+    portrait = models.ImageField(upload_to=_avatar_upload_path, storage=content_storage)
     description = models.TextField(default='')
     type = models.CharField(max_length=10, choices=ResourceType.choices, default=ResourceType.USER)
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='avatars', default=1)
@@ -176,3 +178,36 @@ class TTSOrder(models.Model):
     def __str__(self):
         return f"TTS-{self.id}"
 
+
+class OutboxState(models.TextChoices):
+    PENDING = 'pending', _('等待发送')
+    SENT = 'sent', _('已发送')
+    FAILED = 'failed', _('发送失败')
+
+
+class OutboxMessage(models.Model):
+    """待发送到 Celery 的任务消息（事务性 outbox）"""
+    id = models.BigAutoField(primary_key=True)
+    task_name = models.CharField(max_length=200, verbose_name='任务名')
+    payload = models.JSONField(default=dict, verbose_name='任务参数')
+    idempotency_key = models.CharField(max_length=200, unique=True, verbose_name='幂等键')
+    state = models.CharField(
+        max_length=20,
+        choices=OutboxState.choices,
+        default=OutboxState.PENDING,
+        verbose_name='状态'
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name='发送次数')
+    last_error = models.TextField(blank=True, default='', verbose_name='最近错误')
+    available_at = models.DateTimeField(default=timezone.now, verbose_name='下次发送时间')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        managed = True  # 由 console 管理
+        db_table = 'console_outboxmessage'
+        ordering = ['id']
+        indexes = [models.Index(fields=['state', 'available_at'])]
+
+    def __str__(self):
+        return f"Outbox-{self.id} {self.task_name}"
@@ -0,0 +1,68 @@
+"""
+进度推送 - 通过 channel layer 通知用户的 WebSocket 连接
+
+在事务中调用时推送延迟到提交之后：事务回滚（如 retry_on_locked 重试）时不推送，
+也不会推送尚未提交的数据。
+"""
+import logging
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.urls import reverse
+
+from .consumers import user_group_name
+from . import seminar_events
+
+logger = logging.getLogger(__name__)
+
+
+def _push(user_id, kind, data):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(
+            user_group_name(user_id),
+            {'type': 'progress.update', 'kind': kind, 'data': data},
+        )
+    except Exception as e:
+        # 推送失败不影响主流程，客户端仍可轮询
+        logger.warning(f"Failed to push {kind} update to user {user_id}: {e}")
+
+
+def push_tts_order(order):
+    """推送 TTS 任务状态"""
+    push_tts_order_update(order.owner_id, order.id, {
+        'state': order.state,
+        'status': order.status,
+        'output_file': order.output_file,
+    })
+
+
+def push_tts_order_update(owner_id, order_id, data):
+    """推送 TTS 任务状态（data 含 state / status / output_file，可缺省）"""
+    message = {
+        'id': str(order_id),
+        'state': data.get('state'),
+        'status': data.get('status'),
+        'output_file': data.get('output_file'),
+        # 音频经权限检查后下载，与 TTSOrderSerializer.audio_url 一致
+        'audio_url': reverse('tts_order_audio', kwargs={'order_id': order_id}) if data.get('output_file') else None,
+    }
+    transaction.on_commit(lambda: _push(owner_id, 'tts_order', message))
+
+
+def push_seminar(seminar):
+    """推送微课状态（WebSocket 与同进程的 SSE 订阅者）"""
+    data = {
+        'id': str(seminar.id),
+        'state': seminar.state,
+        'status': seminar.status,
+    }
+    owner_id = seminar.owner_id
+
+    def publish():
+        seminar_events.broker.publish(data['id'], data)
+        _push(owner_id, 'seminar', data)
+
+    transaction.on_commit(publish)
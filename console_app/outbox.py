@@ -0,0 +1,154 @@
+"""
+事务性 outbox - 请求内只写数据库，由 relay 异步发送到 Celery
+
+请求路径在同一个事务中写入业务数据和 OutboxMessage，立即返回；
+relay（manage.py relay_outbox）批量认领待发送消息发送到 broker，
+失败按指数退避重试，超过次数后标记失败。
+认领时推迟消息的 available_at（条件 UPDATE，PostgreSQL 上另加 SKIP LOCKED），
+多个 relay 同时运行也不会重复发送同一条消息。
+idempotency_key 同时作为 Celery task_id，worker 可据此去重。
+"""
+
+import logging
+import datetime
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxMessage, OutboxState, TTSOrder, TTSOrderState
+from .tasks import TTS_ORDER_CREATED_TASK, send_tasks_batch, tts_order_message
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(task_name, payload, idempotency_key):
+    """
+    写入一条 outbox 消息，需在业务数据所在的事务中调用。
+    """
+    return OutboxMessage.objects.create(
+        task_name=task_name,
+        payload=payload,
+        idempotency_key=idempotency_key,
+    )
+
+
+def enqueue_tts_orders(orders):
+    """为 TTS 任务批量写入 outbox 消息"""
+    return OutboxMessage.objects.bulk_create([
+        OutboxMessage(
+            task_name=TTS_ORDER_CREATED_TASK,
+            payload=tts_order_message(order),
+            idempotency_key=f"tts-order:{order.id}",
+        )
+        for order in orders
+    ])
+
+
+def enqueue_generation_order(order):
+    """为微课生成任务写入 outbox 消息"""
+    return enqueue(
+        settings.GENERATION_ORDER_TASK,
+        {'id': str(order.id), 'seminar': str(order.seminar_id)},
+        f"generation-order:{order.id}",
+    )
+
+
+def _mark_tts_order_failed(message):
+    TTSOrder.objects.filter(id=message.payload.get('id'), state=TTSOrderState.PENDING).update(
+        state=TTSOrderState.FAILED,
+        status={'error': f'发送任务失败: {message.last_error}'},
+        updated_at=timezone.now(),
+    )
+
+
+# 消息最终发送失败时的处理
+_GIVE_UP_HANDLERS = {
+    TTS_ORDER_CREATED_TASK: _mark_tts_order_failed,
+}
+
+
+def _claim(batch_size, now):
+    """
+    认领一批到期的待发送消息。
+
+    每条消息以条件 UPDATE 推迟 available_at，只有 UPDATE 成功的才由本 relay 发送；
+    其他 relay 在 OUTBOX_CLAIM_SECONDS 内取不到这些消息。
+    """
+    claim_until = now + datetime.timedelta(seconds=settings.OUTBOX_CLAIM_SECONDS)
+    claimed = []
+    with transaction.atomic():
+        candidates = list(
+            OutboxMessage.objects
+            .select_for_update(skip_locked=True)
+            .filter(state=OutboxState.PENDING, available_at__lte=now)
+            .order_by('id')[:batch_size]
+        )
+        for m in candidates:
+            updated = OutboxMessage.objects.filter(
+                id=m.id, state=OutboxState.PENDING, available_at=m.available_at,
+            ).update(available_at=claim_until)
+            if updated:
+                m.available_at = claim_until
+                claimed.append(m)
+    return claimed
+
+
+def relay_pending(batch_size=None):
+    """
+    发送一批到期的待发送消息。
+
+    Returns:
+        int: 本批处理的消息数
+    """
+    batch_size = batch_size or settings.OUTBOX_RELAY_BATCH_SIZE
+    now = timezone.now()
+    messages = _claim(batch_size, now)
+    if not messages:
+        return 0
+
+    try:
+        errors = send_tasks_batch([
+            (m.id, m.task_name, [m.payload], m.idempotency_key) for m in messages
+        ])
+    except Exception as e:
+        # 获取 broker 连接失败等：整批按发送失败处理，计入重试次数
+        logger.error(f"Outbox relay failed to send batch: {e}")
+        errors = {m.id: str(e) for m in messages}
+
+    sent, retried, given_up = [], [], []
+    for m in messages:
+        m.attempts += 1
+        if m.id not in errors:
+            m.state = OutboxState.SENT
+            m.sent_at = now
+            m.last_error = ''
+            sent.append(m)
+            continue
+        m.last_error = errors[m.id]
+        if m.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            m.state = OutboxState.FAILED
+            given_up.append(m)
+        else:
+            delay = settings.OUTBOX_RETRY_BACKOFF * (2 ** (m.attempts - 1))
+            m.available_at = now + datetime.timedelta(seconds=delay)
+            retried.append(m)
+
+    with transaction.atomic():
+        OutboxMessage.objects.bulk_update(
+            messages, ['state', 'attempts', 'last_error', 'available_at', 'sent_at']
+        )
+        for m in given_up:
+            handler = _GIVE_UP_HANDLERS.get(m.task_name)
+            if handler:
+                handler(m)
+
+    if errors:
+        logger.warning(f"Outbox relay: {len(sent)} sent, {len(retried)} retrying, {len(given_up)} failed")
+    return len(messages)
+
+
+def purge_sent(older_than_seconds):
+    """清理已发送的历史消息"""
+    cutoff = timezone.now() - datetime.timedelta(seconds=older_than_seconds)
+    deleted, _ = OutboxMessage.objects.filter(state=OutboxState.SENT, sent_at__lt=cutoff).delete()
+    return deleted
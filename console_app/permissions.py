@@ -0,0 +1,29 @@
+"""
+接口权限 - 服务间调用的共享 token 校验
+"""
+import hmac
+
+from django.conf import settings
+from rest_framework.permissions import BasePermission
+
+
+def _request_token(request):
+    auth = request.headers.get('Authorization', '')
+    if auth.startswith('Bearer '):
+        return auth[len('Bearer '):].strip()
+    return request.headers.get('X-Worker-Token', '')
+
+
+class HasWorkerToken(BasePermission):
+    """
+    worker 回调：请求头携带 WORKER_CALLBACK_TOKEN。
+
+    未配置 token 时拒绝所有请求。
+    """
+    message = "worker token 无效"
+
+    def has_permission(self, request, view):
+        expected = settings.WORKER_CALLBACK_TOKEN
+        if not expected:
+            return False
+        return hmac.compare_digest(_request_token(request).encode(), expected.encode())
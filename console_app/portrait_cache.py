@@ -0,0 +1,190 @@
+"""
+用户头像缓存 - 避免每次页面加载都从 OAuth2 上游重新下载头像
+
+后端通过 PORTRAIT_CACHE_BACKEND 配置：
+    locmem      进程内 LRU，按 PORTRAIT_CACHE_MAX_BYTES 限制总字节数（默认）
+    filesystem  MEDIA_ROOT/portrait_cache/ 下的文件，多进程共享
+    django      Django cache（PORTRAIT_CACHE_ALIAS 指定）
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+logger = logging.getLogger(__name__)
+
+PortraitEntry = namedtuple('PortraitEntry', ['content', 'content_type', 'etag', 'last_modified', 'expires_at'])
+
+
+def make_entry(content, content_type, ttl):
+    now = time.time()
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    etag = '"%s"' % hashlib.sha1(content).hexdigest()
+    return PortraitEntry(content, content_type, etag, int(now), now + ttl)
+
+
+class LocMemPortraitBackend:
+    """进程内 LRU 缓存，按字节数淘汰"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at < time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        if len(entry.content) > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._size += len(entry.content)
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry.content)
+
+
+class FileSystemPortraitBackend:
+    """MEDIA_ROOT 下的文件缓存，内容和元数据分开存放"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path + '.json') as f:
+                meta = json.load(f)
+            if meta['expires_at'] < time.time():
+                return None
+            with open(path + '.bin', 'rb') as f:
+                content = f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+        return PortraitEntry(content, meta['content_type'], meta['etag'], meta['last_modified'], meta['expires_at'])
+
+    def set(self, key, entry):
+        path = self._path(key)
+        meta = entry._asdict()
+        meta.pop('content')
+        try:
+            # 先写临时文件再替换，避免其他进程读到半个文件
+            for suffix, data, mode in (('.bin', entry.content, 'wb'), ('.json', json.dumps(meta), 'w')):
+                tmp = f"{path}{suffix}.{os.getpid()}.tmp"
+                with open(tmp, mode) as f:
+                    f.write(data)
+                os.replace(tmp, path + suffix)
+        except OSError as e:
+            logger.warning(f"Failed to write portrait cache for {key}: {e}")
+
+    def delete(self, key):
+        path = self._path(key)
+        for suffix in ('.json', '.bin'):
+            try:
+                os.remove(path + suffix)
+            except FileNotFoundError:
+                pass
+
+
+class DjangoCachePortraitBackend:
+    """使用 Django cache 存储"""
+
+    def __init__(self, alias):
+        from django.core.cache import caches
+        self.cache = caches[alias]
+
+    def get(self, key):
+        data = self.cache.get(f"portrait:{key}")
+        if data is None:
+            return None
+        return PortraitEntry(*data)
+
+    def set(self, key, entry):
+        timeout = max(int(entry.expires_at - time.time()), 1)
+        self.cache.set(f"portrait:{key}", tuple(entry), timeout)
+
+    def delete(self, key):
+        self.cache.delete(f"portrait:{key}")
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_portrait_cache():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = settings.PORTRAIT_CACHE_BACKEND
+                if name == 'filesystem':
+                    _backend = FileSystemPortraitBackend(os.path.join(settings.MEDIA_ROOT, 'portrait_cache'))
+                elif name == 'django':
+                    _backend = DjangoCachePortraitBackend(settings.PORTRAIT_CACHE_ALIAS)
+                else:
+                    _backend = LocMemPortraitBackend(settings.PORTRAIT_CACHE_MAX_BYTES)
+    return _backend
+
+
+DEFAULT_PORTRAIT_SVG = '''<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 100 100">
+        <circle cx="50" cy="50" r="50" fill="#e0e0e0"/>
+        <circle cx="50" cy="38" r="18" fill="#9e9e9e"/>
+        <ellipse cx="50" cy="85" rx="30" ry="25" fill="#9e9e9e"/>
+    </svg>'''
+
+# 默认头像不会变化，进程启动时计算一次
+DEFAULT_PORTRAIT = make_entry(DEFAULT_PORTRAIT_SVG, 'image/svg+xml', float('inf'))
+
+
+def portrait_response(request, entry, max_age):
+    """
+    根据缓存条目生成响应，支持 If-None-Match / If-Modified-Since 条件请求。
+
+    头像按用户区分但 URL 相同，因此只允许浏览器缓存（private）并按 Cookie 区分，
+    避免共享缓存或同一浏览器中切换的账号拿到另一个用户的头像。
+    max_age 为 0 时（默认头像等临时结果）每次都向服务端校验。
+    """
+    response = get_conditional_response(request, etag=entry.etag, last_modified=entry.last_modified)
+    if response is None:
+        response = HttpResponse(entry.content, content_type=entry.content_type)
+    response['ETag'] = entry.etag
+    response['Last-Modified'] = http_date(entry.last_modified)
+    if max_age:
+        patch_cache_control(response, private=True, max_age=max_age)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Cookie'])
+    return response
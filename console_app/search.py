@@ -0,0 +1,314 @@
+"""
+微课搜索索引 - 标题 / 简介全文检索
+
+api_seminar 由 geminar-admin 管理（managed = False），不能直接加索引，
+因此由 console 维护一张独立的索引表：
+    SQLite      FTS5 虚拟表（trigram 分词，支持中文子串匹配），bm25 排序
+    PostgreSQL  副表 + pg_trgm GIN 索引，按 similarity 排序
+本进程写入微课时由信号同步索引；geminar-admin 写入的数据由
+manage.py reindex_seminars 定期对账：逐批比较微课与索引，只写入有变化的行，
+每批一个短事务，不会长时间占用写锁。
+搜索结果的计数与分页都在索引查询中完成（SeminarSearchResults），
+其他数据库或索引不可用时 search_seminars 返回 None，调用方回退到 LIKE 查询。
+"""
+import uuid
+import logging
+
+from django.db import connections, router, transaction, DatabaseError
+
+from .models import Seminar
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'console_seminar_search'
+
+# trigram 分词要求查询至少 3 个字符
+MIN_QUERY_LENGTH = 3
+
+_ready = set()
+
+
+def _connection():
+    return connections[router.db_for_write(Seminar)]
+
+
+def _vendor(connection):
+    return connection.vendor if connection.vendor in ('sqlite', 'postgresql') else None
+
+
+def index_ddl(connection):
+    """创建索引表的 DDL（均为 IF NOT EXISTS，可重复执行）；不支持的数据库返回空列表"""
+    vendor = _vendor(connection)
+    if vendor == 'sqlite':
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+            f"seminar_id UNINDEXED, owner_id UNINDEXED, title, description, tokenize='trigram')",
+        ]
+    if vendor == 'postgresql':
+        return [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+            f"seminar_id uuid PRIMARY KEY, owner_id integer NOT NULL, title text NOT NULL, description text NOT NULL)",
+            f"CREATE INDEX IF NOT EXISTS {TABLE}_owner ON {TABLE} (owner_id)",
+            f"CREATE INDEX IF NOT EXISTS {TABLE}_title_trgm ON {TABLE} USING gin (title gin_trgm_ops)",
+            f"CREATE INDEX IF NOT EXISTS {TABLE}_description_trgm ON {TABLE} USING gin (description gin_trgm_ops)",
+        ]
+    return []
+
+
+def ensure_index(connection=None):
+    """创建索引表（如不存在）"""
+    connection = connection or _connection()
+    if _vendor(connection) is None:
+        return False
+    if connection.alias in _ready:
+        return True
+    with connection.cursor() as cursor:
+        for statement in index_ddl(connection):
+            cursor.execute(statement)
+    _ready.add(connection.alias)
+    return True
+
+
+def _key(vendor, seminar_id):
+    # SQLite 中 UUIDField 以 32 位 hex 存储
+    return seminar_id.hex if vendor == 'sqlite' else str(seminar_id)
+
+
+def _rowid(seminar_id):
+    """
+    FTS5 表中微课对应的 rowid（取 UUID 高 63 位）。
+
+    FTS5 的 UNINDEXED 列不能建索引，按 seminar_id 更新 / 删除要扫描整张表；
+    rowid 由 id 直接算出，按 rowid 定位只需一次 b-tree 查找。
+    """
+    if not isinstance(seminar_id, uuid.UUID):
+        seminar_id = uuid.UUID(str(seminar_id))
+    return seminar_id.int >> 65
+
+
+def _upsert_rows(connection, rows):
+    vendor = _vendor(connection)
+    with connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.executemany(f"DELETE FROM {TABLE} WHERE rowid = %s", [(_rowid(r[0]),) for r in rows])
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (rowid, seminar_id, owner_id, title, description) VALUES (%s, %s, %s, %s, %s)",
+                [(_rowid(r[0]), _key(vendor, r[0]), r[1], r[2] or '', r[3] or '') for r in rows]
+            )
+        else:
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (seminar_id, owner_id, title, description) VALUES (%s, %s, %s, %s) "
+                f"ON CONFLICT (seminar_id) DO UPDATE SET owner_id = EXCLUDED.owner_id, "
+                f"title = EXCLUDED.title, description = EXCLUDED.description",
+                [(_key(vendor, r[0]), r[1], r[2] or '', r[3] or '') for r in rows]
+            )
+
+
+def index_seminar(seminar):
+    """写入或更新单个微课的索引"""
+    connection = _connection()
+    try:
+        # savepoint：索引失败时不破坏外层业务事务
+        with transaction.atomic(using=connection.alias):
+            if ensure_index(connection):
+                _upsert_rows(connection, [(seminar.id, seminar.owner_id, seminar.title, seminar.description)])
+    except DatabaseError as e:
+        # 索引失败不影响业务写入，等待 reindex_seminars 修复
+        logger.warning(f"Failed to index seminar {seminar.id}: {e}")
+
+
+def remove_seminar(seminar_id):
+    connection = _connection()
+    try:
+        with transaction.atomic(using=connection.alias):
+            if ensure_index(connection):
+                _delete_rows(connection, [_key(_vendor(connection), seminar_id)])
+    except DatabaseError as e:
+        logger.warning(f"Failed to remove seminar {seminar_id} from index: {e}")
+
+
+def _index_digests(connection):
+    """
+    索引中每个微课的内容摘要 {key: hash((owner_id, title, description))}
+
+    同时返回 rowid 与 seminar_id 不对应的 FTS5 行（旧版本按自增 rowid 写入，或重复写入），
+    这些行由调用方删除，对应的微课按新增处理。
+    """
+    digests = {}
+    misplaced = []
+    sqlite = _vendor(connection) == 'sqlite'
+    with connection.cursor() as cursor:
+        if sqlite:
+            cursor.execute(f"SELECT rowid, seminar_id, owner_id, title, description FROM {TABLE}")
+        else:
+            cursor.execute(f"SELECT NULL, seminar_id, owner_id, title, description FROM {TABLE}")
+        while True:
+            rows = cursor.fetchmany(2000)
+            if not rows:
+                break
+            for rowid, seminar_id, owner_id, title, description in rows:
+                if sqlite and rowid != _rowid(seminar_id):
+                    misplaced.append(rowid)
+                    continue
+                digests[str(seminar_id)] = hash((int(owner_id), title, description))
+    return digests, misplaced
+
+
+def _delete_rows(connection, keys):
+    with connection.cursor() as cursor:
+        if _vendor(connection) == 'sqlite':
+            cursor.executemany(f"DELETE FROM {TABLE} WHERE rowid = %s", [(_rowid(key),) for key in keys])
+        else:
+            cursor.executemany(f"DELETE FROM {TABLE} WHERE seminar_id = %s", [(key,) for key in keys])
+
+
+def rebuild_index(batch_size=500):
+    """
+    对账索引与微课表：按 id 分批比较，写入新增 / 修改的行，删除已不存在的微课。
+
+    每批在独立的短事务中写入，其他请求的写入只需等待一批。
+
+    Returns:
+        dict: checked / updated / removed 行数
+    """
+    connection = _connection()
+    if not ensure_index(connection):
+        return {'checked': 0, 'updated': 0, 'removed': 0}
+    vendor = _vendor(connection)
+    indexed, misplaced = _index_digests(connection)
+    for i in range(0, len(misplaced), batch_size):
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {TABLE} WHERE rowid = %s", [(rowid,) for rowid in misplaced[i:i + batch_size]])
+    seminars = Seminar.objects.using(connection.alias).order_by('id')
+    checked = updated = removed = 0
+    last_id = None
+    while True:
+        batch = seminars.filter(id__gt=last_id) if last_id is not None else seminars
+        rows = list(batch.values_list('id', 'owner_id', 'title', 'description')[:batch_size])
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        checked += len(rows)
+        changed = []
+        for row in rows:
+            digest = indexed.pop(_key(vendor, row[0]), None)
+            if digest != hash((row[1], row[2] or '', row[3] or '')):
+                changed.append(row)
+        if changed:
+            with transaction.atomic(using=connection.alias):
+                _upsert_rows(connection, changed)
+            updated += len(changed)
+
+    # 剩下的索引行没有对应的微课；对账期间新建的微课已由信号写入索引，删除前再确认一次
+    stale = list(indexed)
+    for i in range(0, len(stale), batch_size):
+        keys = stale[i:i + batch_size]
+        existing = {
+            _key(vendor, seminar_id) for seminar_id in
+            Seminar.objects.using(connection.alias).filter(id__in=[uuid.UUID(k) for k in keys]).values_list('id', flat=True)
+        }
+        keys = [key for key in keys if key not in existing]
+        if keys:
+            with transaction.atomic(using=connection.alias):
+                _delete_rows(connection, keys)
+            removed += len(keys)
+
+    if vendor == 'sqlite' and (updated or removed or misplaced):
+        # 增量合并 FTS5 的 b-tree 段，每次只做有限的工作量（optimize 会一次性重写整个索引）
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {TABLE}({TABLE}, rank) VALUES ('merge', 500)")
+    return {'checked': checked, 'updated': updated, 'removed': removed}
+
+
+class SeminarSearchResults:
+    """
+    按相关度排序的搜索结果，供 Django 分页器使用。
+
+    count() 与切片都在索引查询中完成：只查询当前页的 id，再按 id 取出微课。
+    queryset 限定可见范围（所有者、状态等过滤条件），同时决定取出微课时的
+    select_related / prefetch_related。
+    """
+
+    def __init__(self, connection, owner_id, query, queryset):
+        self.connection = connection
+        self.vendor = _vendor(connection)
+        self.owner_id = owner_id
+        self.query = query
+        self.queryset = queryset
+        self._count = None
+
+    def _where(self):
+        # 相关子查询：只对命中的索引行按主键检查可见范围，不把用户的全部微课 id 展开成 IN 列表
+        within = self.queryset.order_by().extra(
+            where=[f"{self.connection.ops.quote_name(Seminar._meta.db_table)}.id = {TABLE}.seminar_id"]
+        ).values('id')
+        within_sql, within_params = within.query.sql_with_params()
+        if self.vendor == 'sqlite':
+            # 作为短语匹配，避免用户输入被解析为 FTS5 语法
+            phrase = '"%s"' % self.query.replace('"', '""')
+            where = f"{TABLE} MATCH %s AND owner_id = %s"
+            params = [phrase, self.owner_id]
+        else:
+            pattern = '%%%s%%' % self.query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            where = "owner_id = %s AND (title ILIKE %s OR description ILIKE %s)"
+            params = [self.owner_id, pattern, pattern]
+        return f"{where} AND EXISTS ({within_sql})", params + list(within_params)
+
+    def count(self):
+        if self._count is None:
+            where, params = self._where()
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"SELECT COUNT(*) FROM {TABLE} WHERE {where}", params)
+                self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def ids(self, offset, limit):
+        where, params = self._where()
+        if self.vendor == 'sqlite':
+            order, order_params = f"bm25({TABLE}, 0, 0, 10.0, 1.0)", []
+        else:
+            order, order_params = "GREATEST(similarity(title, %s) * 2, similarity(description, %s)) DESC", [self.query, self.query]
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT seminar_id FROM {TABLE} WHERE {where} ORDER BY {order} LIMIT %s OFFSET %s",
+                params + order_params + [limit, offset]
+            )
+            rows = cursor.fetchall()
+        return [row[0] if isinstance(row[0], uuid.UUID) else uuid.UUID(str(row[0])) for row in rows]
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice) or item.step is not None:
+            raise TypeError('SeminarSearchResults only supports slicing')
+        offset = item.start or 0
+        stop = item.stop if item.stop is not None else self.count()
+        if stop <= offset:
+            return []
+        ids = self.ids(offset, stop - offset)
+        seminars = self.queryset.order_by().in_bulk(ids)
+        return [seminars[i] for i in ids if i in seminars]
+
+
+def search_seminars(owner_id, query, queryset, using=None):
+    """
+    在 queryset 范围内搜索用户的微课（标题权重高于简介）。
+
+    Returns:
+        SeminarSearchResults，或 None 表示索引不可用 / 查询过短，调用方应回退到 LIKE 查询
+    """
+    query = query.strip()
+    if len(query) < MIN_QUERY_LENGTH:
+        return None
+    connection = connections[using] if using else _connection()
+    try:
+        if not ensure_index(connection):
+            return None
+        results = SeminarSearchResults(connection, owner_id, query, queryset)
+        results.count()
+    except DatabaseError as e:
+        logger.warning(f"Seminar search index unavailable, fallback to LIKE: {e}")
+        return None
+    return results
@@ -0,0 +1,76 @@
+"""
+微课进度事件 - SSE 推送的进程内发布 / 订阅
+
+本进程写入微课（SeminarDetailView、批量回调）时由 push_seminar 发布，
+订阅者立即收到；geminar-admin 直接写库不会经过这里，
+订阅者在 SEMINAR_EVENTS_POLL_INTERVAL 秒内没有收到事件时回查数据库。
+每个订阅者只保留最新一条事件，慢客户端不会堆积消息。
+"""
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+
+    def __init__(self, seminar_id, loop):
+        self.seminar_id = seminar_id
+        self.loop = loop
+        self.latest = None
+        self._event = asyncio.Event()
+
+    def _deliver(self, data):
+        # 只在订阅者的事件循环中调用
+        self.latest = data
+        self._event.set()
+
+    async def wait(self, timeout):
+        """等待下一条事件，超时返回 None"""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._event.clear()
+        data, self.latest = self.latest, None
+        return data
+
+
+class SeminarEventBroker:
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, seminar_id):
+        subscription = Subscription(str(seminar_id), asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(subscription.seminar_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.seminar_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.seminar_id]
+
+    def publish(self, seminar_id, data):
+        """发布事件，可在任意线程中调用"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(str(seminar_id), ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, data)
+            except RuntimeError:
+                # 事件循环已关闭，连接随之结束
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+
+broker = SeminarEventBroker()
@@ -1,11 +1,114 @@
+from functools import partial
+
+from django.db import models
+from django.urls import reverse
 from rest_framework import serializers
 from .models import Seminar, GenerationOrder, Voice, Avatar, Speaker, AvatarAction, TTSOrder
+from .storage import media_url
+from .thumbnails import thumbnail_urls, cover_names
+
+
+def split_expand(expand):
+    """['speaker.avatar', 'speaker.voice'] -> {'speaker': ['avatar', 'voice']}"""
+    result = {}
+    for item in expand:
+        name, _, rest = item.partition('.')
+        nested = result.setdefault(name, [])
+        if rest:
+            nested.append(rest)
+    return result
 
 
-class SeminarSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Seminar
-        fields = '__all__'
+def expand_to_related(expand, serializer_class):
+    """
+    将 expand 参数转换为 select_related / prefetch_related 路径。
+
+    Returns:
+        (select_related 列表, prefetch_related 列表)
+    """
+    select, prefetch = [], []
+    for name, nested in split_expand(expand).items():
+        field_class = serializer_class.expandable_fields.get(name)
+        if field_class is None:
+            continue
+        is_many = getattr(field_class, 'keywords', {}).get('many', False)
+        (prefetch if is_many else select).append(name)
+        child_class = getattr(field_class, 'func', field_class)
+        prefetch.extend(f"{name}__{path}" for path in getattr(child_class, 'always_prefetch', ()))
+        if nested and issubclass(child_class, ListFieldsMixin):
+            child_select, child_prefetch = expand_to_related(nested, child_class)
+            target = prefetch if is_many else select
+            target.extend(f"{name}__{path}" for path in child_select)
+            prefetch.extend(f"{name}__{path}" for path in child_prefetch)
+    return select, prefetch
+
+
+class ListFieldsMixin:
+    """
+    列表序列化器的字段裁剪与展开。
+
+    fields: 只输出这些字段（?fields=），None 表示全部
+    expand: 将这些关联输出为嵌套对象（?expand=），见 expandable_fields；
+            支持多级，如 speaker.avatar
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', None) or ()
+        super().__init__(*args, **kwargs)
+        for name, nested in split_expand(expand).items():
+            if name not in self.expandable_fields:
+                continue
+            field_class = self.expandable_fields[name]
+            field_kwargs = {'read_only': True}
+            if nested and issubclass(getattr(field_class, 'func', field_class), ListFieldsMixin):
+                field_kwargs['expand'] = nested
+            self.fields[name] = field_class(**field_kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class MediaFileMixin:
+    """文件字段输出 /media/<name>（检查访问权限），不暴露 MEDIA_URL 下的公开地址"""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        return media_url(value.name, self.context.get('request'))
+
+
+class MediaFileField(MediaFileMixin, serializers.FileField):
+    pass
+
+
+class MediaImageField(MediaFileMixin, serializers.ImageField):
+    pass
+
+
+class MediaFieldsMixin:
+    """模型的 FileField / ImageField 使用 MediaFileField / MediaImageField"""
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.FileField: MediaFileField,
+        models.ImageField: MediaImageField,
+    }
+
+
+class ThumbnailsField(serializers.ReadOnlyField):
+    """图片字段 -> 缩略图 URL {尺寸名: url}"""
+
+    def to_representation(self, value):
+        return thumbnail_urls(getattr(value, 'name', value), self.context.get('request'))
+
+
+class CoverThumbnailsField(serializers.ReadOnlyField):
+    """讲师封面 covers -> {'_16x9': {尺寸名: url}, '_4x3': {...}}"""
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        return {key: thumbnail_urls(name, request) for key, name in cover_names(value).items()}
 
 
 class GenerationOrderSerializer(serializers.ModelSerializer):
@@ -14,13 +117,15 @@ class GenerationOrderSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class VoiceSerializer(serializers.ModelSerializer):
+class VoiceSerializer(MediaFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Voice
         fields = '__all__'
 
 
-class AvatarSerializer(serializers.ModelSerializer):
+class AvatarSerializer(MediaFieldsMixin, serializers.ModelSerializer):
+    thumbnails = ThumbnailsField(source='portrait')
+
     class Meta:
         model = Avatar
         fields = '__all__'
@@ -32,27 +137,110 @@ class AvatarActionSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class AvatarDetailSerializer(serializers.ModelSerializer):
+class AvatarDetailSerializer(MediaFieldsMixin, serializers.ModelSerializer):
     actions = AvatarActionSerializer(many=True, read_only=True)
+    thumbnails = ThumbnailsField(source='portrait')
+    # 嵌套输出时需要一并预取的关联，见 expand_to_related
+    always_prefetch = ('actions',)
 
     class Meta:
         model = Avatar
         fields = '__all__'
 
 
-class SpeakerSerializer(serializers.ModelSerializer):
+class SpeakerSerializer(ListFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        'avatar': AvatarDetailSerializer,
+        'voice': VoiceSerializer,
+    }
+    cover_thumbnails = CoverThumbnailsField(source='covers')
+
     class Meta:
         model = Speaker
         fields = '__all__'
 
 
+class AvatarListSerializer(MediaFieldsMixin, ListFieldsMixin, serializers.ModelSerializer):
+    """头像列表，不含 motions"""
+    expandable_fields = {
+        'actions': partial(AvatarActionSerializer, many=True),
+    }
+    thumbnails = ThumbnailsField(source='portrait')
+
+    class Meta:
+        model = Avatar
+        fields = ['id', 'name', 'portrait', 'thumbnails', 'description', 'type', 'owner']
+
+
+class SpeakerListSerializer(ListFieldsMixin, serializers.ModelSerializer):
+    """讲师列表，不含 motions / covers，封面只返回缩略图"""
+    expandable_fields = {
+        'avatar': AvatarListSerializer,
+        'voice': VoiceSerializer,
+    }
+    cover_thumbnails = CoverThumbnailsField(source='covers')
+
+    class Meta:
+        model = Speaker
+        fields = ['id', 'name', 'description', 'avatar', 'voice', 'owner', 'type', 'cover_thumbnails']
+
+
+class SeminarSerializer(ListFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        'speaker': SpeakerSerializer,
+    }
+
+    class Meta:
+        model = Seminar
+        fields = '__all__'
+
+
+class SeminarListSerializer(ListFieldsMixin, serializers.ModelSerializer):
+    """微课列表，不含 resources（全部幻灯片）"""
+    expandable_fields = {
+        'speaker': SpeakerListSerializer,
+    }
+
+    class Meta:
+        model = Seminar
+        fields = ['id', 'title', 'description', 'date', 'owner', 'state', 'speaker', 'cover', 'status']
+
+
+class AudioURLField(serializers.ReadOnlyField):
+    """TTS 任务 -> 音频下载地址（/tts/orders/<id>/audio/，检查权限），未生成时为 None"""
+
+    def __init__(self, **kwargs):
+        super().__init__(source='*', **kwargs)
+
+    def to_representation(self, order):
+        if not order.output_file:
+            return None
+        url = reverse('tts_order_audio', kwargs={'order_id': order.id})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+
 class TTSOrderSerializer(serializers.ModelSerializer):
+    audio_url = AudioURLField()
+
     class Meta:
         model = TTSOrder
         fields = '__all__'
         read_only_fields = ['id', 'state', 'status', 'output_file', 'owner', 'created_at', 'updated_at']
 
 
+class TTSOrderListSerializer(serializers.ModelSerializer):
+    """列表用精简表示，text 只返回预览（由查询中的 text_preview 注解提供）"""
+    text_preview = serializers.CharField(read_only=True)
+    audio_url = AudioURLField()
+
+    class Meta:
+        model = TTSOrder
+        fields = [
+            'id', 'text_preview', 'spk_id', 'state', 'status', 'output_file', 'audio_url', 'created_at', 'updated_at',
+        ]
+
+
 class TTSOrderCreateSerializer(serializers.Serializer):
     text = serializers.CharField(required=True)
     spk_id = serializers.CharField(required=True)
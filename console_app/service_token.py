@@ -0,0 +1,138 @@
+"""
+服务间调用 token 缓存 - client credentials 模式
+
+token 在过期前 SERVICE_TOKEN_REFRESH_MARGIN 秒内复用，过期后只由一个
+请求去刷新（single-flight），其他并发请求等待结果，避免同时打到 token 接口。
+配置 SERVICE_TOKEN_CACHE_ALIAS 后，token 同时存入 Django cache 供多进程共享。
+"""
+import time
+import uuid
+import logging
+import threading
+
+from django.conf import settings
+from oauthlib.oauth2 import BackendApplicationClient
+
+from . import http_client
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceTokenCache:
+
+    # 跨进程锁的有效期与等待其他进程结果的最长时间（秒）
+    lock_timeout = 10
+    lock_wait = 5
+
+    def __init__(self, token_url, client_id, client_secret, refresh_margin=60, cache_alias=''):
+        self.token_url = token_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_margin = refresh_margin
+        self.cache_alias = cache_alias
+        self.cache_key = f"service-token:{client_id}"
+        self.grants = 0
+        self._token = None
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, token):
+        return token is not None and token.get('expires_at', 0) - self.refresh_margin > time.time()
+
+    def _shared_cache(self):
+        if not self.cache_alias:
+            return None
+        from django.core.cache import caches
+        return caches[self.cache_alias]
+
+    def _fetch(self):
+        client = BackendApplicationClient(client_id=self.client_id)
+        session = http_client.oauth2_session(client=client)
+        token = session.fetch_token(
+            token_url=self.token_url,
+            client_secret=self.client_secret,
+            include_client_id=True
+        )
+        self.grants += 1
+        if 'expires_at' not in token:
+            token['expires_at'] = time.time() + float(token.get('expires_in', 0))
+        logger.info(f"Service token issued for {self.client_id}, expires in {token.get('expires_in')}s")
+        return dict(token)
+
+    def _fetch_shared(self, cache):
+        """跨进程 single-flight：只有拿到锁的进程请求 token，其他进程等待共享结果"""
+        lock_key = f"{self.cache_key}:lock"
+        owner = uuid.uuid4().hex
+        acquired = cache.add(lock_key, owner, timeout=self.lock_timeout)
+        if not acquired:
+            deadline = time.time() + self.lock_wait
+            while time.time() < deadline:
+                time.sleep(0.05)
+                token = cache.get(self.cache_key)
+                if self._is_fresh(token):
+                    return token
+            # 持锁进程超时未写入结果：自行请求，锁仍属于对方时不能删除
+            acquired = cache.add(lock_key, owner, timeout=self.lock_timeout)
+        try:
+            token = self._fetch()
+            timeout = int(token['expires_at'] - self.refresh_margin - time.time())
+            if timeout > 0:
+                cache.set(self.cache_key, token, timeout)
+            return token
+        finally:
+            # 请求超过 lock_timeout 时锁可能已过期并被其他进程拿到，只删除自己的锁
+            if acquired and cache.get(lock_key) == owner:
+                cache.delete(lock_key)
+
+    def get_token(self):
+        token = self._token
+        if self._is_fresh(token):
+            return token
+        with self._lock:
+            token = self._token
+            if self._is_fresh(token):
+                return token
+            cache = self._shared_cache()
+            if cache is not None:
+                token = cache.get(self.cache_key)
+                if not self._is_fresh(token):
+                    token = self._fetch_shared(cache)
+            else:
+                token = self._fetch()
+            self._token = token
+            return token
+
+    def invalidate(self):
+        """上游拒绝 token（如 401）时丢弃缓存"""
+        with self._lock:
+            self._token = None
+            cache = self._shared_cache()
+            if cache is not None:
+                cache.delete(self.cache_key)
+
+
+_service_token_cache = None
+_init_lock = threading.Lock()
+
+
+def get_service_token_cache():
+    global _service_token_cache
+    if _service_token_cache is None:
+        with _init_lock:
+            if _service_token_cache is None:
+                _service_token_cache = ServiceTokenCache(
+                    settings.OAUTH2_TOKEN_URL,
+                    settings.OAUTH2_CLIENT_ID,
+                    settings.OAUTH2_CLIENT_SECRET,
+                    refresh_margin=settings.SERVICE_TOKEN_REFRESH_MARGIN,
+                    cache_alias=settings.SERVICE_TOKEN_CACHE_ALIAS,
+                )
+    return _service_token_cache
+
+
+def get_service_token():
+    return get_service_token_cache().get_token()
+
+
+def service_session():
+    """使用缓存的服务 token 创建 OAuth2Session"""
+    return http_client.oauth2_session(settings.OAUTH2_CLIENT_ID, token=get_service_token())
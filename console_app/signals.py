@@ -0,0 +1,97 @@
+"""
+模型信号 - 本进程写入资源时使相关缓存失效、同步搜索索引、生成缩略图
+"""
+import logging
+
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_out
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Voice, Avatar, AvatarAction, Speaker, Seminar
+from .catalog_cache import bump_version
+from . import search
+from .db import configure_sqlite
+from .user_cache import get_user_cache
+from .thumbnails import generate_thumbnails, cover_names
+
+logger = logging.getLogger(__name__)
+
+_CATALOGS = {
+    Voice: 'voice',
+    Avatar: 'avatar',
+    Speaker: 'speaker',
+}
+
+
+@receiver(post_save, sender=Voice)
+@receiver(post_save, sender=Avatar)
+@receiver(post_save, sender=Speaker)
+@receiver(post_delete, sender=Voice)
+@receiver(post_delete, sender=Avatar)
+@receiver(post_delete, sender=Speaker)
+def invalidate_catalog(sender, instance, **kwargs):
+    # type 可能由 system 改为 user（或相反），post_save 拿不到旧值，两级版本都更新
+    _bump_catalog(_CATALOGS[sender], getattr(instance, 'owner_id', None))
+
+
+@receiver(post_save, sender=AvatarAction)
+@receiver(post_delete, sender=AvatarAction)
+def invalidate_avatar_actions(sender, instance, **kwargs):
+    # 头像列表展开了 actions；头像随之删除时由 Avatar 的信号处理
+    avatar = Avatar.objects.filter(id=instance.avatar_id).values('owner_id').first()
+    if avatar is not None:
+        _bump_catalog('avatar', avatar['owner_id'])
+
+
+def _bump_catalog(catalog, owner_id):
+    # 提交后再更新版本号：事务内更新时，其他请求可能在提交前按新版本号缓存旧数据
+    def bump():
+        bump_version(catalog)
+        if owner_id is not None:
+            bump_version(catalog, owner_id)
+    transaction.on_commit(bump)
+
+
+@receiver(post_save, sender=Seminar)
+def index_seminar(sender, instance, **kwargs):
+    search.index_seminar(instance)
+
+
+@receiver(post_delete, sender=Seminar)
+def unindex_seminar(sender, instance, **kwargs):
+    search.remove_seminar(instance.id)
+
+
+@receiver(post_save, sender=Avatar)
+@receiver(post_save, sender=Speaker)
+def ensure_thumbnails(sender, instance, **kwargs):
+    if sender is Avatar:
+        names = [instance.portrait.name] if instance.portrait else []
+    else:
+        names = list(cover_names(instance.covers).values())
+    for name in names:
+        try:
+            generate_thumbnails(name)
+        except Exception as e:
+            # 缩略图失败不影响保存，序列化时回退到原图或按需生成
+            logger.warning(f"Failed to generate thumbnails for {name}: {e}")
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # OAuth2 登录更新用户资料、last_login 等
+    get_user_cache().invalidate_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def invalidate_cached_session(sender, request, **kwargs):
+    if request is not None and request.session.session_key:
+        get_user_cache().invalidate_session(request.session.session_key)
+
+
+@receiver(connection_created)
+def tune_connection(sender, connection, **kwargs):
+    configure_sqlite(connection)
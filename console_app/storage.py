@@ -0,0 +1,95 @@
+"""
+内容寻址存储 - Avatar.portrait / Voice.sample
+
+文件按内容的 sha256 命名：
+    <CONTENT_STORAGE_PREFIX>/<hash[:2]>/<hash[2:4]>/<hash><ext>
+写入时边读边计算哈希，相同内容只保存一份；同一路径的内容永不改变，
+因此可以使用 immutable 的长期缓存。
+一个文件可能被多条记录引用，delete() 不删除文件，
+由 manage.py prune_media 按数据库中的引用清理不再使用的文件。
+"""
+import os
+import hashlib
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.urls import reverse
+from django.utils.deconstruct import deconstructible
+
+_CHUNK_SIZE = 64 * 1024
+
+
+def content_prefix():
+    return settings.CONTENT_STORAGE_PREFIX.strip('/')
+
+
+def is_content_addressed(name):
+    return bool(name) and name.startswith(content_prefix() + '/')
+
+
+def content_name(digest, ext):
+    return f"{content_prefix()}/{digest[:2]}/{digest[2:4]}/{digest}{ext.lower()}"
+
+
+def media_url(name, request=None):
+    """存储路径 -> /media/<name>（检查访问权限后发送），而不是 MEDIA_URL 下的公开地址"""
+    url = reverse('media', kwargs={'name': name})
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def immutable_cache_control():
+    return f"public, max-age={settings.CONTENT_STORAGE_MAX_AGE}, immutable"
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # 路径由内容决定，同名即同内容，不需要另取名字
+        return name
+
+    def _save(self, name, content):
+        ext = os.path.splitext(name)[1]
+        directory = os.path.join(self.location, content_prefix())
+        os.makedirs(directory, exist_ok=True)
+
+        # 边写临时文件边计算哈希，不在内存中保留完整内容
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        with tempfile.NamedTemporaryFile(dir=directory, prefix='.upload-', delete=False) as tmp:
+            try:
+                for chunk in content.chunks(_CHUNK_SIZE):
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            except BaseException:
+                tmp.close()
+                os.unlink(tmp.name)
+                raise
+
+        name = content_name(digest.hexdigest(), ext)
+        full_path = self.path(name)
+        try:
+            # 已有相同内容：更新修改时间，prune_media 不会把它当作过了 grace 的未引用文件删除
+            os.utime(full_path)
+        except FileNotFoundError:
+            pass
+        else:
+            os.unlink(tmp.name)
+            return name
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(tmp.name, self.file_permissions_mode)
+        # 并发写入同一内容时 replace 的结果相同
+        os.replace(tmp.name, full_path)
+        return name
+
+    def delete(self, name):
+        # 内容可能被其他记录引用，由 prune_media 统一清理
+        if is_content_addressed(name):
+            return
+        super().delete(name)
+
+
+content_storage = ContentAddressedStorage()
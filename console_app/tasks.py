@@ -1,41 +1,133 @@
 """
 TTS 任务处理 - 发送到 Celery
+
+每个 worker 进程只创建一个 Celery producer app，复用其 broker 连接池，
+避免每次请求都新建 app 和 AMQP 连接。
 """
 
+import os
 import logging
+import threading
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+TTS_ORDER_CREATED_TASK = 'worker.tasks.handle_tts_order_created'
+
+_app = None
+_app_lock = threading.Lock()
+
+
+def _broker_url():
+    return f"amqp://{settings.RABBITMQ_USER}:{settings.RABBITMQ_PASSWORD}@{settings.RABBITMQ_HOST}:{settings.RABBITMQ_PORT}//"
+
+
+def _retry_policy():
+    return {
+        'max_retries': settings.CELERY_PUBLISH_MAX_RETRIES,
+        'interval_start': 0,
+        'interval_step': settings.CELERY_PUBLISH_RETRY_BACKOFF,
+        'interval_max': settings.CELERY_PUBLISH_RETRY_BACKOFF_MAX,
+    }
+
 
-def send_tts_order_to_queue(order):
+def get_celery_app():
     """
-    将 TTS 任务发送到 Celery 队列。
-    
-    Args:
-        order: TTSOrder 实例
-    """
-    from celery import Celery
-    
-    # 配置 Celery 连接
-    broker_url = f"amqp://{settings.RABBITMQ_USER}:{settings.RABBITMQ_PASSWORD}@{settings.RABBITMQ_HOST}:{settings.RABBITMQ_PORT}//"
-    app = Celery('geminar_worker', broker=broker_url)
-    
-    message = {
+    获取进程内共享的 Celery producer app（懒加载，线程安全）。
+    """
+    global _app
+    if _app is not None:
+        return _app
+    with _app_lock:
+        if _app is None:
+            from celery import Celery
+
+            app = Celery('geminar_worker', broker=_broker_url(), set_as_current=False)
+            app.conf.update(
+                broker_pool_limit=settings.CELERY_BROKER_POOL_LIMIT,
+                broker_heartbeat=settings.CELERY_BROKER_HEARTBEAT,
+                broker_connection_timeout=settings.CELERY_BROKER_CONNECTION_TIMEOUT,
+                broker_connection_retry=True,
+                task_publish_retry=True,
+                task_publish_retry_policy=_retry_policy(),
+            )
+            _app = app
+            logger.info("Celery producer app created (pid=%s)", os.getpid())
+    return _app
+
+
+def reset_celery_app():
+    """
+    丢弃当前进程的 producer app。
+
+    fork 之后子进程不能复用父进程的 AMQP 连接，需要在子进程中重新创建。
+    """
+    global _app, _app_lock
+    app, _app = _app, None
+    _app_lock = threading.Lock()
+    if app is not None:
+        try:
+            # 只丢弃连接池引用，不关闭父进程仍在使用的 socket
+            app._pool = None
+        except Exception:
+            pass
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_celery_app)
+
+
+def send_task(name, args=None, kwargs=None, queue='celery', **options):
+    """
+    通过共享 producer 发送任务，连接断开时按退避策略自动重连重试。
+    """
+    app = get_celery_app()
+    return app.send_task(
+        name,
+        args=args,
+        kwargs=kwargs,
+        queue=queue,
+        retry=True,
+        retry_policy=_retry_policy(),
+        **options
+    )
+
+
+def tts_order_message(order):
+    """TTS 任务消息体"""
+    return {
         'id': str(order.id),
         'text': order.text,
         'spk_id': order.spk_id,
     }
-    
-    try:
-        # 发送任务到 worker
-        app.send_task(
-            'worker.tasks.handle_tts_order_created',
-            args=[message],
-            queue='celery'
-        )
-        logger.info(f"TTS order {order.id} sent to Celery queue")
-        
-    except Exception as e:
-        logger.error(f"Failed to send TTS order {order.id} to queue: {e}")
-        raise
+
+
+def send_tasks_batch(messages):
+    """
+    批量发送任务，所有消息复用同一个 producer 连接。
+
+    Args:
+        messages: [(key, task_name, args, task_id), ...]，task_id 可为 None
+
+    Returns:
+        dict: 发送失败的 {key: 错误信息}
+    """
+    app = get_celery_app()
+    errors = {}
+    with app.producer_or_acquire() as producer:
+        for key, name, args, task_id in messages:
+            try:
+                app.send_task(
+                    name,
+                    args=args,
+                    queue='celery',
+                    task_id=task_id,
+                    producer=producer,
+                    retry=True,
+                    retry_policy=_retry_policy(),
+                )
+            except Exception as e:
+                logger.error(f"Failed to send task {name} ({key}) to queue: {e}")
+                errors[key] = str(e)
+    logger.info(f"{len(messages) - len(errors)}/{len(messages)} tasks sent to Celery queue")
+    return errors
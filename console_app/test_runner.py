@@ -0,0 +1,53 @@
+"""
+测试运行器
+
+共享表（managed = False）在生产中由 geminar-admin 创建，测试数据库中没有；
+运行测试时临时将其视为 managed，由测试数据库一并创建。
+搜索索引表与 create_console_tables 一样在测试开始前创建，
+避免在 TestCase 的事务中创建后随回滚消失。
+SQLite 测试库使用临时文件而不是内存库：共享缓存的内存库没有 busy_timeout，
+锁冲突时立即失败，与生产中共享 db.sqlite3 的行为不同。
+测试需要副本库（databases 包含 replica）而未配置 DB_REPLICA_NAME 时，
+用另一个 SQLite 临时文件作为副本，与主库的数据相互独立。
+"""
+import copy
+import os
+import tempfile
+
+from django.apps import apps
+from django.db import connections
+from django.test.runner import DiscoverRunner
+
+
+class ConsoleTestRunner(DiscoverRunner):
+
+    def setup_databases(self, **kwargs):
+        self._tmpdir = tempfile.TemporaryDirectory(prefix='geminar-console-test-')
+        self._added_replica = 'replica' in (kwargs.get('aliases') or ()) and 'replica' not in connections
+        if self._added_replica:
+            connections.settings['replica'] = copy.deepcopy(connections.settings['default'])
+        for alias in connections:
+            settings_dict = connections[alias].settings_dict
+            if connections[alias].vendor == 'sqlite' and not settings_dict['TEST'].get('NAME'):
+                settings_dict['TEST']['NAME'] = os.path.join(self._tmpdir.name, f"{alias}.sqlite3")
+        self._unmanaged = [
+            model for model in apps.get_app_config('console_app').get_models() if not model._meta.managed
+        ]
+        for model in self._unmanaged:
+            model._meta.managed = True
+        old_config = super().setup_databases(**kwargs)
+        from console_app import search
+        # 只在已创建的测试库中建索引；只运行 SimpleTestCase 时不会创建测试库，不能连到真实的库
+        for alias in kwargs.get('aliases') or ():
+            search.ensure_index(connections[alias])
+        return old_config
+
+    def teardown_databases(self, old_config, **kwargs):
+        super().teardown_databases(old_config, **kwargs)
+        self._tmpdir.cleanup()
+        if self._added_replica:
+            connections['replica'].close()
+            del connections['replica']
+            del connections.settings['replica']
+        for model in self._unmanaged:
+            model._meta.managed = False
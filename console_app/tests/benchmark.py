@@ -0,0 +1,21 @@
+"""
+基准测试 - 默认跳过，不影响普通测试运行
+
+    CONSOLE_BENCHMARKS=1 python manage.py test console_app --tag benchmark
+
+结果写入 console_app.benchmark 日志；基准测试只报告耗时，不对耗时做断言。
+"""
+import logging
+import os
+import unittest
+
+from django.test import tag
+
+logger = logging.getLogger('console_app.benchmark')
+
+ENABLED = os.environ.get('CONSOLE_BENCHMARKS', '') not in ('', '0')
+
+
+def benchmark(test):
+    """标记基准测试（测试方法或测试类）：打上 benchmark 标签，未设置 CONSOLE_BENCHMARKS 时跳过"""
+    return tag('benchmark')(unittest.skipUnless(ENABLED, 'set CONSOLE_BENCHMARKS=1 to run benchmarks')(test))
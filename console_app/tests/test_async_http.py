@@ -0,0 +1,125 @@
+"""
+异步上游客户端：ASGI 请求复用共享客户端，其他调用用后即关；
+async 视图等待上游时不占用 worker，并发请求同时等待
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from unittest import mock
+
+import httpx
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
+from django.test import AsyncClient, SimpleTestCase, TestCase
+
+from console_app import async_http, views
+from console_app.portrait_cache import LocMemPortraitBackend
+from console_app.tests.benchmark import benchmark, logger
+
+CONCURRENCY = 20
+UPSTREAM_DELAY = 0.05
+
+
+class UpstreamClientTests(SimpleTestCase):
+
+    def setUp(self):
+        async_http._clients.clear()
+
+    def test_per_call_client_is_closed(self):
+        async def fetch():
+            async with async_http.upstream_client() as client:
+                return client
+
+        # async_to_sync 每次调用都新建事件循环，不能留下共享客户端
+        clients = [async_to_sync(fetch)() for _ in range(5)]
+        self.assertTrue(all(client.is_closed for client in clients))
+        self.assertEqual(len(set(map(id, clients))), 5)
+        self.assertEqual(len(async_http._clients), 0)
+
+    def test_asgi_request_shares_client(self):
+        request = mock.Mock(spec=ASGIRequest)
+
+        async def fetch_twice():
+            async with async_http.upstream_client(request) as first:
+                pass
+            async with async_http.upstream_client(request) as second:
+                pass
+            return first, second
+
+        first, second = async_to_sync(fetch_twice)()
+        self.assertIs(first, second)
+        self.assertFalse(first.is_closed)
+
+
+class SlowUpstream:
+    """假的头像上游：记录同时进行中的请求数，每个请求等待 delay 秒"""
+
+    def __init__(self, delay=UPSTREAM_DELAY, wait_for=None):
+        self.delay = delay
+        self.wait_for = wait_for
+        self.in_flight = 0
+        self.peak = 0
+        self._all_arrived = asyncio.Event()
+
+    async def handle(self, request):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        if self.wait_for and self.in_flight >= self.wait_for:
+            self._all_arrived.set()
+        try:
+            if self.wait_for:
+                # 全部请求都到达上游后才返回：串行处理时会超时
+                await asyncio.wait_for(self._all_arrived.wait(), timeout=5)
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return httpx.Response(200, content=b'\x89PNG', headers={'Content-Type': 'image/png'})
+
+    @asynccontextmanager
+    async def client(self, request=None):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(self.handle)) as client:
+            yield client
+
+
+class AsyncPortraitConcurrencyTests(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(views, 'get_portrait_cache', return_value=LocMemPortraitBackend(1024 * 1024))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def _clients(self, count):
+        clients = []
+        for i in range(count):
+            user = await User.objects.acreate(username=f"user-{i}")
+            client = AsyncClient()
+            await client.aforce_login(user)
+            session = await client.asession()
+            await session.aset('oauth2_token', {'access_token': 'token', 'expires_at': 2 ** 31})
+            await session.asave()
+            clients.append(client)
+        return clients
+
+    async def _fetch_all(self, upstream, clients):
+        with mock.patch.object(views, 'upstream_client', upstream.client):
+            return await asyncio.gather(*(client.get('/user/me/portrait/') for client in clients))
+
+    async def test_requests_wait_for_upstream_concurrently(self):
+        clients = await self._clients(CONCURRENCY)
+        upstream = SlowUpstream(wait_for=CONCURRENCY)
+        responses = await self._fetch_all(upstream, clients)
+        self.assertEqual({r['Content-Type'] for r in responses}, {'image/png'})
+        self.assertEqual(upstream.peak, CONCURRENCY)
+
+    @benchmark
+    async def test_concurrent_portrait_latency(self):
+        clients = await self._clients(CONCURRENCY)
+        upstream = SlowUpstream()
+        started = time.perf_counter()
+        await self._fetch_all(upstream, clients)
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"{CONCURRENCY} concurrent portrait requests with {UPSTREAM_DELAY * 1000:.0f} ms upstream: "
+            f"{elapsed:.2f}s (serial would be >= {CONCURRENCY * UPSTREAM_DELAY:.2f}s), peak in flight {upstream.peak}"
+        )
@@ -0,0 +1,97 @@
+"""
+批量回调：worker token 校验、允许的字段与逐条校验
+"""
+import uuid
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from console_app.models import GenerationOrder, Seminar, TTSOrder, TTSOrderState
+
+TOKEN = 'worker-secret'
+
+
+@override_settings(WORKER_CALLBACK_TOKEN=TOKEN)
+class CallbackBatchTests(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user('alice')
+        self.client = APIClient()
+        self.order = TTSOrder.objects.create(text='你好', spk_id='spk', owner=self.owner)
+        self.seminar = Seminar.objects.create(title='微课', description='', owner=self.owner, state='pending')
+
+    def _post(self, body, **headers):
+        headers.setdefault('HTTP_AUTHORIZATION', f"Bearer {TOKEN}")
+        return self.client.post('/callbacks/batch/', body, format='json', **headers)
+
+    def test_requires_token(self):
+        body = {'seminars': [{'id': str(self.seminar.id), 'state': 'done'}]}
+        self.assertEqual(self._post(body, HTTP_AUTHORIZATION='').status_code, 403)
+        self.assertEqual(self._post(body, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(Seminar.objects.get(id=self.seminar.id).state, 'pending')
+
+        response = self._post(body, HTTP_AUTHORIZATION='', HTTP_X_WORKER_TOKEN=TOKEN)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Seminar.objects.get(id=self.seminar.id).state, 'done')
+
+    @override_settings(WORKER_CALLBACK_TOKEN='')
+    def test_rejects_everything_without_configured_token(self):
+        response = self._post({'seminars': []}, HTTP_AUTHORIZATION='Bearer ')
+        self.assertEqual(response.status_code, 403)
+
+    def test_invalid_items_are_reported_per_item(self):
+        response = self._post({'tts_orders': [
+            {'id': str(self.order.id), 'state': TTSOrderState.HANDLING, 'status': 'oops'},
+            {'id': str(self.order.id), 'state': TTSOrderState.HANDLING, 'owner_id': 2},
+            {'id': 'not-a-uuid'},
+            'garbage',
+            {'id': str(self.order.id), 'state': TTSOrderState.HANDLING, 'status': {'progress': 10}},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['data']['tts_orders']
+        self.assertEqual([r['result'] for r in results], ['invalid'] * 4 + ['applied'])
+        self.assertTrue(all(r['code'] == 400 and r['error'] for r in results[:4]))
+        self.assertEqual(TTSOrder.objects.get(id=self.order.id).status, {'progress': 10})
+
+    def test_results_follow_input_order(self):
+        other = TTSOrder.objects.create(text='你好', spk_id='spk', owner=self.owner)
+        missing = str(uuid.uuid4())
+        response = self._post({'tts_orders': [
+            {'id': str(self.order.id), 'state': TTSOrderState.HANDLING, 'status': {'progress': 10}},
+            {'id': missing, 'state': TTSOrderState.HANDLING},
+            {'id': 'not-a-uuid'},
+            {'id': str(other.id), 'state': TTSOrderState.HANDLING},
+            {'id': str(self.order.id), 'state': TTSOrderState.HANDLING, 'status': {'progress': 20}},
+        ]})
+        results = response.json()['data']['tts_orders']
+        self.assertEqual([r['index'] for r in results], [0, 1, 2, 3, 4])
+        self.assertEqual(
+            [(r['id'], r['result']) for r in results],
+            [(str(self.order.id), 'applied'), (missing, 'not_found'), ('not-a-uuid', 'invalid'),
+             (str(other.id), 'applied'), (str(self.order.id), 'applied')],
+        )
+        self.assertEqual(TTSOrder.objects.get(id=self.order.id).status, {'progress': 20})
+
+    def test_seminar_updates_are_restricted(self):
+        draft = Seminar.objects.create(title='草稿', description='', owner=self.owner, state='draft')
+        response = self._post({'seminars': [
+            {'id': str(draft.id), 'state': 'done'},
+            {'id': str(self.seminar.id), 'state': 'draft'},
+            {'id': str(self.seminar.id), 'title': 'pwned'},
+        ]})
+        results = response.json()['data']['seminars']
+        self.assertEqual([r['result'] for r in results], ['not_found', 'invalid', 'invalid'])
+        self.assertEqual(Seminar.objects.get(id=draft.id).state, 'draft')
+        seminar = Seminar.objects.get(id=self.seminar.id)
+        self.assertEqual((seminar.title, seminar.state), ('微课', 'pending'))
+
+    def test_generation_order_status(self):
+        order = GenerationOrder.objects.create(seminar=self.seminar)
+        response = self._post({'generation_orders': [
+            {'id': str(order.id), 'state': 'handling', 'status': {'description': '生成中'}},
+            {'id': str(uuid.uuid4()), 'state': 'handling'},
+        ]})
+        results = response.json()['data']['generation_orders']
+        self.assertEqual([r['result'] for r in results], ['applied', 'not_found'])
+        self.assertEqual(GenerationOrder.objects.get(id=order.id).status, {'description': '生成中'})
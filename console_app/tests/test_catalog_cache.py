@@ -0,0 +1,97 @@
+"""
+资源目录缓存：多 worker 下进程内缓存停用；头像动作修改、type 变更使目录失效；命中统计
+"""
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from console_app import catalog_cache
+from console_app.models import Avatar, AvatarAction, ResourceType, Voice
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'catalog-tests'}}
+
+
+@override_settings(CACHES=LOCMEM, CATALOG_CACHE_ALIAS='default')
+class CatalogCacheTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.builds = 0
+
+    def _build(self):
+        self.builds += 1
+        return [{'id': self.builds}]
+
+    @override_settings(WEB_CONCURRENCY=1)
+    def test_single_worker_uses_locmem(self):
+        catalog_cache.get_catalog('voice', None, self._build)
+        data, hit = catalog_cache.get_catalog('voice', None, self._build)
+        self.assertTrue(hit)
+        self.assertEqual(self.builds, 1)
+        self.assertIsNotNone(catalog_cache.get_etag('voice'))
+
+    @override_settings(WEB_CONCURRENCY=2)
+    def test_multi_worker_bypasses_locmem(self):
+        catalog_cache.get_catalog('voice', None, self._build)
+        data, hit = catalog_cache.get_catalog('voice', None, self._build)
+        self.assertFalse(hit)
+        self.assertEqual(self.builds, 2)
+        self.assertIsNone(catalog_cache.get_etag('voice'))
+
+    @override_settings(WEB_CONCURRENCY=1)
+    def test_avatar_action_invalidates_avatar_catalog(self):
+        owner = User.objects.create_user('alice')
+        avatar = Avatar.objects.create(name='a', type=ResourceType.SYSTEM, owner=owner)
+        system_etag = catalog_cache.get_etag('avatar')
+        user_etag = catalog_cache.get_etag('avatar', owner.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            action = AvatarAction.objects.create(avatar=avatar, description='wave')
+        self.assertNotEqual(catalog_cache.get_etag('avatar'), system_etag)
+
+        system_etag = catalog_cache.get_etag('avatar')
+        with self.captureOnCommitCallbacks(execute=True):
+            action.delete()
+        self.assertNotEqual(catalog_cache.get_etag('avatar'), system_etag)
+        self.assertNotEqual(catalog_cache.get_etag('avatar', owner.id), user_etag)
+
+    @override_settings(WEB_CONCURRENCY=1)
+    def test_type_change_invalidates_system_catalog(self):
+        owner = User.objects.create_user('bob')
+        with self.captureOnCommitCallbacks(execute=True):
+            avatar = Avatar.objects.create(name='a', type=ResourceType.SYSTEM, owner=owner)
+        system_etag = catalog_cache.get_etag('avatar')
+
+        # system 改为 user：新 type 不是 system，系统目录仍须失效
+        avatar.type = ResourceType.USER
+        with self.captureOnCommitCallbacks(execute=True):
+            avatar.save()
+        self.assertNotEqual(catalog_cache.get_etag('avatar'), system_etag)
+
+    @override_settings(WEB_CONCURRENCY=1)
+    def test_bump_waits_for_commit(self):
+        system_etag = catalog_cache.get_etag('voice')
+        with self.captureOnCommitCallbacks() as callbacks:
+            Voice.objects.create(title='v', description='')
+            self.assertEqual(catalog_cache.get_etag('voice'), system_etag)
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertNotEqual(catalog_cache.get_etag('voice'), system_etag)
+
+    @override_settings(WEB_CONCURRENCY=1)
+    def test_stats_endpoint_requires_staff(self):
+        user = User.objects.create_user('carol')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(reverse('catalog_cache_stats')).status_code, 403)
+
+        before = catalog_cache.catalog_cache_stats()
+        catalog_cache.get_catalog('voice', None, self._build)
+        catalog_cache.get_catalog('voice', None, self._build)
+
+        user.is_staff = True
+        user.save()
+        data = self.client.get(reverse('catalog_cache_stats')).json()['data']
+        self.assertEqual(data['hits'] - before['hits'], 1)
+        self.assertEqual(data['misses'] - before['misses'], 1)
+        self.assertTrue(data['enabled'])
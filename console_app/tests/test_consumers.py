@@ -0,0 +1,95 @@
+"""
+WebSocket 进度推送：N 个连接 × M 次状态变化，每个连接只收到自己的消息
+
+基准对比轮询：每个客户端每次状态变化至少需要一次 HTTP 请求，推送为 0。
+"""
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+from asgiref.testing import ApplicationCommunicator
+from channels.layers import get_channel_layer
+from django.test import SimpleTestCase, override_settings
+
+from console_app.consumers import ProgressConsumer, user_group_name
+from console_app.tests.benchmark import benchmark, logger
+
+CLIENTS = 50
+UPDATES = 20
+
+
+class WebsocketClient(ApplicationCommunicator):
+    """最小的 WebSocket 测试客户端（channels.testing 依赖 daphne，这里不引入）"""
+
+    def __init__(self, user):
+        super().__init__(ProgressConsumer.as_asgi(), {
+            'type': 'websocket', 'path': '/ws/progress/', 'query_string': b'',
+            'headers': [], 'subprotocols': [], 'user': user,
+        })
+
+    async def connect(self):
+        await self.send_input({'type': 'websocket.connect'})
+        response = await self.receive_output(1)
+        if response['type'] == 'websocket.close':
+            return False, response.get('code', 1000)
+        return True, None
+
+    async def receive_json_from(self, timeout=1):
+        response = await self.receive_output(timeout)
+        return json.loads(response['text'])
+
+    async def disconnect(self):
+        await self.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await self.wait(1)
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class ProgressPushLoadTests(SimpleTestCase):
+
+    async def _connect(self, user_id):
+        communicator = WebsocketClient(SimpleNamespace(id=user_id, is_authenticated=True))
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_anonymous_is_rejected(self):
+        communicator = WebsocketClient(SimpleNamespace(id=None, is_authenticated=False))
+        connected, code = await communicator.connect()
+        self.assertFalse(connected)
+        self.assertEqual(code, 4401)
+
+    async def _fan_out(self):
+        """推送 CLIENTS × UPDATES 条消息并校验，返回耗时（秒）"""
+        channel_layer = get_channel_layer()
+        communicators = [await self._connect(i) for i in range(CLIENTS)]
+        try:
+            started = time.perf_counter()
+            for step in range(UPDATES):
+                for i in range(CLIENTS):
+                    await channel_layer.group_send(user_group_name(i), {
+                        'type': 'progress.update',
+                        'kind': 'tts_order',
+                        'data': {'id': str(i), 'status': {'progress': step}},
+                    })
+                received = await asyncio.gather(*(c.receive_json_from(timeout=5) for c in communicators))
+                for i, message in enumerate(received):
+                    self.assertEqual(message['data'], {'id': str(i), 'status': {'progress': step}})
+            elapsed = time.perf_counter() - started
+            # 每个连接只收到自己的消息
+            for communicator in communicators:
+                self.assertTrue(await communicator.receive_nothing())
+        finally:
+            for communicator in communicators:
+                await communicator.disconnect()
+        return elapsed
+
+    async def test_push_fan_out(self):
+        await self._fan_out()
+
+    @benchmark
+    async def test_push_throughput(self):
+        elapsed = await self._fan_out()
+        delivered = CLIENTS * UPDATES
+        logger.info(f"push: {delivered} updates to {CLIENTS} clients in {elapsed:.2f}s "
+                    f"({delivered / elapsed:.0f}/s), 0 HTTP polls (polling needs >= {delivered})")
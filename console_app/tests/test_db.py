@@ -0,0 +1,118 @@
+"""
+retry_on_locked：每次尝试在事务中执行，重试不会留下重复写入；并发回调压力测试
+"""
+import random
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.db import OperationalError, connections, transaction
+from django.test import Client, TransactionTestCase, override_settings
+
+from console_app.db import retry_on_locked
+from console_app.models import OutboxMessage, TTSOrder, TTSOrderState
+from console_app.tests.benchmark import benchmark, logger
+
+THREADS = 8
+ORDERS = 5
+STEPS = 20
+
+
+@override_settings(DB_LOCKED_RETRIES=5, DB_LOCKED_RETRY_BACKOFF=0.001)
+class RetryOnLockedTests(TransactionTestCase):
+
+    def test_retry_rolls_back_partial_writes(self):
+        calls = []
+
+        @retry_on_locked
+        def create_then_fail():
+            calls.append(1)
+            OutboxMessage.objects.create(task_name='t', payload={}, idempotency_key=f"k{len(calls)}")
+            if len(calls) < 3:
+                raise OperationalError('database is locked')
+            return len(calls)
+
+        self.assertEqual(create_then_fail(), 3)
+        # 前两次尝试的写入随事务回滚
+        self.assertEqual(list(OutboxMessage.objects.values_list('idempotency_key', flat=True)), ['k3'])
+
+    def test_no_retry_inside_outer_transaction(self):
+        calls = []
+
+        @retry_on_locked
+        def fail():
+            calls.append(1)
+            raise OperationalError('database is locked')
+
+        with self.assertRaises(OperationalError):
+            with transaction.atomic():
+                fail()
+        self.assertEqual(len(calls), 1)
+
+    def test_other_errors_are_not_retried(self):
+        calls = []
+
+        @retry_on_locked
+        def fail():
+            calls.append(1)
+            raise OperationalError('no such table: x')
+
+        with self.assertRaises(OperationalError):
+            fail()
+        self.assertEqual(len(calls), 1)
+
+
+@override_settings(TTS_CALLBACK_COALESCE_INTERVAL=0, DB_LOCKED_RETRIES=10, DB_LOCKED_RETRY_BACKOFF=0.005)
+class ConcurrentCallbackStressTests(TransactionTestCase):
+
+    def _run_callbacks(self):
+        """THREADS 个线程并发回调，校验结果，返回耗时（秒）"""
+        owner = User.objects.create_user('alice')
+        orders = [TTSOrder.objects.create(text='你好', spk_id='spk', owner=owner) for _ in range(ORDERS)]
+        errors = []
+        responses = []
+        barrier = threading.Barrier(THREADS)
+
+        def worker():
+            client = Client()
+            updates = [(order.id, step) for order in orders for step in range(1, STEPS + 1)]
+            random.shuffle(updates)
+            try:
+                barrier.wait()
+                for order_id, step in updates:
+                    response = client.post(
+                        f'/tts/orders/{order_id}/callback/',
+                        {'state': TTSOrderState.HANDLING, 'status': {'progress': step}},
+                        content_type='application/json',
+                    )
+                    responses.append(response.status_code)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        total = THREADS * ORDERS * STEPS
+        self.assertEqual(errors, [])
+        self.assertEqual(len(responses), total)
+        self.assertEqual(set(responses), {200})
+        for order in TTSOrder.objects.all():
+            self.assertEqual(order.state, TTSOrderState.HANDLING)
+            self.assertEqual(order.status['progress'], STEPS)
+        return elapsed
+
+    def test_concurrent_progress_callbacks(self):
+        self._run_callbacks()
+
+    @benchmark
+    def test_callback_throughput(self):
+        elapsed = self._run_callbacks()
+        total = THREADS * ORDERS * STEPS
+        logger.info(f"{total} concurrent callbacks from {THREADS} threads in {elapsed:.2f}s ({total / elapsed:.0f}/s)")
@@ -0,0 +1,95 @@
+"""
+同步出站 HTTP 连接池：本地假上游统计 TCP 连接数；基准对比每次新建 Session
+"""
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+
+from console_app import http_client
+from console_app.tests.benchmark import benchmark, logger
+
+N = 100
+
+
+class StubUpstream(ThreadingHTTPServer):
+    """keep-alive 的假上游，记录建立的 TCP 连接数"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        self.connections = 0
+        super().__init__(('127.0.0.1', 0), StubHandler)
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/ping"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # 响应头与响应体分两次写出，keep-alive 连接上避免 Nagle 与延迟 ACK 叠加的 40ms 等待
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PooledSessionTests(SimpleTestCase):
+
+    def setUp(self):
+        self.server = StubUpstream()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        # 假上游为 http，oauthlib 默认只允许 https
+        patcher = mock.patch.dict(os.environ, {'OAUTHLIB_INSECURE_TRANSPORT': '1'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sessions_share_one_connection(self):
+        for _ in range(3):
+            session = http_client.oauth2_session('client-id')
+            for _ in range(5):
+                self.assertEqual(session.get(self.server.url).text, 'ok')
+        self.assertEqual(self.server.connections, 1)
+
+    def test_adapter_is_shared_per_host_with_default_timeout(self):
+        adapter = http_client.get_adapter(self.server.url)
+        self.assertIs(http_client.get_adapter(self.server.url.upper().replace('/PING', '/other')), adapter)
+        self.assertIsNotNone(adapter.default_timeout)
+
+    def _measure(self, get):
+        get(self.server.url)  # 预热
+        started = time.perf_counter()
+        for _ in range(N):
+            get(self.server.url)
+        return (time.perf_counter() - started) / N
+
+    @benchmark
+    def test_request_latency(self):
+        def new_session_get(url):
+            with requests.Session() as session:
+                return session.get(url)
+
+        before = self._measure(new_session_get)
+        connections = self.server.connections
+        after = self._measure(http_client.oauth2_session('client-id').get)
+        logger.info(
+            f"upstream GET: new session {before * 1000:.3f} ms, pooled {after * 1000:.3f} ms; "
+            f"connections opened {connections} vs {self.server.connections - connections}"
+        )
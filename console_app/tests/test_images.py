@@ -0,0 +1,200 @@
+"""
+讲师照片处理：Base64JSONBody 流式编码与一次性编码结果一致；20MB 上传的内存峰值
+"""
+import base64
+import io
+import json
+import os
+import resource
+import shutil
+import tempfile
+import time
+import tracemalloc
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
+from PIL import Image
+
+from console_app import images, views
+from console_app.images import Base64JSONBody, InvalidImage, normalize_image
+from console_app.models import Speaker, Voice
+from console_app.tests.benchmark import benchmark, logger
+
+UPLOAD_SIZE = 20 * 1024 * 1024
+
+
+def _jpeg(size, noise=False):
+    if noise:
+        image = Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3))
+    else:
+        image = Image.new('RGB', size, (200, 120, 80))
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=100 if noise else 90)
+    return buffer.getvalue()
+
+
+class Base64JSONBodyTests(TestCase):
+
+    def _body(self, *contents):
+        return Base64JSONBody([(f"image{i}", io.BytesIO(content)) for i, content in enumerate(contents, 1)])
+
+    def _expected(self, *contents):
+        return json.dumps({
+            f"image{i}": base64.b64encode(content).decode() for i, content in enumerate(contents, 1)
+        }).encode()
+
+    def test_matches_json_dumps(self):
+        # 跨越分块边界、需要补齐 = 的各种长度
+        chunk = images._B64_CHUNK
+        for sizes in [(0,), (1,), (2, 3), (chunk - 1, chunk, chunk + 1), (2 * chunk + 2, 5)]:
+            contents = [os.urandom(size) for size in sizes]
+            body = self._body(*contents)
+            data = body.read()
+            self.assertEqual(data, self._expected(*contents), sizes)
+            self.assertEqual(len(body), len(data), sizes)
+            self.assertEqual(body.read(), b'')
+
+    def test_partial_reads(self):
+        contents = [os.urandom(images._B64_CHUNK + 7), os.urandom(1000)]
+        body = self._body(*contents)
+        parts = []
+        while True:
+            part = body.read(4096)
+            if not part:
+                break
+            self.assertLessEqual(len(part), 4096)
+            parts.append(part)
+        decoded = json.loads(b''.join(parts))
+        self.assertEqual(base64.b64decode(decoded['image1']), contents[0])
+        self.assertEqual(base64.b64decode(decoded['image2']), contents[1])
+
+    def test_rereads_files_from_start(self):
+        # 401 后重试会用同一个文件再生成一次请求体
+        fileobj = io.BytesIO(b'portrait')
+        fileobj.read()
+        self.assertEqual(Base64JSONBody([('image1', fileobj)]).read(), self._expected(b'portrait'))
+        self.assertEqual(Base64JSONBody([('image1', fileobj)]).read(), self._expected(b'portrait'))
+
+
+class NormalizeImageTests(TestCase):
+
+    def test_downsizes_and_converts(self):
+        image = Image.new('RGBA', (3000, 1500), (0, 0, 0, 0))
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        buffer.seek(0)
+        with normalize_image(buffer, 1000) as output, Image.open(output) as result:
+            self.assertEqual((result.format, result.mode, result.size), ('JPEG', 'RGB', (1000, 500)))
+
+    def test_applies_exif_orientation(self):
+        image = Image.new('RGB', (300, 100))
+        exif = image.getexif()
+        exif[0x0112] = 6  # 顺时针旋转 90°
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', exif=exif.tobytes())
+        buffer.seek(0)
+        with normalize_image(buffer, 1000) as output, Image.open(output) as result:
+            self.assertEqual(result.size, (100, 300))
+
+    def test_invalid_image(self):
+        with self.assertRaises(InvalidImage):
+            normalize_image(io.BytesIO(b'not an image'), 1000)
+
+
+class _FaceCompareSession:
+    """模拟人脸比对接口：像网络发送一样分块读取请求体"""
+
+    def __init__(self):
+        self.body_size = 0
+
+    def post(self, url, headers, data):
+        while True:
+            chunk = data.read(64 * 1024)
+            if not chunk:
+                break
+            self.body_size += len(chunk)
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {'data': {'confidence': 0.9, 'thresholds': {'1e-4': 0.5}}}
+        return response
+
+
+@override_settings(FACE_VERIFY_ENABLED=True, SPEAKER_PORTRAIT_MAX_SIDE=1920)
+class PortraitUploadMemoryBenchmark(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = override_settings(MEDIA_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user('alice')
+        self.voice = Voice.objects.create(title='v', description='')
+
+    def _upload(self):
+        """约 20MB 的 JPEG（噪声图，压缩率低）"""
+        side = 2048
+        while True:
+            data = _jpeg((side, side), noise=True)
+            if len(data) >= UPLOAD_SIZE:
+                return data
+            side = int(side * (UPLOAD_SIZE / len(data)) ** 0.5) + 64
+
+    def _request(self, upload):
+        request = RequestFactory().post('/speakers/', {
+            'portrait': SimpleUploadedFile('portrait.jpg', upload, content_type='image/jpeg'),
+            'voice': str(self.voice.id),
+            'name': 'speaker',
+            'description': '',
+        })
+        request.user = self.user
+        request.session = {'oauth2_token': {'access_token': 'token'}}
+        request._dont_enforce_csrf_checks = True
+        return request
+
+    @staticmethod
+    def _legacy(upload, user_photo):
+        """改造前的做法：整个文件读入内存，base64 后拼接成 JSON 字符串"""
+        body = json.dumps({
+            'image1': base64.b64encode(upload).decode(),
+            'image2': base64.b64encode(user_photo).decode(),
+        })
+        return len(body)
+
+    @benchmark
+    def test_20mb_upload_memory(self):
+        upload = self._upload()
+        user_photo = _jpeg((1200, 1600))
+        session = _FaceCompareSession()
+
+        async def fetch_user_photo(username, access_token):
+            return mock.Mock(status_code=200, content=user_photo)
+
+        request = self._request(upload)
+        # tracemalloc 只统计 Python 对象，Pillow 的解码缓冲区另看进程 RSS 峰值的增长
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        with mock.patch.object(views.SpeakersView, '_fetch_user_photo', staticmethod(fetch_user_photo)), \
+                mock.patch.object(views, 'service_session', return_value=session):
+            tracemalloc.start()
+            start = time.perf_counter()
+            response = views.SpeakersView.as_view()(request)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        rss_growth = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) * 1024
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertTrue(Speaker.objects.filter(name='speaker').exists())
+
+        tracemalloc.start()
+        legacy_size = self._legacy(upload, user_photo)
+        _, legacy_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        mb = 1024 * 1024
+        logger.info(
+            f"POST /speakers/ with a {len(upload) / mb:.1f}MB portrait: {elapsed:.2f}s, Python peak {peak / mb:.1f}MB, "
+            f"max RSS +{rss_growth / mb:.1f}MB, "
+            f"face-compare body {session.body_size / mb:.2f}MB; "
+            f"in-memory base64 JSON of the same files: peak {legacy_peak / mb:.1f}MB, body {legacy_size / mb:.1f}MB"
+        )
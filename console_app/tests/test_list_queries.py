@@ -0,0 +1,59 @@
+"""
+列表接口查询次数：?expand= 的嵌套关联一次性加载，查询次数不随行数增长
+"""
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from console_app.models import Avatar, AvatarAction, ResourceType, Seminar, Speaker, Voice
+
+# 目录缓存停用，每次请求都实际查询
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+@override_settings(CACHES=NO_CACHE)
+class ListQueryCountTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _add_rows(self, count):
+        for i in range(count):
+            voice = Voice.objects.create(title=f"voice-{i}", description='')
+            avatar = Avatar.objects.create(name=f"avatar-{i}", owner=self.user, type=ResourceType.USER)
+            AvatarAction.objects.create(avatar=avatar, type='silent')
+            AvatarAction.objects.create(avatar=avatar, type='talking')
+            speaker = Speaker.objects.create(name=f"speaker-{i}", description='', avatar=avatar, voice=voice, owner=self.user)
+            Seminar.objects.create(title=f"seminar-{i}", description='', owner=self.user, speaker=speaker)
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(queries)
+
+    def _assert_constant(self, url):
+        self._add_rows(2)
+        few = self._count_queries(url)
+        self._add_rows(8)
+        many = self._count_queries(url)
+        self.assertEqual(few, many, f"{url}: {few} queries for 2 rows, {many} for 10")
+
+    def test_seminars(self):
+        self._assert_constant('/seminars/?size=50')
+
+    def test_seminars_expand_speaker(self):
+        self._assert_constant('/seminars/?size=50&expand=speaker.avatar.actions,speaker.voice')
+
+    def test_speakers_expand(self):
+        self._assert_constant('/speakers/?size=50&expand=avatar.actions,voice')
+
+    def test_avatars_expand_actions(self):
+        self._assert_constant('/avatars/?size=50&expand=actions')
+
+    def test_cursor_pagination(self):
+        self._assert_constant('/seminars/?pagination=cursor&size=50&expand=speaker')
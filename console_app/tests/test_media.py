@@ -0,0 +1,66 @@
+"""
+媒体文件访问：路径规范化防止越权访问，序列化输出检查权限的 /media/ 地址
+"""
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from console_app import media
+from console_app.models import Avatar, ResourceType, TTSOrder
+from console_app.serializers import AvatarListSerializer, TTSOrderSerializer
+
+
+class MediaAccessTests(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = override_settings(MEDIA_ROOT=self.root, MEDIA_ACCEL_REDIRECT_PREFIX='')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        for username in ('alice', 'bob'):
+            os.makedirs(os.path.join(self.root, 'avatars', username))
+            with open(os.path.join(self.root, 'avatars', username, 'x.jpg'), 'wb') as f:
+                f.write(username.encode())
+        self.alice = User.objects.create_user('alice')
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def test_own_files(self):
+        response = self.client.get('/media/avatars/alice/x.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'alice')
+
+    def test_traversal_is_rejected(self):
+        for path in (
+            '/media/avatars/alice/../bob/x.jpg',
+            '/media/avatars/alice/..%2Fbob/x.jpg',
+            '/media/avatars/alice/%2E%2E/bob/x.jpg',
+            '/media/avatars/alice/./../bob/x.jpg',
+            '/media/avatars/alice//../bob/x.jpg',
+        ):
+            self.assertEqual(self.client.get(path).status_code, 404, path)
+        self.assertEqual(self.client.get('/media/avatars/bob/x.jpg').status_code, 404)
+
+    def test_unsafe_names(self):
+        for name in ('', '/etc/passwd', 'avatars/alice/../bob/x.jpg', 'avatars//alice/x.jpg', './x.jpg', 'a\\..\\b'):
+            self.assertFalse(media.is_safe_name(name), name)
+        self.assertTrue(media.is_safe_name('avatars/alice/x.jpg'))
+        self.assertFalse(media.can_access(User(username='root', is_staff=True), 'avatars/alice/../../x'))
+
+    def test_serializers_use_media_endpoint(self):
+        avatar = Avatar(name='a', owner=self.alice, type=ResourceType.USER)
+        avatar.portrait.save('a.png', ContentFile(b'png'), save=False)
+        data = AvatarListSerializer(avatar).data
+        self.assertEqual(data['portrait'], f"/media/{avatar.portrait.name}")
+        self.assertTrue(all(url.startswith('/media/') for url in data['thumbnails'].values()))
+
+        order = TTSOrder(text='你好', spk_id='spk', owner=self.alice)
+        self.assertIsNone(TTSOrderSerializer(order).data['audio_url'])
+        order.output_file = 'tts/out.wav'
+        self.assertEqual(TTSOrderSerializer(order).data['audio_url'], f"/tts/orders/{order.id}/audio/")
@@ -0,0 +1,141 @@
+"""
+登录用户缓存中间件：同时支持同步与异步请求，ASGI 下不切换为同步链；
+USER_CACHE_TTL=0 与 >0 时 /seminars/ 每个请求的查询次数
+"""
+import time
+from unittest import mock
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib import auth
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import connection
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from console_app import middleware
+from console_app.models import Seminar, Speaker
+from console_app.user_cache import UserCache
+from console_app.tests.benchmark import benchmark, logger
+
+# 与 settings 中 USER_CACHE_TTL > 0 时的顺序一致
+CACHED_USER_MIDDLEWARE = [*settings.MIDDLEWARE]
+CACHED_USER_MIDDLEWARE.insert(
+    CACHED_USER_MIDDLEWARE.index('django.contrib.auth.middleware.AuthenticationMiddleware') + 1,
+    'console_app.middleware.CachedUserMiddleware',
+)
+# 目录缓存停用，只比较查询 auth_user 的差别
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class CachedUserMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        session = SessionStore()
+        session[auth.SESSION_KEY] = str(self.user.pk)
+        session[auth.BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        session[auth.HASH_SESSION_KEY] = self.user.get_session_auth_hash()
+        session.create()
+        self.session_key = session.session_key
+        self.cache = UserCache(60)
+        patcher = mock.patch.object(middleware, 'get_user_cache', return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _request(self, factory):
+        request = factory.get('/')
+        request.session = SessionStore(self.session_key)
+        return request
+
+    def _cached(self):
+        return self.cache.get(self.session_key, str(self.user.pk), self.user.get_session_auth_hash())
+
+    def test_async_chain(self):
+        async def view(request):
+            user = await request.auser()
+            return HttpResponse(user.username)
+
+        handler = middleware.CachedUserMiddleware(view)
+        self.assertTrue(iscoroutinefunction(handler))
+        response = async_to_sync(handler)(self._request(AsyncRequestFactory()))
+        self.assertEqual(response.content, b'alice')
+        self.assertEqual(self._cached().pk, self.user.pk)
+
+    def test_sync_chain(self):
+        handler = middleware.CachedUserMiddleware(lambda request: HttpResponse(request.user.username))
+        self.assertFalse(iscoroutinefunction(handler))
+        self.assertEqual(handler(self._request(RequestFactory())).content, b'alice')
+        self.assertEqual(self._cached().pk, self.user.pk)
+
+    def test_replica_middleware_is_async_capable(self):
+        async def view(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(middleware.ReplicaRoutingMiddleware(view)))
+
+
+@override_settings(CACHES=NO_CACHE)
+class SeminarsQueryCountTests(TestCase):
+    """同一会话连续请求 /seminars/：TTL=0 每次查询 auth_user，TTL>0 只有首次查询"""
+
+    REQUESTS = 200
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        speaker = Speaker.objects.create(name='s', description='', owner=self.user)
+        for i in range(10):
+            Seminar.objects.create(title=f"seminar-{i}", description='', owner=self.user, speaker=speaker)
+        patcher = mock.patch.object(middleware, 'get_user_cache', return_value=UserCache(60))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _client(self):
+        # 测试客户端在首次请求时构建中间件链，切换 MIDDLEWARE 后需要新的客户端
+        client = Client()
+        client.force_login(self.user)
+        return client
+
+    def _get(self, client):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/seminars/')
+        self.assertEqual(response.status_code, 200, response.content)
+        return [q['sql'] for q in queries]
+
+    def _auth_user_queries(self, sqls):
+        return [sql for sql in sqls if 'FROM "auth_user"' in sql]
+
+    def _counts(self, middleware_setting):
+        with override_settings(MIDDLEWARE=middleware_setting):
+            client = self._client()
+            return [self._get(client) for _ in range(3)]
+
+    def test_ttl_zero_queries_user_every_request(self):
+        for sqls in self._counts(settings.MIDDLEWARE):
+            self.assertEqual(len(self._auth_user_queries(sqls)), 1)
+
+    def test_ttl_saves_user_query_after_first_request(self):
+        uncached = self._counts(settings.MIDDLEWARE)
+        first, *rest = self._counts(CACHED_USER_MIDDLEWARE)
+        self.assertEqual(len(first), len(uncached[0]))
+        for sqls in rest:
+            self.assertEqual(self._auth_user_queries(sqls), [])
+            self.assertEqual(len(sqls), len(uncached[0]) - 1)
+
+    @benchmark
+    def test_queries_per_request(self):
+        for name, middleware_setting in [('USER_CACHE_TTL=0', settings.MIDDLEWARE), ('USER_CACHE_TTL=60', CACHED_USER_MIDDLEWARE)]:
+            with override_settings(MIDDLEWARE=middleware_setting):
+                client = self._client()
+                self._get(client)
+                total = 0
+                start = time.perf_counter()
+                for _ in range(self.REQUESTS):
+                    total += len(self._get(client))
+                elapsed = time.perf_counter() - start
+            logger.info(
+                f"GET /seminars/ [{name}]: {total / self.REQUESTS:.2f} queries/request, "
+                f"{self.REQUESTS / elapsed:.0f} requests/s"
+            )
@@ -0,0 +1,66 @@
+"""
+outbox relay：认领、整批发送失败、建表命令
+"""
+import io
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from console_app import outbox, search, tasks
+from console_app.models import OutboxMessage, OutboxState
+
+
+@override_settings(OUTBOX_CLAIM_SECONDS=60, OUTBOX_MAX_ATTEMPTS=3, OUTBOX_RETRY_BACKOFF=1.0)
+class RelayTests(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(tasks, '_broker_url', return_value='memory://')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        tasks.reset_celery_app()
+        self.addCleanup(tasks.reset_celery_app)
+        for i in range(3):
+            outbox.enqueue(tasks.TTS_ORDER_CREATED_TASK, {'id': str(i)}, f"test:{i}")
+
+    def test_claimed_messages_are_not_claimed_again(self):
+        now = timezone.now()
+        first = outbox._claim(10, now)
+        second = outbox._claim(10, now)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(second, [])
+
+    def test_relays_do_not_publish_twice(self):
+        with mock.patch.object(outbox, 'send_tasks_batch', return_value={}) as send:
+            outbox.relay_pending(10)
+            outbox.relay_pending(10)
+        sent = [key for call in send.call_args_list for key, *_ in call.args[0]]
+        self.assertEqual(len(sent), 3)
+        self.assertEqual(len(set(sent)), 3)
+        self.assertEqual(OutboxMessage.objects.filter(state=OutboxState.SENT).count(), 3)
+
+    def test_batch_failure_counts_as_attempt(self):
+        with mock.patch.object(outbox, 'send_tasks_batch', side_effect=ConnectionError('broker down')):
+            self.assertEqual(outbox.relay_pending(10), 3)
+        for m in OutboxMessage.objects.all():
+            self.assertEqual(m.state, OutboxState.PENDING)
+            self.assertEqual(m.attempts, 1)
+            self.assertEqual(m.last_error, 'broker down')
+            self.assertGreater(m.available_at, timezone.now())
+
+
+class CreateConsoleTablesTests(TestCase):
+
+    def test_existing_tables_are_skipped(self):
+        out = io.StringIO()
+        call_command('create_console_tables', stdout=out)
+        self.assertIn('0 tables created', out.getvalue())
+
+    def test_sql_includes_search_index(self):
+        out = io.StringIO()
+        call_command('create_console_tables', '--sql', stdout=out)
+        # 表都已存在时只输出搜索索引的 DDL（IF NOT EXISTS）
+        self.assertEqual(out.getvalue().splitlines(), [f"{s};" for s in search.index_ddl(connection)])
+        self.assertIn(f"CREATE VIRTUAL TABLE IF NOT EXISTS {search.TABLE}", out.getvalue())
@@ -0,0 +1,122 @@
+"""
+游标分页：按 (date, id) 组合键定位，相同 date 的行既不重复也不遗漏；基准对比深页 OFFSET
+"""
+import base64
+import datetime
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from console_app.models import Avatar, ResourceType, Seminar
+from console_app.tests.benchmark import benchmark, logger
+
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+@override_settings(CACHES=NO_CACHE)
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _seminars(self, count, dates=None):
+        Seminar.objects.bulk_create([
+            Seminar(title=f"微课 {i}", description='', owner=self.user) for i in range(count)
+        ])
+        if dates is not None:
+            for seminar, date in zip(Seminar.objects.order_by('id'), dates):
+                Seminar.objects.filter(id=seminar.id).update(date=date)
+
+    def _expected(self):
+        return [str(pk) for pk in Seminar.objects.order_by('-date', 'id').values_list('id', flat=True)]
+
+    def _walk(self, url, key='next'):
+        ids, pages = [], 0
+        while url:
+            data = self.client.get(url).json()['data']
+            ids.extend(item['id'] for item in data['results'])
+            url = data[key]
+            pages += 1
+        return ids, pages, data
+
+    def test_walk_with_tied_dates(self):
+        # 相同 date 的行跨越页边界：只按 date 定位会重复或遗漏
+        now = timezone.now()
+        dates = [now - datetime.timedelta(hours=i // 7) for i in range(25)]
+        self._seminars(25, dates)
+        ids, pages, _ = self._walk('/seminars/?pagination=cursor&size=4')
+        self.assertEqual(ids, self._expected())
+        self.assertEqual(pages, 7)
+
+        # 游标只记录位置，不使用 OFFSET
+        next_url = self.client.get('/seminars/?pagination=cursor&size=4').json()['data']['next']
+        cursor = parse_qs(urlsplit(next_url).query)['cursor'][0]
+        self.assertNotIn('o', parse_qs(base64.b64decode(cursor).decode()))
+
+    def test_walk_back_with_previous(self):
+        now = timezone.now()
+        self._seminars(12, [now] * 12)
+        ids, _, last = self._walk('/seminars/?pagination=cursor&size=5')
+        back, _, _ = self._walk(last['previous'], key='previous')
+        # 从最后一页往回：前面各页按页倒序拼接
+        self.assertEqual(back, ids[5:10] + ids[0:5])
+
+    def test_count_is_optional(self):
+        self._seminars(3)
+        data = self.client.get('/seminars/?pagination=cursor').json()['data']
+        self.assertNotIn('count', data)
+        data = self.client.get('/seminars/?pagination=cursor&count=1').json()['data']
+        self.assertEqual(data['count'], 3)
+        self.assertIsNone(data['next'])
+
+    def test_invalid_cursor(self):
+        for cursor in ('garbage', 'cD1ub3QtanNvbg==', 'cD0lNUIlMjJ4JTIyJTVE'):
+            response = self.client.get('/seminars/', {'pagination': 'cursor', 'cursor': cursor})
+            self.assertEqual(response.status_code, 404, cursor)
+
+    def test_avatars_by_id(self):
+        for i in range(7):
+            Avatar.objects.create(name=f"avatar-{i}", owner=self.user, type=ResourceType.USER)
+        ids, _, _ = self._walk('/avatars/?pagination=cursor&size=3')
+        self.assertEqual(ids, [str(pk) for pk in Avatar.objects.order_by('id').values_list('id', flat=True)])
+
+
+@override_settings(CACHES=NO_CACHE)
+class PaginationBenchmark(TestCase):
+    ROWS = 20000
+    SIZE = 20
+
+    @benchmark
+    def test_deep_page_latency(self):
+        user = User.objects.create_user('alice')
+        client = APIClient()
+        client.force_authenticate(user)
+        Seminar.objects.bulk_create(
+            [Seminar(title=f"微课 {i}", description='', owner=user) for i in range(self.ROWS)], batch_size=1000
+        )
+
+        last_page = self.ROWS // self.SIZE
+        started = time.perf_counter()
+        client.get('/seminars/', {'size': self.SIZE, 'page': last_page})
+        offset_elapsed = time.perf_counter() - started
+
+        # 游标分页走到同样深度需要逐页前进，这里只测量单页请求的耗时
+        url = f'/seminars/?pagination=cursor&size={self.SIZE}'
+        timings = []
+        for _ in range(last_page):
+            started = time.perf_counter()
+            url = client.get(url).json()['data']['next']
+            timings.append(time.perf_counter() - started)
+            if url is None:
+                break
+        logger.info(
+            f"{self.ROWS} seminars, page size {self.SIZE}: last page via OFFSET {offset_elapsed * 1000:.1f} ms, "
+            f"cursor page first {timings[0] * 1000:.1f} ms / last {timings[-1] * 1000:.1f} ms "
+            f"({len(timings)} pages)"
+        )
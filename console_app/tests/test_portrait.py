@@ -0,0 +1,62 @@
+"""
+用户头像响应头：真实头像按 PORTRAIT_CACHE_TTL 缓存，默认头像不缓存，均按 Cookie 区分
+"""
+from contextlib import asynccontextmanager
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from console_app import views
+from console_app.portrait_cache import LocMemPortraitBackend, make_entry
+
+
+@override_settings(PORTRAIT_CACHE_TTL=3600)
+class PortraitResponseTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        self.client.force_login(self.user)
+        self.cache = LocMemPortraitBackend(1024 * 1024)
+        patcher = mock.patch.object(views, 'get_portrait_cache', return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _login_oauth2(self):
+        session = self.client.session
+        session['oauth2_token'] = {'access_token': 'token', 'expires_at': 2 ** 31}
+        session.save()
+
+    def test_default_portrait_is_not_cached(self):
+        response = self.client.get('/user/me/portrait/')
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertNotIn('max-age=3600', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_upstream_failure_is_not_cached(self):
+        self._login_oauth2()
+        client = mock.Mock()
+        client.get = mock.AsyncMock(side_effect=ConnectionError('upstream down'))
+
+        @asynccontextmanager
+        async def upstream_client(request=None):
+            yield client
+
+        with mock.patch.object(views, 'upstream_client', upstream_client):
+            response = self.client.get('/user/me/portrait/')
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIsNone(self.cache.get('alice'))
+
+    def test_cached_portrait_uses_ttl(self):
+        self._login_oauth2()
+        self.cache.set('alice', make_entry(b'\x89PNG', 'image/png', 3600))
+        response = self.client.get('/user/me/portrait/')
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('max-age=3600', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+
+        revalidated = self.client.get('/user/me/portrait/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
@@ -0,0 +1,98 @@
+"""
+读写分离：主库与副本是两个独立的库（见 test_runner），按读到的数据判断请求走了哪个库
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import include, path
+from rest_framework.views import APIView
+
+from console_app import db
+from console_app.models import Seminar, Speaker
+from console_app.middleware import PRIMARY_STICKY_COOKIE
+from console_app.views import MyResponse
+
+
+class UnflaggedSeminarsView(APIView):
+    """未设置 read_replica 的只读视图"""
+
+    def get(self, request):
+        return MyResponse(data=list(Seminar.objects.order_by('title').values_list('title', flat=True)))
+
+
+class FailingReplicaView(APIView):
+    read_replica = True
+
+    def get(self, request):
+        raise RuntimeError('boom')
+
+
+urlpatterns = [
+    path('test/unflagged/', UnflaggedSeminarsView.as_view()),
+    path('test/failing/', FailingReplicaView.as_view()),
+    path('', include('console_app.urls')),
+]
+
+
+@override_settings(
+    ROOT_URLCONF='console_app.tests.test_replica',
+    DATABASE_ROUTERS=['console_app.db.ReplicaRouter'],
+    MIDDLEWARE=[*settings.MIDDLEWARE, 'console_app.middleware.ReplicaRoutingMiddleware'],
+    DB_REPLICA_STICKY_SECONDS=60,
+)
+class ReplicaRoutingTests(TestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        User.objects.using('replica').create(id=self.user.id, username='alice')
+        self.speaker = Speaker.objects.create(name='s', description='', owner=self.user)
+        self.primary = Seminar.objects.create(title='primary', description='', owner=self.user)
+        self.replica_only = Seminar(title='replica', description='', owner_id=self.user.id)
+        Seminar.objects.using('replica').bulk_create([self.replica_only])
+        self.client.force_login(self.user)
+
+    def _titles(self, url='/seminars/'):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()['data']
+        titles = data['results'] if isinstance(data, dict) else data
+        return sorted(t if isinstance(t, str) else t['title'] for t in titles)
+
+    def test_flagged_get_reads_replica(self):
+        self.assertEqual(self._titles(), ['replica'])
+        self.assertFalse(db._use_replica.get())
+
+    def test_unflagged_view_reads_primary(self):
+        self.assertEqual(self._titles('/test/unflagged/'), ['primary'])
+
+    def test_write_reads_primary_and_pins_reads(self):
+        # 写请求内的读取（检查微课是否存在）走主库：副本中的微课对主库不可见
+        response = self.client.post('/generation_orders/', {'seminar': str(self.replica_only.id)})
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn(PRIMARY_STICKY_COOKIE, response.cookies)
+
+        response = self.client.post('/seminars/', {'title': 'new', 'speaker': str(self.speaker.id)})
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertIn(PRIMARY_STICKY_COOKIE, response.cookies)
+        self.assertFalse(Seminar.objects.using('replica').filter(title='new').exists())
+
+        # 写入后客户端带着 cookie，读请求固定读主库，能读到刚写入的数据
+        self.assertEqual(self._titles(), ['new', 'primary'])
+
+        self.client.cookies.pop(PRIMARY_STICKY_COOKIE)
+        self.assertEqual(self._titles(), ['replica'])
+
+    def test_flag_restored_after_view_error(self):
+        self.client.raise_request_exception = False
+        response = self.client.get('/test/failing/')
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(db._use_replica.get())
+        self.assertEqual(self._titles('/test/unflagged/'), ['primary'])
+
+    async def test_async_request_reads_replica(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get('/seminars/')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([s['title'] for s in response.json()['data']['results']], ['replica'])
+        self.assertFalse(db._use_replica.get())
@@ -0,0 +1,148 @@
+"""
+微课搜索索引：分批对账、索引内计数与分页；10 万行基准
+"""
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Q
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from console_app import search
+from console_app.models import Seminar
+from console_app.tests.benchmark import benchmark, logger
+
+BENCHMARK_ROWS = 100_000
+WORDS = ['机器学习', '深度学习', '数据分析', '产品设计', '市场营销', '项目管理', '财务报表', '沟通技巧', '英语口语', '摄影入门']
+
+
+class SearchIndexTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _seminar(self, title, description='', state='empty'):
+        return Seminar.objects.create(title=title, description=description, owner=self.user, state=state)
+
+    def test_rebuild_only_writes_changes(self):
+        seminars = [self._seminar(f"微课 {i}") for i in range(7)]
+        stats = search.rebuild_index(batch_size=3)
+        self.assertEqual(stats, {'checked': 7, 'updated': 0, 'removed': 0})
+
+        # geminar-admin 直接写库：修改、删除都不会触发信号
+        Seminar.objects.filter(id=seminars[0].id).update(title='改过的标题')
+        Seminar.objects.filter(id=seminars[1].id)._raw_delete(connection.alias)
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {search.TABLE} WHERE seminar_id = %s", [seminars[2].id.hex])
+
+        stats = search.rebuild_index(batch_size=3)
+        self.assertEqual(stats, {'checked': 6, 'updated': 2, 'removed': 1})
+        self.assertEqual(search.rebuild_index(batch_size=3)['updated'], 0)
+        results = search.search_seminars(self.user.id, '改过的', Seminar.objects.filter(owner=self.user))
+        self.assertEqual([s.id for s in results[0:10]], [seminars[0].id])
+
+    def test_rebuild_replaces_misplaced_rows(self):
+        seminar = self._seminar('机器学习入门')
+        # 按自增 rowid 写入的旧索引行，以及同一微课的重复行
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {search.TABLE}")
+            for _ in range(2):
+                cursor.execute(
+                    f"INSERT INTO {search.TABLE} (seminar_id, owner_id, title, description) VALUES (%s, %s, %s, '')",
+                    [seminar.id.hex, self.user.id, seminar.title]
+                )
+
+        self.assertEqual(search.rebuild_index()['updated'], 1)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT rowid FROM {search.TABLE}")
+            self.assertEqual(cursor.fetchall(), [(search._rowid(seminar.id),)])
+
+        seminar.title = '深度学习入门'
+        seminar.save()
+        self.assertEqual(search.search_seminars(self.user.id, '深度学习', Seminar.objects.all()).count(), 1)
+        self.assertEqual(search.search_seminars(self.user.id, '机器学习', Seminar.objects.all()).count(), 0)
+
+    def test_search_pages_inside_index(self):
+        for i in range(25):
+            self._seminar(f"课程 {i}", description='机器学习入门')
+        best = self._seminar('机器学习入门', description='')
+
+        response = self.client.get('/seminars/', {'search': '机器学习', 'size': 10, 'page': 3})
+        data = response.json()['data']
+        self.assertEqual(data['count'], 26)
+        self.assertEqual(len(data['results']), 6)
+
+        first = self.client.get('/seminars/', {'search': '机器学习', 'size': 10}).json()['data']
+        # 标题命中排在简介命中之前
+        self.assertEqual(first['results'][0]['id'], str(best.id))
+
+    def test_search_respects_filters(self):
+        self._seminar('机器学习 一', state='done')
+        self._seminar('机器学习 二', state='draft')
+        other = User.objects.create_user('bob')
+        Seminar.objects.create(title='机器学习 三', description='', owner=other)
+
+        data = self.client.get('/seminars/', {'search': '机器学习', 'state': 'done'}).json()['data']
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['results'][0]['title'], '机器学习 一')
+
+    def test_short_query_falls_back_to_like(self):
+        self._seminar('AI 入门')
+        self.assertIsNone(search.search_seminars(self.user.id, 'AI', Seminar.objects.all()))
+        data = self.client.get('/seminars/', {'search': 'AI'}).json()['data']
+        self.assertEqual(data['count'], 1)
+
+
+class SearchBenchmark(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice')
+        rng = random.Random(0)
+        # bulk_create 不触发信号，索引由 rebuild_index 一次性建立（与对账命令相同）
+        Seminar.objects.bulk_create(
+            (
+                Seminar(
+                    title=f"{rng.choice(WORDS)} 第 {i} 讲",
+                    description=' '.join(rng.choices(WORDS, k=8)) + f" 编号 {i}",
+                    owner=cls.user,
+                )
+                for i in range(BENCHMARK_ROWS)
+            ),
+            batch_size=5000,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _time(self, func, repeat=5):
+        func()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = func()
+        return (time.perf_counter() - start) / repeat * 1000, result
+
+    @benchmark
+    def test_search_100k(self):
+        start = time.perf_counter()
+        stats = search.rebuild_index(batch_size=2000)
+        logger.info(f"rebuild index for {stats['checked']} seminars: {time.perf_counter() - start:.1f}s")
+        elapsed, _ = self._time(lambda: search.rebuild_index(batch_size=2000), repeat=1)
+        logger.info(f"reconcile unchanged index: {elapsed / 1000:.1f}s")
+
+        seminars = Seminar.objects.filter(owner=self.user).defer('resources').order_by('-date')
+        for term in ('摄影入门', '第 4242 讲', '编号 99999'):
+            like_ms, like_count = self._time(
+                lambda: seminars.filter(Q(title__icontains=term) | Q(description__icontains=term)).count()
+            )
+            index_ms, index_count = self._time(lambda: search.search_seminars(self.user.id, term, seminars).count())
+            logger.info(f"search {term!r} over {BENCHMARK_ROWS} seminars: LIKE {like_ms:.1f}ms ({like_count} rows), index {index_ms:.1f}ms ({index_count} rows)")
+
+            api_ms, response = self._time(lambda: self.client.get('/seminars/', {'search': term, 'size': 20}))
+            self.assertEqual(response.status_code, 200)
+            logger.info(f"GET /seminars/?search={term}: {api_ms:.1f}ms")
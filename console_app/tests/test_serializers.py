@@ -0,0 +1,69 @@
+"""
+列表序列化器：只输出列表需要的字段，支持 ?fields= / ?expand=；与完整序列化器的吞吐对比
+"""
+import time
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+
+from console_app.models import Seminar, Speaker
+from console_app.serializers import SeminarSerializer, SeminarListSerializer
+
+from console_app.tests.benchmark import benchmark, logger
+
+ROWS = 1000
+SLIDES = 30
+
+
+def _resources():
+    return {'slides': [{'title': f"slide-{i}", 'script': 'x' * 400, 'image': f"slides/{i}.png"} for i in range(SLIDES)]}
+
+
+class ListSerializerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('alice')
+        speaker = Speaker.objects.create(name='s', description='', owner=user)
+        Seminar.objects.bulk_create(
+            Seminar(title=f"seminar-{i}", description='', owner=user, speaker=speaker, resources=_resources())
+            for i in range(ROWS)
+        )
+
+    def _seminars(self):
+        return list(Seminar.objects.select_related('speaker').order_by('-date', '-id'))
+
+    def test_list_serializer_omits_resources(self):
+        data = SeminarListSerializer(self._seminars()[:1], many=True).data[0]
+        self.assertNotIn('resources', data)
+        self.assertIn('resources', SeminarSerializer(self._seminars()[:1], many=True).data[0])
+
+    def test_sparse_fields_and_expand(self):
+        data = SeminarListSerializer(self._seminars()[:1], many=True, fields=['id', 'title', 'speaker'], expand=['speaker']).data[0]
+        self.assertEqual(set(data), {'id', 'title', 'speaker'})
+        self.assertEqual(data['speaker']['name'], 's')
+        self.assertNotIn('motions', data['speaker'])
+
+    def _run(self, queryset, serializer_class, **kwargs):
+        """查询 + 序列化 + JSON 渲染，与列表接口一致"""
+        start = time.perf_counter()
+        body = JSONRenderer().render(serializer_class(list(queryset), many=True, **kwargs).data)
+        return time.perf_counter() - start, len(body)
+
+    @benchmark
+    def test_list_serializer_throughput(self):
+        full = Seminar.objects.order_by('-date', '-id')
+        light = full.defer('resources')
+        cases = [
+            ('full', full, SeminarSerializer, {}),
+            ('list', light, SeminarListSerializer, {}),
+            ('list fields=id,title', light, SeminarListSerializer, {'fields': ['id', 'title']}),
+            ('full expand=speaker', full.select_related('speaker'), SeminarSerializer, {'expand': ['speaker']}),
+            ('list expand=speaker', light.select_related('speaker'), SeminarListSerializer, {'expand': ['speaker']}),
+        ]
+        for name, queryset, serializer_class, kwargs in cases:
+            # 预热一次，排除首次构建字段的开销
+            self._run(queryset[:10], serializer_class, **kwargs)
+            elapsed, size = self._run(queryset, serializer_class, **kwargs)
+            logger.info(f"{ROWS} seminars [{name}]: {ROWS / elapsed:.0f} rows/s, {size / 1024:.0f} KiB")
@@ -0,0 +1,124 @@
+"""
+服务 token 缓存：本地假 token 接口统计签发次数
+"""
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from console_app.service_token import ServiceTokenCache
+
+CONCURRENCY = 20
+
+
+class FakeTokenServer(ThreadingHTTPServer):
+    """client credentials token 接口，每次签发一个新 token"""
+
+    daemon_threads = True
+
+    def __init__(self, expires_in=3600, delay=0.2):
+        self.expires_in = expires_in
+        self.delay = delay
+        self.grants = 0
+        self._lock = threading.Lock()
+        super().__init__(('127.0.0.1', 0), FakeTokenHandler)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/oauth2/token"
+
+
+class FakeTokenHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.server.delay)
+        with self.server._lock:
+            self.server.grants += 1
+            grant = self.server.grants
+        body = json.dumps({
+            'access_token': f"token-{grant}",
+            'token_type': 'Bearer',
+            'expires_in': self.server.expires_in,
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _concurrently(func, count=CONCURRENCY):
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def run(i):
+        barrier.wait()
+        results[i] = func()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+@override_settings(CACHES={'tokens': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tokens'}})
+class ServiceTokenCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ, {'OAUTHLIB_INSECURE_TRANSPORT': '1'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.server = FakeTokenServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        caches['tokens'].clear()
+
+    def _cache(self, **kwargs):
+        return ServiceTokenCache(self.server.url, 'console', 'secret', **kwargs)
+
+    def test_concurrent_requests_fetch_once(self):
+        cache = self._cache()
+        tokens = _concurrently(lambda: cache.get_token()['access_token'])
+        self.assertEqual(self.server.grants, 1)
+        self.assertEqual(set(tokens), {'token-1'})
+
+    def test_processes_share_one_grant(self):
+        # 每个线程一个实例，相当于多个进程共享 Django cache
+        tokens = _concurrently(lambda: self._cache(cache_alias='tokens').get_token()['access_token'])
+        self.assertEqual(self.server.grants, 1)
+        self.assertEqual(set(tokens), {'token-1'})
+
+    def test_refresh_before_expiry(self):
+        self.server.expires_in = 30
+        cache = self._cache(refresh_margin=60)
+        self.assertEqual(cache.get_token()['access_token'], 'token-1')
+        # 剩余有效期小于 refresh_margin，再次获取时刷新
+        self.assertEqual(cache.get_token()['access_token'], 'token-2')
+        self.assertEqual(self.server.grants, 2)
+
+    def test_waiter_does_not_delete_foreign_lock(self):
+        shared = caches['tokens']
+        cache = self._cache(cache_alias='tokens')
+        cache.lock_wait = 0.1
+        lock_key = f"{cache.cache_key}:lock"
+        shared.add(lock_key, 'other-process', timeout=10)
+
+        self.assertEqual(cache.get_token()['access_token'], 'token-1')
+        self.assertEqual(shared.get(lock_key), 'other-process')
+
+    def test_lock_released_after_fetch(self):
+        cache = self._cache(cache_alias='tokens')
+        cache.get_token()
+        self.assertIsNone(caches['tokens'].get(f"{cache.cache_key}:lock"))
@@ -0,0 +1,93 @@
+"""
+内容寻址存储与 prune_media：重复上传刷新修改时间，引用在遍历之后读取
+"""
+import io
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from console_app.management.commands import prune_media
+from console_app.models import Avatar
+from console_app.storage import ContentAddressedStorage
+
+OLD = time.time() - 7 * 86400
+
+
+class PruneMediaTests(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = override_settings(MEDIA_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.storage = ContentAddressedStorage(location=self.root)
+        self.owner = User.objects.create_user('alice')
+
+    def _thumbnail(self, name):
+        # 缩略图与原图同目录，不经过内容寻址命名
+        thumbnail = f"{name}.small.webp"
+        with open(self.storage.path(thumbnail), 'wb') as f:
+            f.write(b'thumb')
+        return thumbnail
+
+    def _age(self, name):
+        os.utime(self.storage.path(name), (OLD, OLD))
+
+    def _prune(self):
+        out = io.StringIO()
+        call_command('prune_media', '--grace', '3600', stdout=out)
+        return out.getvalue()
+
+    def test_dedup_hit_refreshes_mtime(self):
+        name = self.storage.save('a.png', ContentFile(b'portrait'))
+        self._age(name)
+        self.assertEqual(self.storage.save('b.png', ContentFile(b'portrait')), name)
+        self.assertGreater(os.path.getmtime(self.storage.path(name)), OLD + 3600)
+
+    def test_reuploaded_file_and_thumbnails_survive_prune(self):
+        name = self.storage.save('a.png', ContentFile(b'portrait'))
+        thumbnail = self._thumbnail(name)
+        self._age(name)
+        self._age(thumbnail)
+        # 记录尚未提交时重新上传了相同内容
+        self.storage.save('b.png', ContentFile(b'portrait'))
+        self._prune()
+        self.assertTrue(self.storage.exists(name))
+        self.assertTrue(self.storage.exists(thumbnail))
+
+    def test_references_are_read_after_walk(self):
+        name = self.storage.save('a.png', ContentFile(b'portrait'))
+        self._age(name)
+        real_walk = os.walk
+
+        def walk_then_commit(root):
+            yield from real_walk(root)
+            # 遍历期间提交了引用该文件的记录
+            Avatar.objects.create(name='a', owner=self.owner, portrait=name)
+
+        with mock.patch.object(prune_media.os, 'walk', walk_then_commit):
+            self._prune()
+        self.assertTrue(self.storage.exists(name))
+
+    def test_unreferenced_old_files_are_removed(self):
+        name = self.storage.save('a.png', ContentFile(b'portrait'))
+        thumbnail = self._thumbnail(name)
+        self._age(name)
+        self._age(thumbnail)
+        self.assertIn('Removed 2 files', self._prune())
+        self.assertFalse(self.storage.exists(name))
+
+    def test_avatar_upload_path_needs_only_extension(self):
+        # 上传路径不读取 owner，实际文件名由内容决定
+        field = Avatar._meta.get_field('portrait')
+        self.assertEqual(field.generate_filename(Avatar(), 'Me Photo.JPG'), 'avatars/portrait.JPG')
+        name = self.storage.save(field.generate_filename(Avatar(), 'me.png'), ContentFile(b'portrait'))
+        self.assertTrue(name.endswith('.png'))
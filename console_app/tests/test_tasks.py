@@ -0,0 +1,69 @@
+"""
+Celery producer：进程内共享 producer；基准对比每次请求新建 app（原实现）
+
+broker 使用 kombu 的内存传输（memory://），不需要 RabbitMQ。
+"""
+import time
+from unittest import mock
+
+from celery import Celery
+from django.test import SimpleTestCase
+
+from console_app import tasks
+from console_app.tests.benchmark import benchmark, logger
+
+N = 200
+
+
+def _per_request_app_send(message):
+    # 原实现：每次发送都新建 Celery app 与 broker 连接
+    app = Celery('geminar_worker', broker='memory://', set_as_current=False)
+    try:
+        app.send_task(tasks.TTS_ORDER_CREATED_TASK, args=[message], queue='celery')
+    finally:
+        app.close()
+
+
+class ProducerBenchmarkTests(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(tasks, '_broker_url', return_value='memory://')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        tasks.reset_celery_app()
+        self.addCleanup(tasks.reset_celery_app)
+        self.message = {'id': 'bench', 'text': '你好', 'spk_id': 'spk'}
+
+    def _measure(self, send):
+        send(self.message)  # 预热
+        started = time.perf_counter()
+        for _ in range(N):
+            send(self.message)
+        return (time.perf_counter() - started) / N
+
+    def test_shared_producer_is_created_once(self):
+        self.assertIs(tasks.get_celery_app(), tasks.get_celery_app())
+
+    @benchmark
+    def test_enqueue_latency_before_and_after(self):
+        before = self._measure(_per_request_app_send)
+        after = self._measure(lambda message: tasks.send_task(tasks.TTS_ORDER_CREATED_TASK, args=[message]))
+        logger.info(f"per-request enqueue latency: new app {before * 1000:.3f} ms, shared producer {after * 1000:.3f} ms")
+
+    def test_batch_send_reuses_one_producer(self):
+        app = tasks.get_celery_app()
+        messages = [(i, tasks.TTS_ORDER_CREATED_TASK, [self.message], f"bench-{i}") for i in range(N)]
+        with mock.patch.object(app, 'producer_or_acquire', wraps=app.producer_or_acquire) as acquire:
+            errors = tasks.send_tasks_batch(messages)
+        self.assertEqual(errors, {})
+        # send_task 传入 producer 时也会调用 producer_or_acquire(producer)，只统计实际获取连接的调用
+        acquired = [c for c in acquire.call_args_list if not (c.args and c.args[0]) and not c.kwargs.get('producer')]
+        self.assertEqual(len(acquired), 1)
+
+    @benchmark
+    def test_batch_enqueue_latency(self):
+        messages = [(i, tasks.TTS_ORDER_CREATED_TASK, [self.message], f"bench-{i}") for i in range(N)]
+        tasks.send_tasks_batch(messages[:1])  # 预热
+        started = time.perf_counter()
+        tasks.send_tasks_batch(messages)
+        logger.info(f"batch enqueue: {(time.perf_counter() - started) / N * 1000:.3f} ms per message")
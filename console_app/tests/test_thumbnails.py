@@ -0,0 +1,117 @@
+"""
+缩略图状态记录：已生成 / 原图缺失命中记录时不访问存储，默认不在请求中生成；
+批量命令只在共享缓存中写入记录
+"""
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from console_app import thumbnails
+
+SIZES = {'small': 16, 'medium': 32}
+
+
+def _png():
+    output = io.BytesIO()
+    Image.new('RGB', (64, 48), 'red').save(output, format='PNG')
+    return output.getvalue()
+
+
+@override_settings(THUMBNAIL_SIZES=SIZES, THUMBNAIL_FORMAT='webp', MEDIA_URL='/medias/')
+class ThumbnailStateTests(SimpleTestCase):
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        self.storage = FileSystemStorage(location=root, base_url='/medias/')
+        self.storage.save('avatars/a.png', ContentFile(_png()))
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def _urls(self, name):
+        with mock.patch.object(self.storage, 'exists', wraps=self.storage.exists) as exists:
+            urls = thumbnails.thumbnail_urls(name, storage=self.storage)
+        return urls, exists.call_count
+
+    def test_not_generated_in_request_by_default(self):
+        urls, _ = self._urls('avatars/a.png')
+        self.assertEqual(urls, {'small': '/media/avatars/a.png', 'medium': '/media/avatars/a.png'})
+        self.assertFalse(self.storage.exists('avatars/a.png.small.webp'))
+
+    def test_ready_state_skips_storage(self):
+        self.assertEqual(thumbnails.generate_thumbnails('avatars/a.png', self.storage), 2)
+        urls, calls = self._urls('avatars/a.png')
+        self.assertEqual(urls['small'], '/media/avatars/a.png.small.webp')
+        self.assertEqual(calls, 0)
+
+    def test_ready_state_is_learned_once(self):
+        thumbnails.generate_thumbnails('avatars/a.png', self.storage)
+        cache.clear()
+        _, first = self._urls('avatars/a.png')
+        _, second = self._urls('avatars/a.png')
+        self.assertEqual((first, second), (2, 0))
+
+    def test_missing_source_is_not_retried(self):
+        with override_settings(THUMBNAIL_LAZY=True):
+            with mock.patch.object(thumbnails, 'generate_thumbnails') as generate:
+                urls, first = self._urls('avatars/gone.png')
+                _, second = self._urls('avatars/gone.png')
+        generate.assert_not_called()
+        self.assertEqual(urls['small'], '/media/avatars/gone.png')
+        self.assertEqual(second, 0)
+        self.assertEqual(thumbnails.thumbnail_state('avatars/gone.png'), thumbnails.SOURCE_MISSING)
+
+    def test_generate_records_missing_source(self):
+        with self.assertRaises(FileNotFoundError):
+            thumbnails.generate_thumbnails('avatars/gone.png', self.storage)
+        self.assertEqual(thumbnails.thumbnail_state('avatars/gone.png'), thumbnails.SOURCE_MISSING)
+
+    @override_settings(THUMBNAIL_LAZY=True)
+    def test_lazy_generation(self):
+        urls, _ = self._urls('avatars/a.png')
+        self.assertEqual(urls['medium'], '/media/avatars/a.png.medium.webp')
+        self.assertTrue(self.storage.exists('avatars/a.png.medium.webp'))
+
+
+@override_settings(THUMBNAIL_SIZES=SIZES, THUMBNAIL_FORMAT='webp')
+class SharedStateTests(SimpleTestCase):
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        self.storage = FileSystemStorage(location=root)
+        self.storage.save('avatars/a.png', ContentFile(_png()))
+        # 文件缓存可以跨进程共享
+        self.shared_cache = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': os.path.join(root, 'cache'),
+        }})
+
+    def test_process_local_cache_is_not_shared(self):
+        self.assertFalse(thumbnails.state_shared())
+        with self.shared_cache:
+            self.assertTrue(thumbnails.state_shared())
+
+    def test_unrecorded_generation(self):
+        cache.clear()
+        self.assertEqual(thumbnails.generate_thumbnails('avatars/a.png', self.storage, record=False), 2)
+        self.assertIsNone(thumbnails.thumbnail_state('avatars/a.png'))
+
+    def _run_command(self):
+        output = io.StringIO()
+        with mock.patch.object(thumbnails, 'original_names', return_value=[]):
+            call_command('generate_thumbnails', workers=1, stdout=output)
+        return output.getvalue()
+
+    def test_command_warns_without_shared_cache(self):
+        self.assertIn('not shared', self._run_command())
+        with self.shared_cache:
+            self.assertNotIn('not shared', self._run_command())
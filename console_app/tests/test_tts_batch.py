@@ -0,0 +1,76 @@
+"""
+批量创建 TTS 任务：数量上限、逐条校验、任务与 outbox 消息同一事务写入
+"""
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import DatabaseError
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from console_app import outbox, views
+from console_app.models import OutboxMessage, TTSOrder, TTSOrderState
+
+
+class TTSOrdersBatchTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _post(self, body):
+        return self.client.post('/tts/orders/batch/', body, format='json')
+
+    def _items(self, count):
+        return [{'text': f"第 {i} 句", 'spk_id': 'spk'} for i in range(count)]
+
+    def test_creates_orders_with_outbox_messages(self):
+        response = self._post({'items': self._items(3)})
+        self.assertEqual(response.status_code, 201)
+        results = response.json()['data']
+        self.assertEqual([r['state'] for r in results], [TTSOrderState.PENDING] * 3)
+
+        orders = TTSOrder.objects.filter(owner=self.user)
+        self.assertEqual(sorted(str(o.id) for o in orders), sorted(r['id'] for r in results))
+        keys = set(OutboxMessage.objects.values_list('idempotency_key', flat=True))
+        self.assertEqual(keys, {f"tts-order:{r['id']}" for r in results})
+
+    def test_plain_list_body(self):
+        self.assertEqual(self._post(self._items(2)).status_code, 201)
+        self.assertEqual(TTSOrder.objects.count(), 2)
+
+    def test_batch_size_limit(self):
+        limit = views.TTSOrdersBatchView.max_batch_size
+        self.assertEqual(self._post(self._items(limit)).status_code, 201)
+        response = self._post(self._items(limit + 1))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(TTSOrder.objects.count(), limit)
+
+    def test_empty_or_invalid_body(self):
+        for body in ([], {'items': []}, {'items': 'text'}):
+            self.assertEqual(self._post(body).status_code, 400, body)
+
+    def test_item_errors_reject_the_whole_batch(self):
+        items = self._items(3)
+        items[1] = {'text': ''}
+        response = self._post(items)
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['error']
+        # 按条目下标返回错误
+        self.assertEqual(set(errors), {'1'})
+        self.assertEqual(set(errors['1']), {'text', 'spk_id'})
+        self.assertFalse(TTSOrder.objects.exists())
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_enqueue_failure_rolls_back_orders(self):
+        with mock.patch.object(outbox, 'enqueue_tts_orders', side_effect=DatabaseError('outbox down')):
+            with self.assertRaises(DatabaseError):
+                self._post(self._items(3))
+        self.assertFalse(TTSOrder.objects.exists())
+
+    def test_bulk_create_failure_writes_nothing(self):
+        with mock.patch.object(TTSOrder.objects, 'bulk_create', side_effect=DatabaseError('disk full')):
+            with self.assertRaises(DatabaseError):
+                self._post(self._items(3))
+        self.assertFalse(OutboxMessage.objects.exists())
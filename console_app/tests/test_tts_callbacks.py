@@ -0,0 +1,216 @@
+"""
+TTS 回调：单条带条件的 UPDATE、参数校验、合并写入不重复推送；1000 个任务 × 100 次进度的基准
+"""
+import contextlib
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from console_app import tts_callbacks
+from console_app.models import TTSOrder, TTSOrderState
+from console_app.tests.benchmark import benchmark, logger
+
+JOBS = 1000
+TICKS = 100
+# 合并写入时每隔多少轮回调落库一次（相当于 TTS_CALLBACK_COALESCE_INTERVAL 内每个任务收到的回调数）
+FLUSH_EVERY = 10
+
+
+class ApplyUpdateTests(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user('alice')
+        self.order = TTSOrder.objects.create(text='你好', spk_id='spk', owner=self.owner)
+        patcher = mock.patch.object(tts_callbacks, 'push_tts_order_update')
+        self.push = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _apply(self, state=None, status=None, output_file=''):
+        return tts_callbacks.apply_update(self.order.id, state, status, output_file)
+
+    def _reload(self):
+        return TTSOrder.objects.get(id=self.order.id)
+
+    def test_single_update_statement(self):
+        with CaptureQueriesContext(connection) as queries:
+            row, applied = self._apply(TTSOrderState.HANDLING, {'progress': 10})
+        self.assertTrue(applied)
+        self.assertEqual(row['status'], {'progress': 10})
+        writes = [q['sql'] for q in queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(len(queries), 2)
+
+    def test_progress_only_moves_forward(self):
+        self._apply(TTSOrderState.HANDLING, {'progress': 50})
+        row, applied = self._apply(TTSOrderState.HANDLING, {'progress': 30})
+        self.assertFalse(applied)
+        self.assertEqual(self._reload().status, {'progress': 50})
+
+    def test_duplicate_is_not_written(self):
+        self._apply(TTSOrderState.HANDLING, {'progress': 50})
+        self.push.reset_mock()
+        row, applied = self._apply(TTSOrderState.HANDLING, {'progress': 50})
+        self.assertFalse(applied)
+        self.push.assert_not_called()
+
+        # 进度相同但内容不同时写入
+        row, applied = self._apply(TTSOrderState.HANDLING, {'progress': 50, 'message': 'chunk 2'})
+        self.assertTrue(applied)
+
+    def test_state_never_moves_back(self):
+        self._apply(TTSOrderState.HANDLING, {'progress': 10})
+        row, applied = self._apply(TTSOrderState.PENDING)
+        self.assertFalse(applied)
+        self.assertEqual(self._reload().state, TTSOrderState.HANDLING)
+
+    def test_terminal_state_is_final(self):
+        self._apply(TTSOrderState.COMPLETED, {'progress': 100}, 'tts/out.wav')
+        row, applied = self._apply(TTSOrderState.HANDLING, {'progress': 100, 'late': True})
+        self.assertFalse(applied)
+        order = self._reload()
+        self.assertEqual((order.state, order.status, order.output_file), (TTSOrderState.COMPLETED, {'progress': 100}, 'tts/out.wav'))
+
+    def test_failure_overrides_progress(self):
+        self._apply(TTSOrderState.HANDLING, {'progress': 80})
+        row, applied = self._apply(TTSOrderState.FAILED, {'error': 'oom'})
+        self.assertTrue(applied)
+        self.assertEqual(self._reload().status, {'error': 'oom'})
+
+    def test_stale_progress_keeps_status_but_advances_state(self):
+        TTSOrder.objects.filter(id=self.order.id).update(status={'progress': 60})
+        row, applied = self._apply(TTSOrderState.HANDLING, {'progress': 20})
+        self.assertTrue(applied)
+        order = self._reload()
+        self.assertEqual((order.state, order.status), (TTSOrderState.HANDLING, {'progress': 60}))
+
+    def test_missing_order(self):
+        with self.assertRaises(tts_callbacks.OrderNotFound):
+            tts_callbacks.apply_update('00000000-0000-0000-0000-000000000000', TTSOrderState.HANDLING)
+
+
+class ApplyUpdateORMTests(ApplyUpdateTests):
+    """其他数据库使用的 ORM 写法，规则与 SQL 写法相同"""
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(tts_callbacks, '_PROGRESS_SQL', {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class CallbackViewValidationTests(TestCase):
+
+    def setUp(self):
+        owner = User.objects.create_user('alice')
+        self.order = TTSOrder.objects.create(text='你好', spk_id='spk', owner=owner)
+        self.url = f'/tts/orders/{self.order.id}/callback/'
+
+    def _post(self, data):
+        return self.client.post(self.url, data, content_type='application/json')
+
+    def test_non_dict_status_is_rejected(self):
+        for status in (['progress', 10], 'done', 10):
+            response = self._post({'state': 'handling', 'status': status})
+            self.assertEqual(response.status_code, 400, status)
+
+    def test_unknown_state_is_rejected(self):
+        self.assertEqual(self._post({'state': 'exploded'}).status_code, 400)
+
+    def test_non_dict_body_is_rejected(self):
+        self.assertEqual(self._post([1, 2]).status_code, 400)
+
+    def test_valid_callback(self):
+        response = self._post({'state': 'handling', 'status': {'progress': 5}})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['data']['applied'])
+
+
+@override_settings(TTS_CALLBACK_COALESCE_INTERVAL=60)
+class CoalescerTests(TestCase):
+
+    def test_flush_does_not_push_again(self):
+        owner = User.objects.create_user('alice')
+        order = TTSOrder.objects.create(text='你好', spk_id='spk', owner=owner)
+        coalescer = tts_callbacks.ProgressCoalescer(60)
+        with mock.patch.object(tts_callbacks, 'push_tts_order_update') as push, \
+                mock.patch.object(coalescer, '_ensure_started'):
+            coalescer.submit(order.id, TTSOrderState.HANDLING, {'progress': 10})
+            coalescer.submit(order.id, TTSOrderState.HANDLING, {'progress': 20})
+            self.assertEqual(push.call_count, 2)
+            self.assertEqual(coalescer.flush(), 1)
+            self.assertEqual(push.call_count, 2)
+        self.assertEqual(TTSOrder.objects.get(id=order.id).status, {'progress': 20})
+
+
+class CallbackIngestionBenchmark(TestCase):
+    """
+    JOBS 个任务并行推进，每个任务 TICKS 次回调（最后一次为完成），按轮交错到达。
+
+    对比逐条 get + save（改造前）、单条带条件的 UPDATE、内存合并后批量落库三种写法，
+    记录耗时与 SQL 条数（推送已 mock，只统计数据库开销）。
+    """
+
+    def setUp(self):
+        owner = User.objects.create_user('alice')
+        TTSOrder.objects.bulk_create(TTSOrder(text='你好' * 200, spk_id='spk', owner=owner) for _ in range(JOBS))
+        self.order_ids = list(TTSOrder.objects.values_list('id', flat=True))
+        patcher = mock.patch.object(tts_callbacks, 'push_tts_order_update')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _ticks(self):
+        for tick in range(1, TICKS + 1):
+            state = TTSOrderState.COMPLETED if tick == TICKS else TTSOrderState.HANDLING
+            for order_id in self.order_ids:
+                yield tick, order_id, state, {'progress': tick}
+
+    @contextlib.contextmanager
+    def _measure(self, name):
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql.lstrip()[:6].upper())
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(count):
+            yield
+        elapsed = time.perf_counter() - start
+        total = JOBS * TICKS
+        writes = sum(1 for q in queries if q == 'UPDATE')
+        logger.info(
+            f"{JOBS} jobs x {TICKS} ticks [{name}]: {elapsed:.2f}s ({total / elapsed:.0f} callbacks/s), "
+            f"{len(queries)} queries, {writes} UPDATEs"
+        )
+        for order in TTSOrder.objects.all():
+            self.assertEqual(order.state, TTSOrderState.COMPLETED)
+            self.assertEqual(order.status, {'progress': TICKS})
+
+    @benchmark
+    def test_get_and_save(self):
+        with self._measure('get + save'):
+            for _, order_id, state, status_data in self._ticks():
+                order = TTSOrder.objects.get(id=order_id)
+                order.state = state
+                order.status = status_data
+                order.save()
+
+    @benchmark
+    def test_guarded_update(self):
+        with self._measure('guarded UPDATE'):
+            for _, order_id, state, status_data in self._ticks():
+                tts_callbacks.apply_update(order_id, state, status_data)
+
+    @benchmark
+    def test_coalesced(self):
+        coalescer = tts_callbacks.ProgressCoalescer(60)
+        with mock.patch.object(coalescer, '_ensure_started'), self._measure(f"coalesced, flush every {FLUSH_EVERY} ticks"):
+            for tick, order_id, state, status_data in self._ticks():
+                coalescer.submit(order_id, state, status_data)
+                if order_id == self.order_ids[-1] and tick % FLUSH_EVERY == 0:
+                    coalescer.flush()
+            coalescer.flush()
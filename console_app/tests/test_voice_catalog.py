@@ -0,0 +1,98 @@
+"""
+TTS 音色目录：假 provider 模拟慢速 / 失败的 TTS 服务
+"""
+import threading
+import time
+from dataclasses import dataclass
+
+from django.test import SimpleTestCase
+
+from console_app.voice_catalog import TTSVoiceCatalog, merge_voices
+
+
+@dataclass
+class FakeVoice:
+    spk_id: str
+    name: str
+
+
+class FakeProvider:
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self.fail = False
+
+    def list_voices(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError('tts down')
+        return [FakeVoice(f"spk-{self.calls}", 'voice')]
+
+
+def _wait_refreshed(catalog, timeout=2):
+    deadline = time.monotonic() + timeout
+    while catalog._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+class TTSVoiceCatalogTests(SimpleTestCase):
+
+    def _catalog(self, provider, ttl=300, retry_interval=30):
+        return TTSVoiceCatalog(provider_factory=lambda: provider, ttl=ttl, retry_interval=retry_interval)
+
+    def test_first_load_is_single_flight(self):
+        provider = FakeProvider(delay=0.1)
+        catalog = self._catalog(provider)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(catalog.get_voices())) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(provider.calls, 1)
+        self.assertEqual(results, [[{'spk_id': 'spk-1', 'name': 'voice'}]] * 10)
+
+    def test_stale_list_is_served_during_slow_refresh(self):
+        provider = FakeProvider()
+        catalog = self._catalog(provider, ttl=0.01)
+        catalog.get_voices()
+        provider.delay = 0.5
+        time.sleep(0.02)
+
+        started = time.monotonic()
+        for _ in range(20):
+            self.assertEqual(catalog.get_voices()[0]['spk_id'], 'spk-1')
+        # 刷新进行中，请求既不等待刷新，也不重复发起刷新
+        self.assertLess(time.monotonic() - started, 0.2)
+        _wait_refreshed(catalog)
+        self.assertEqual(provider.calls, 2)
+        self.assertEqual(catalog.get_voices()[0]['spk_id'], 'spk-2')
+
+    def test_failed_refresh_backs_off(self):
+        provider = FakeProvider()
+        catalog = self._catalog(provider, ttl=0.01, retry_interval=30)
+        catalog.get_voices()
+        provider.fail = True
+        time.sleep(0.02)
+
+        catalog.get_voices()
+        _wait_refreshed(catalog)
+        for _ in range(10):
+            self.assertEqual(catalog.get_voices()[0]['spk_id'], 'spk-1')
+        _wait_refreshed(catalog)
+        self.assertEqual(provider.calls, 2)
+
+    def test_failed_first_load_backs_off(self):
+        provider = FakeProvider()
+        provider.fail = True
+        catalog = self._catalog(provider, retry_interval=30)
+        for _ in range(3):
+            with self.assertRaises(ConnectionError):
+                catalog.get_voices()
+        self.assertEqual(provider.calls, 1)
+
+    def test_merge_prefers_database_voices(self):
+        merged = merge_voices([{'code': 'spk-1', 'name': 'db'}], [{'spk_id': 'spk-1'}, {'spk_id': 'spk-2'}])
+        self.assertEqual([(v.get('code') or v.get('spk_id'), v['source']) for v in merged], [('spk-1', 'db'), ('spk-2', 'tts')])
@@ -0,0 +1,198 @@
+"""
+缩略图 - 头像 portrait 与讲师封面 covers 的固定尺寸衍生图
+
+缩略图与原图放在同一目录（MEDIA_ROOT/avatars/<user>/ 等），命名为
+    <原文件名>.<尺寸名>.<webp|jpg>
+尺寸见 THUMBNAIL_SIZES（尺寸名 -> 长边像素）。
+头像保存时由信号生成；历史数据用 manage.py generate_thumbnails 批量补齐；
+THUMBNAIL_LAZY 开启时，序列化遇到缺失的缩略图会当场生成。
+
+每张原图的缩略图状态（已生成 / 原图缺失）记录在 Django cache 中，
+序列化时命中记录即可给出 URL，不再逐行检查文件；原图缺失的不会在每个请求中重试。
+记录只对使用同一缓存的进程可见：未配置 CACHE_REDIS_URL（进程内缓存）时，
+每个 web 进程在首次序列化某张图时检查文件并各自记录，generate_thumbnails 命令
+在自己的子进程中生成，不写入记录（写了也到不了 web 进程）。
+"""
+import io
+import logging
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .models import Avatar, Speaker
+from .storage import media_url
+
+logger = logging.getLogger(__name__)
+
+_EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+# 缩略图状态
+READY = 'ready'
+SOURCE_MISSING = 'missing'
+
+
+def _format():
+    return settings.THUMBNAIL_FORMAT.upper()
+
+
+def thumbnail_name(name, label):
+    """原图存储路径 -> 缩略图存储路径"""
+    return f"{name}.{label}.{_EXTENSIONS[_format()]}"
+
+
+def original_of(name):
+    """缩略图路径 -> 原图路径，不是缩略图时原样返回"""
+    for label in settings.THUMBNAIL_SIZES:
+        for ext in _EXTENSIONS.values():
+            suffix = f".{label}.{ext}"
+            if name.endswith(suffix):
+                return name[:-len(suffix)]
+    return name
+
+
+def state_shared():
+    """缩略图状态是否记录在多进程共享的缓存中（如 Redis），否则记录只在本进程内有效"""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def _state_key(name):
+    return f"thumbnails:{_format()}:{name}"
+
+
+def thumbnail_state(name):
+    """READY / SOURCE_MISSING，未记录时返回 None"""
+    return cache.get(_state_key(name))
+
+
+def set_thumbnail_state(name, state):
+    cache.set(_state_key(name), state, settings.THUMBNAIL_STATE_TTL)
+
+
+def render_thumbnail(source, max_side, fmt, quality):
+    """生成一张缩略图，返回编码后的 bytes"""
+    with Image.open(source) as image:
+        image.draft('RGB', (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        # WebP 保留透明通道，JPEG 不支持
+        keep_alpha = fmt == 'WEBP' and image.mode in ('RGBA', 'LA', 'P')
+        image = image.convert('RGBA' if keep_alpha else 'RGB')
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, format=fmt, quality=quality, method=4 if fmt == 'WEBP' else 0, optimize=fmt == 'JPEG')
+    return output.getvalue()
+
+
+def generate_thumbnails(name, storage=None, force=False, record=True):
+    """
+    为一张原图生成全部尺寸的缩略图（已存在的跳过），并记录缩略图状态。
+
+    Args:
+        record: 是否记录状态；批量命令在缓存不共享时不记录
+
+    Returns:
+        新生成的数量
+
+    Raises:
+        FileNotFoundError: 原图不存在（记录为 SOURCE_MISSING）
+    """
+    storage = storage or default_storage
+    fmt = _format()
+    missing = [
+        (label, size) for label, size in settings.THUMBNAIL_SIZES.items()
+        if force or not storage.exists(thumbnail_name(name, label))
+    ]
+    if not missing:
+        if record:
+            set_thumbnail_state(name, READY)
+        return 0
+    try:
+        with storage.open(name, 'rb') as original:
+            source = io.BytesIO(original.read())
+    except FileNotFoundError:
+        if record:
+            set_thumbnail_state(name, SOURCE_MISSING)
+        raise
+    for label, size in missing:
+        target = thumbnail_name(name, label)
+        content = render_thumbnail(source, size, fmt, settings.THUMBNAIL_QUALITY)
+        source.seek(0)
+        # storage.save 遇到同名文件会改名，先删除旧的缩略图
+        storage.delete(target)
+        storage.save(target, ContentFile(content))
+    if record:
+        set_thumbnail_state(name, READY)
+    return len(missing)
+
+
+def media_name(value):
+    """存储路径或 MEDIA_URL 下的 URL -> 存储路径；外部 URL 返回 None"""
+    if not value:
+        return None
+    if value.startswith(settings.MEDIA_URL):
+        return value[len(settings.MEDIA_URL):]
+    if value.startswith(('http://', 'https://', '/', 'data:')):
+        return None
+    return value
+
+
+def thumbnail_urls(name, request=None, storage=None):
+    """
+    缩略图 URL {尺寸名: url}，均为 /media/ 下检查权限的地址。
+
+    缩略图未生成时返回原图 URL；开启 THUMBNAIL_LAZY 时先尝试当场生成。
+    状态已记录时不访问存储。
+    """
+    name = media_name(name)
+    if name is None:
+        return {}
+    storage = storage or default_storage
+    state = thumbnail_state(name)
+    if state is None:
+        state = _check_state(name, storage)
+    return {
+        label: media_url(thumbnail_name(name, label) if state == READY else name, request)
+        for label in settings.THUMBNAIL_SIZES
+    }
+
+
+def _check_state(name, storage):
+    """检查存储中的缩略图，记录已生成 / 原图缺失；尚未生成时返回 None"""
+    if all(storage.exists(thumbnail_name(name, label)) for label in settings.THUMBNAIL_SIZES):
+        set_thumbnail_state(name, READY)
+        return READY
+    if not storage.exists(name):
+        set_thumbnail_state(name, SOURCE_MISSING)
+        return SOURCE_MISSING
+    if not settings.THUMBNAIL_LAZY:
+        return None
+    try:
+        generate_thumbnails(name, storage)
+    except Exception as e:
+        logger.warning(f"Failed to generate thumbnails for {name}: {e}")
+        return None
+    return READY
+
+
+def cover_names(covers):
+    """讲师封面 {'_16x9': path, '_4x3': path} 中的本地文件路径"""
+    names = {}
+    for key, value in (covers or {}).items():
+        name = media_name(value) if isinstance(value, str) else None
+        if name:
+            names[key] = name
+    return names
+
+
+def original_names():
+    """需要缩略图的全部原图：头像 portrait 与讲师封面"""
+    for name in Avatar.objects.exclude(portrait='').values_list('portrait', flat=True).iterator():
+        if name:
+            yield name
+    for covers in Speaker.objects.values_list('covers', flat=True).iterator():
+        yield from cover_names(covers).values()
+
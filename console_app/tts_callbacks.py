@@ -0,0 +1,345 @@
+"""
+TTS 任务回调处理 - worker 上报的状态 / 进度
+
+每次回调只执行一条带条件的 UPDATE：状态只能前进、终态之后不再写入、进度只增不减
+这些规则都写在 WHERE 中，由数据库原子地判断，不需要先读再写；
+乱序到达的旧进度、终态之后的回调直接忽略，重复回调不产生写入。
+SQLite / PostgreSQL 直接拼接 SQL：用 ORM 表达式构建这条 UPDATE 的开销（约 3ms）
+是执行它的十几倍，每秒上千次回调时成为瓶颈；其他数据库使用等价的 ORM 写法。
+配置 TTS_CALLBACK_COALESCE_INTERVAL > 0 时，进度更新先在内存中合并并推送，
+每个间隔批量落库一次（落库时不再重复推送）；终态（完成 / 失败）立即写入。
+"""
+import atexit
+import json
+import logging
+import threading
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import close_old_connections, connections, router
+from django.db.models import Case, F, JSONField, Q, Value, When
+from django.utils import timezone
+
+from .models import TTSOrder, TTSOrderState
+from .notify import push_tts_order_update
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = (TTSOrderState.COMPLETED, TTSOrderState.FAILED)
+
+# 状态只能前进：pending -> handling -> completed / failed
+_STATE_RANK = {
+    TTSOrderState.PENDING: 0,
+    TTSOrderState.HANDLING: 1,
+    TTSOrderState.COMPLETED: 2,
+    TTSOrderState.FAILED: 2,
+}
+
+
+class OrderNotFound(Exception):
+    pass
+
+
+def validate_callback(state=None, status_data=None, output_file=''):
+    """
+    校验回调参数。
+
+    Returns:
+        错误信息，合法时返回 None
+    """
+    if state and state not in _STATE_RANK:
+        return f"state 无效: {state}"
+    if status_data is not None and not isinstance(status_data, dict):
+        return "status 必须为对象"
+    if output_file is not None and not isinstance(output_file, str):
+        return "output_file 必须为字符串"
+    return None
+
+
+def _progress(status_data):
+    try:
+        return float((status_data or {}).get('progress', 0) or 0)
+    except (AttributeError, TypeError, ValueError):
+        return 0
+
+
+def compute_changes(current, state=None, status_data=None, output_file=''):
+    """
+    计算需要写入的字段。
+
+    Args:
+        current: 当前值 {'state', 'status', 'output_file'}
+
+    Returns:
+        dict: 变化的字段，空 dict 表示无需写入（重复、乱序或已是终态）
+    """
+    if current['state'] in TERMINAL_STATES:
+        return {}
+
+    changes = {}
+    if state and state != current['state']:
+        if _STATE_RANK.get(state, 0) < _STATE_RANK.get(current['state'], 0):
+            return {}
+        changes['state'] = state
+
+    new_state = changes.get('state', current['state'])
+    if status_data and status_data != current['status']:
+        # 非终态时进度只增不减，旧的进度回调直接丢弃
+        if new_state in TERMINAL_STATES or _progress(status_data) >= _progress(current['status']):
+            changes['status'] = status_data
+
+    if output_file and output_file != current['output_file']:
+        changes['output_file'] = output_file
+    return changes
+
+
+# 数值型进度，缺失或不是数值时为 NULL（与 _progress 一致，视为 0，不阻止写入）
+_PROGRESS_SQL = {
+    'sqlite': "(CASE WHEN json_type(status, '$.progress') IN ('integer', 'real') THEN json_extract(status, '$.progress') END)",
+    'postgresql': "(CASE WHEN jsonb_typeof(status -> 'progress') = 'number' THEN (status ->> 'progress')::float END)",
+}
+_JSON_PARAM = {'sqlite': 'json(%s)', 'postgresql': '%s::jsonb'}
+_JSON_COLUMN = {'sqlite': 'json(status)', 'postgresql': 'status'}
+
+
+def _guarded_update(order_id, state=None, status_data=None, output_file=''):
+    """
+    一条 UPDATE 写入回调，返回是否有写入。
+
+    WHERE 中包含全部规则：非终态、状态不后退、至少有一个字段变化；
+    status 只在进度不落后时写入（新状态为终态时总是写入），否则保留原值。
+    """
+    connection = connections[router.db_for_write(TTSOrder)]
+    vendor = connection.vendor
+    if vendor not in _PROGRESS_SQL:
+        return _guarded_update_orm(order_id, state, status_data, output_file)
+
+    progress_sql, json_param, json_column = _PROGRESS_SQL[vendor], _JSON_PARAM[vendor], _JSON_COLUMN[vendor]
+    sets, set_params = [], []
+    changed, changed_params = [], []
+    rank = _STATE_RANK[state] if state else 1
+    allowed = [s for s, r in _STATE_RANK.items() if r <= rank and s not in TERMINAL_STATES]
+    if state:
+        sets.append('state = %s')
+        set_params.append(state)
+        changed.append('state <> %s')
+        changed_params.append(state)
+    if status_data:
+        status_json = json.dumps(status_data)
+        if state in TERMINAL_STATES:
+            # 切换到终态本身就是变化（当前状态已排除终态）
+            sets.append(f"status = {json_param}")
+            set_params.append(status_json)
+        else:
+            progress = _progress(status_data)
+            not_behind = f"({progress_sql} IS NULL OR {progress_sql} <= %s)"
+            sets.append(f"status = CASE WHEN {not_behind} THEN {json_param} ELSE status END")
+            set_params += [progress, status_json]
+            # 进度相同的重复回调只在内容不同时写入
+            changed.append(f"{progress_sql} < %s OR ({not_behind} AND {json_column} <> {json_param})")
+            changed_params += [progress, progress, status_json]
+    if output_file:
+        sets.append('output_file = %s')
+        set_params.append(output_file)
+        changed.append('output_file <> %s')
+        changed_params.append(output_file)
+    if not sets:
+        return False
+
+    sql = (
+        f"UPDATE {connection.ops.quote_name(TTSOrder._meta.db_table)} SET updated_at = %s, {', '.join(sets)} "
+        f"WHERE id = %s AND state IN ({', '.join(['%s'] * len(allowed))}) AND ({' OR '.join(changed)})"
+    )
+    params = [
+        connection.ops.adapt_datetimefield_value(timezone.now()),
+        *set_params,
+        TTSOrder._meta.pk.get_db_prep_value(order_id, connection),
+        *allowed,
+        *changed_params,
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount > 0
+
+
+def _guarded_update_orm(order_id, state=None, status_data=None, output_file=''):
+    """
+    一条 UPDATE 写入回调（ORM 写法），返回是否有写入。
+
+    WHERE 中包含全部规则：非终态、状态不后退、至少有一个字段变化；
+    status 只在进度不落后时写入（新状态为终态时总是写入），否则保留原值。
+    """
+    queryset = TTSOrder.objects.filter(id=order_id).exclude(state__in=TERMINAL_STATES)
+    values = {}
+    changed = []
+    if state:
+        rank = _STATE_RANK[state]
+        queryset = queryset.filter(state__in=[s for s, r in _STATE_RANK.items() if r <= rank])
+        values['state'] = state
+        changed.append(~Q(state=state))
+    if status_data:
+        if state in TERMINAL_STATES:
+            # 切换到终态本身就是变化（当前状态已排除终态）
+            values['status'] = Value(status_data, output_field=JSONField())
+        else:
+            progress = _progress(status_data)
+            not_behind = Q(status__progress__isnull=True) | Q(status__progress__lte=progress)
+            values['status'] = Case(
+                When(not_behind, then=Value(status_data, output_field=JSONField())),
+                default=F('status'),
+            )
+            # 进度相同的重复回调只在内容不同时写入
+            changed.append(Q(status__progress__lt=progress) | (not_behind & ~Q(status=Value(status_data, output_field=JSONField()))))
+    if output_file:
+        values['output_file'] = output_file
+        changed.append(~Q(output_file=output_file))
+    if not values:
+        return False
+    return queryset.filter(reduce(or_, changed)).update(updated_at=timezone.now(), **values) > 0
+
+
+def _current_row(order_id):
+    """写入后的当前数据；同样直接执行 SQL，省去 ORM 构建查询的开销"""
+    connection = connections[router.db_for_write(TTSOrder)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT owner_id, state, status, output_file FROM {connection.ops.quote_name(TTSOrder._meta.db_table)} WHERE id = %s",
+            [TTSOrder._meta.pk.get_db_prep_value(order_id, connection)]
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    owner_id, state, status, output_file = row
+    status = TTSOrder._meta.get_field('status').from_db_value(status, None, connection)
+    return {'owner_id': owner_id, 'state': state, 'status': status, 'output_file': output_file}
+
+
+def apply_update(order_id, state=None, status_data=None, output_file='', push=True):
+    """
+    立即写入一次回调。
+
+    Args:
+        push: 写入后是否推送（合并写入时已在提交回调时推送过）
+
+    Returns:
+        (当前数据 dict, 是否有写入)
+
+    Raises:
+        OrderNotFound
+    """
+    applied = _guarded_update(order_id, state, status_data, output_file)
+    row = _current_row(order_id)
+    if row is None:
+        raise OrderNotFound(order_id)
+    if applied and push:
+        push_tts_order_update(row['owner_id'], order_id, row)
+    return row, applied
+
+
+class ProgressCoalescer:
+    """
+    在内存中合并高频进度回调，按固定间隔批量落库。
+
+    同一任务在一个间隔内只保留最新的进度；终态回调立即写入并丢弃待写进度。
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._pending = {}
+        self._owners = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def _owner_of(self, key):
+        """任务所属用户，同时校验任务存在；结果缓存，避免每次进度回调都查询"""
+        owner_id = self._owners.get(key)
+        if owner_id is None:
+            owner_id = TTSOrder.objects.filter(id=key).values_list('owner_id', flat=True).first()
+            if owner_id is None:
+                raise OrderNotFound(key)
+            if len(self._owners) > 10000:
+                self._owners.clear()
+            self._owners[key] = owner_id
+        return owner_id
+
+    def submit(self, order_id, state=None, status_data=None, output_file=''):
+        key = str(order_id)
+        if state in TERMINAL_STATES:
+            with self._lock:
+                self._pending.pop(key, None)
+                self._owners.pop(key, None)
+            return apply_update(order_id, state, status_data, output_file)
+
+        owner_id = self._owner_of(key)
+
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = {'state': None, 'status': None, 'output_file': ''}
+            if state and _STATE_RANK.get(state, 0) >= _STATE_RANK.get(pending['state'], 0):
+                pending['state'] = state
+            if status_data and _progress(status_data) >= _progress(pending['status']):
+                pending['status'] = status_data
+            if output_file:
+                pending['output_file'] = output_file
+            data = dict(pending)
+        self._ensure_started()
+        # 进度先推送给前端，数据库稍后批量写入
+        push_tts_order_update(owner_id, key, data)
+        return data, False
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for order_id, update in pending.items():
+            try:
+                apply_update(order_id, update['state'], update['status'], update['output_file'], push=False)
+            except OrderNotFound:
+                pass
+            except Exception as e:
+                logger.error(f"Failed to flush TTS order {order_id} progress: {e}")
+        return len(pending)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='tts-progress-flush', daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def stop(self):
+        self._stopped.set()
+        self.flush()
+
+
+_coalescer = None
+_coalescer_lock = threading.Lock()
+
+
+def submit_callback(order_id, state=None, status_data=None, output_file=''):
+    """
+    处理一次回调，按配置立即写入或合并写入。
+
+    Returns:
+        (当前数据 dict, 是否已写入数据库)
+    """
+    global _coalescer
+    interval = settings.TTS_CALLBACK_COALESCE_INTERVAL
+    if interval <= 0:
+        return apply_update(order_id, state, status_data, output_file)
+    if _coalescer is None:
+        with _coalescer_lock:
+            if _coalescer is None:
+                _coalescer = ProgressCoalescer(interval)
+    return _coalescer.submit(order_id, state, status_data, output_file)
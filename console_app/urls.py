@@ -14,13 +14,19 @@ urlpatterns = [
     path('avatars/<uuid:avatar_id>/', views.AvatarDetailView.as_view(), name='avatar_detail'),
     path('seminars/', views.SeminarsView.as_view(), name='seminars'),
     path('seminars/<uuid:seminar_id>/', views.SeminarDetailView.as_view(), name='seminar_detail'),
+    path('seminars/<uuid:seminar_id>/events/', views.seminar_events_view, name='seminar_events'),
     path('speakers/', views.SpeakersView.as_view(), name='speakers'),
     path('speakers/<uuid:speaker_id>/', views.SpeakerDetailView.as_view(), name='speaker_detail'),
     path('voices/', views.VoicesView.as_view(), name='voices'),
+    path('media/<path:name>', views.MediaView.as_view(), name='media'),
     path('generation_orders/', views.GenerationOrdersView.as_view(), name='generation_orders'),
     # TTS API
     path('tts/orders/', views.TTSOrdersView.as_view(), name='tts_orders'),
+    path('tts/orders/batch/', views.TTSOrdersBatchView.as_view(), name='tts_orders_batch'),
     path('tts/orders/<uuid:order_id>/', views.TTSOrderDetailView.as_view(), name='tts_order_detail'),
+    path('tts/orders/<uuid:order_id>/audio/', views.TTSOrderAudioView.as_view(), name='tts_order_audio'),
     path('tts/orders/<uuid:order_id>/callback/', views.TTSOrderCallbackView.as_view(), name='tts_order_callback'),
+    path('callbacks/batch/', views.CallbackBatchView.as_view(), name='callback_batch'),
+    path('ops/catalog-cache/', views.CatalogCacheStatsView.as_view(), name='catalog_cache_stats'),
 ]
 
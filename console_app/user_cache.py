@@ -0,0 +1,73 @@
+"""
+登录用户缓存 - 进程内、短 TTL
+
+AuthenticationMiddleware 每个请求都按会话中的用户 id 查询一次 auth_user。
+CachedUserMiddleware 以会话 key 缓存查询到的用户 USER_CACHE_TTL 秒，
+同时校验会话中的用户 id 与密码哈希摘要，会话切换用户或修改密码后不会命中旧数据。
+本进程内的失效：
+    - 退出登录（user_logged_out）时删除该会话的缓存
+    - 用户被保存（OAuth2 登录更新资料、last_login 等）时删除该用户的全部缓存
+其他进程中的缓存最迟 TTL 秒后过期。
+"""
+import copy
+import time
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class UserCache:
+
+    def __init__(self, ttl, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_key, user_id, session_hash):
+        with self._lock:
+            entry = self._entries.get(session_key)
+            if entry is None:
+                return None
+            expires_at, cached_id, cached_hash, user = entry
+            if expires_at < time.monotonic() or cached_id != user_id or cached_hash != session_hash:
+                del self._entries[session_key]
+                return None
+            self._entries.move_to_end(session_key)
+        # 返回副本，请求中对 user 的修改不影响缓存
+        return copy.copy(user)
+
+    def set(self, session_key, user_id, session_hash, user):
+        with self._lock:
+            self._entries[session_key] = (time.monotonic() + self.ttl, user_id, session_hash, copy.copy(user))
+            self._entries.move_to_end(session_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_session(self, session_key):
+        with self._lock:
+            self._entries.pop(session_key, None)
+
+    def invalidate_user(self, user_id):
+        user_id = str(user_id)
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if entry[1] == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_user_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = UserCache(settings.USER_CACHE_TTL)
+    return _cache
@@ -3,33 +3,55 @@
 """
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework import serializers, status
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination
+from rest_framework.exceptions import NotFound
 from rest_framework.decorators import api_view, permission_classes
 
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.shortcuts import render, redirect
 from django.contrib.auth import logout as auth_logout, login as auth_login
 from django.conf import settings
+from django.db import OperationalError, transaction
 from django.db.models import Q
-from django.http import HttpResponse
+from django.db.models.functions import Substr
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date, parse_datetime
+from django.http import HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+from asgiref.sync import async_to_sync, sync_to_async
 
 from requests_oauthlib import OAuth2Session
-from oauthlib.oauth2 import BackendApplicationClient
 
 from .models import Seminar, Avatar, Speaker, Voice, GenerationOrder, TTSOrder
+from . import outbox, catalog_cache, search, tts_callbacks, batch_callbacks, seminar_events, media
+from .db import retry_on_locked
+from .permissions import HasWorkerToken
+from .notify import push_seminar
+from .service_token import get_service_token, get_service_token_cache, service_session
+from .async_http import upstream_client
+from .voice_catalog import get_tts_voice_catalog, merge_voices
+from .images import Base64JSONBody, InvalidImage, normalize_image, processed_file
+from .portrait_cache import DEFAULT_PORTRAIT, get_portrait_cache, portrait_response, make_entry as make_portrait_entry
 from .serializers import (
     SeminarSerializer, AvatarSerializer, SpeakerSerializer,
+    SeminarListSerializer, AvatarListSerializer, SpeakerListSerializer,
     AvatarDetailSerializer, VoiceSerializer, GenerationOrderSerializer,
-    TTSOrderSerializer, TTSOrderCreateSerializer
+    TTSOrderSerializer, TTSOrderListSerializer, TTSOrderCreateSerializer,
+    expand_to_related, split_expand,
 )
 
+import asyncio
+import io
+import json
+import os
 import string
 import random
-import base64
 import logging
-import requests
 import time
 import datetime
 
@@ -55,6 +77,164 @@ class DefaultPagination(PageNumberPagination):
         })
 
 
+class KeysetPagination(CursorPagination):
+    """
+    游标分页：按索引列定位，不执行 COUNT(*) 和 OFFSET，深页性能不随页码下降。
+
+    通过 ?pagination=cursor 启用，?count=1 时额外返回总数。
+    DRF 的 CursorPagination 只按第一个排序字段定位，遇到相同值时退回 OFFSET；
+    这里游标记录全部排序字段的值，按 (date, id) 这样的组合键比较：
+        date < d OR (date = d AND id > i)
+    排序以唯一字段（id）结尾，位置唯一，不需要 OFFSET。
+    共享表（如 api_seminar）没有 (date, id) 组合索引，数据库只能用 date 上的索引（如有）定位。
+    """
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    page_size_query_param = 'size'
+    max_page_size = 100
+    template = None
+
+    def __init__(self, ordering):
+        self.ordering = ordering
+        self.count = None
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = [
+            instance[field.lstrip('-')] if isinstance(instance, dict) else getattr(instance, field.lstrip('-'))
+            for field in ordering
+        ]
+        return json.dumps([str(value) for value in values])
+
+    def _beyond(self, position, reverse):
+        """排在 position 之后（reverse 时为之前）的行"""
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get('count') in ('1', 'true'):
+            self.count = queryset.count()
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, current_position = 0, False, None
+        else:
+            offset, reverse, current_position = self.cursor
+
+        ordering = [('' if f.startswith('-') else '-') + f.lstrip('-') for f in self.ordering] if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            try:
+                queryset = queryset.filter(self._beyond(current_position, reverse))
+            except (ValidationError, ValueError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # 多取一行判断是否还有下一页
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following = len(results) > len(self.page)
+        following_position = self._get_position_from_instance(results[-1], self.ordering) if has_following else None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = has_following
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position = following_position
+            self.previous_position = current_position
+        return self.page
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data
+        }
+        if self.count is not None:
+            payload['count'] = self.count
+        return MyResponse(data=payload)
+
+
+def get_paginator(request, pagination_class, ordering):
+    """根据 ?pagination= 选择分页方式，默认页码分页"""
+    if request.query_params.get('pagination') == 'cursor' or 'cursor' in request.query_params:
+        return KeysetPagination(ordering)
+    return pagination_class()
+
+
+def list_options(request):
+    """解析列表接口的 ?fields=a,b 和 ?expand=x,y 参数"""
+    def split(name):
+        value = request.query_params.get(name, '')
+        return [v.strip() for v in value.split(',') if v.strip()]
+    return split('fields') or None, split('expand')
+
+
+def with_expand(queryset, serializer_class, expand):
+    """按 ?expand= 一次性加载嵌套输出需要的关联，避免逐行查询"""
+    select, prefetch = expand_to_related(expand, serializer_class)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+def cached_catalog_response(request, catalog, paginator, build_system, build_user=None, variant='', fields=None):
+    """
+    返回缓存的资源目录列表，带 ETag，未变化时返回 304。
+
+    Args:
+        catalog: 目录名，见 catalog_cache
+        paginator: 页码分页器，None 表示不分页
+        build_system / build_user: 生成系统 / 当前用户资源列表的函数
+        variant: 数据表示的变体（如 expand 参数），不同变体分别缓存
+        fields: 只返回这些字段，None 表示全部
+    """
+    user_id = request.user.id if build_user is not None else None
+    etag = catalog_cache.get_etag(catalog, user_id, request.get_full_path(), variant)
+    if etag is not None:
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+    data, hit = catalog_cache.get_catalog(
+        catalog, user_id,
+        lambda: list(build_system()),
+        (lambda: list(build_user())) if build_user is not None else None,
+        variant=variant,
+    )
+    if paginator is not None:
+        data = paginator.paginate_queryset(data, request)
+    if fields:
+        data = [{k: v for k, v in item.items() if k in fields} for item in data]
+    if paginator is not None:
+        response = paginator.get_paginated_response(data)
+    else:
+        response = MyResponse(data=data)
+    if etag is not None:
+        response['ETag'] = etag
+    response['X-Cache'] = 'HIT' if hit else 'MISS'
+    return response
+
+
 class UserSerializer(serializers.ModelSerializer):
     portrait = serializers.SerializerMethodField()
 
@@ -83,33 +263,39 @@ def user_me_view(request):
 
 
 @permission_classes([IsAuthenticated])
-def get_user_me_portrait(request):
-    user = request.user
-    access_token = request.session.get('oauth2_token', {}).get('access_token')
-    
+async def get_user_me_portrait(request):
+    user = await request.auser()
+    oauth2_token = await sync_to_async(request.session.get)('oauth2_token', {})
+    access_token = oauth2_token.get('access_token')
+
     # 本地登录没有 OAuth2 token，返回默认头像
     if not access_token:
-        return _default_portrait_response()
-    
-    user_photo_url = f"{settings.OAUTH2_USER_PHOTO_URL}?userId={user.username}&access_token={access_token}"
-    try:
-        response = requests.get(user_photo_url, timeout=5)
-    if response.status_code != 200:
-            return _default_portrait_response()
-    content_type = response.headers.get('Content-Type', 'application/unknown')
-    return HttpResponse(response.content, content_type=content_type)
-    except:
-        return _default_portrait_response()
+        return _default_portrait_response(request)
 
+    cache = get_portrait_cache()
+    entry = await sync_to_async(cache.get, thread_sensitive=False)(user.username)
+    if entry is None:
+        user_photo_url = f"{settings.OAUTH2_USER_PHOTO_URL}?userId={user.username}&access_token={access_token}"
+        try:
+            async with upstream_client(request) as client:
+                response = await client.get(user_photo_url, timeout=5)
+        except Exception:
+            return _default_portrait_response(request)
+        if response.status_code != 200:
+            return _default_portrait_response(request)
+        content_type = response.headers.get('Content-Type', 'application/unknown')
+        entry = make_portrait_entry(response.content, content_type, settings.PORTRAIT_CACHE_TTL)
+        await sync_to_async(cache.set, thread_sensitive=False)(user.username, entry)
+    return portrait_response(request, entry, settings.PORTRAIT_CACHE_TTL)
 
-def _default_portrait_response():
-    """返回默认头像 SVG"""
-    svg = '''<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 100 100">
-        <circle cx="50" cy="50" r="50" fill="#e0e0e0"/>
-        <circle cx="50" cy="38" r="18" fill="#9e9e9e"/>
-        <ellipse cx="50" cy="85" rx="30" ry="25" fill="#9e9e9e"/>
-    </svg>'''
-    return HttpResponse(svg, content_type='image/svg+xml')
+
+def _default_portrait_response(request):
+    """
+    返回默认头像 SVG。
+
+    上游失败时也会返回默认头像，不让浏览器缓存，恢复后下次请求即可拿到真实头像。
+    """
+    return portrait_response(request, DEFAULT_PORTRAIT, 0)
 
 
 def home(request):
@@ -138,21 +324,42 @@ def oauth2_login(request):
     return redirect(authorization_url)
 
 
-def oauth2_callback(request):
-    oauth2_session = OAuth2Session(
-        settings.OAUTH2_CLIENT_ID,
-        state=request.session['oauth2_state'],
-        redirect_uri=settings.OAUTH2_REDIRECT_URI
-    )
-    token = oauth2_session.fetch_token(
-        settings.OAUTH2_TOKEN_URL,
-        client_secret=settings.OAUTH2_CLIENT_SECRET,
-        authorization_response=request.build_absolute_uri()
-    )
+async def oauth2_callback(request):
+    expected_state = await sync_to_async(request.session.get)('oauth2_state')
+    if not expected_state or request.GET.get('state') != expected_state:
+        return HttpResponseBadRequest("invalid oauth2 state")
+    if 'error' in request.GET or not request.GET.get('code'):
+        return HttpResponseBadRequest(request.GET.get('error_description') or request.GET.get('error', 'missing code'))
+
+    async with upstream_client(request) as client:
+        response = await client.post(
+            settings.OAUTH2_TOKEN_URL,
+            data={
+                'grant_type': 'authorization_code',
+                'code': request.GET['code'],
+                'redirect_uri': settings.OAUTH2_REDIRECT_URI,
+            },
+            auth=(settings.OAUTH2_CLIENT_ID, settings.OAUTH2_CLIENT_SECRET),
+            headers={'Accept': 'application/json'},
+        )
+        response.raise_for_status()
+        token = response.json()
+        if 'expires_in' in token:
+            token['expires_at'] = time.time() + float(token['expires_in'])
+
+        response = await client.get(
+            settings.OAUTH2_USERINFO_URL,
+            headers={'Authorization': f"Bearer {token['access_token']}"},
+        )
+    userinfo = response.json()
+    userdata = userinfo.get('data', {})
+    next_url = await sync_to_async(_login_oauth2_user)(request, token, userdata)
+    return redirect(next_url)
+
+
+def _login_oauth2_user(request, token, userdata):
     request.session['oauth2_token'] = token
 
-    userinfo = oauth2_session.get(settings.OAUTH2_USERINFO_URL).json()
-    userdata = userinfo.get('data', {})
     username = userdata.get('userId')
     firstname = userdata.get('name', 'N/A')
     email = userdata.get('email', '')
@@ -164,21 +371,23 @@ def oauth2_callback(request):
         user.save()
 
     auth_login(request, user)
-    next_url = request.session.pop('next_url', settings.LOGIN_REDIRECT_URL)
-    return redirect(next_url)
+    return request.session.pop('next_url', settings.LOGIN_REDIRECT_URL)
 
 
 class SeminarDetailView(APIView):
     permission_classes = [IsAuthenticated]
+    read_replica = True
 
     def get(self, request, seminar_id):
+        _, expand = list_options(request)
         try:
-            seminar = Seminar.objects.get(id=seminar_id, owner=request.user)
+            seminar = with_expand(Seminar.objects, SeminarSerializer, expand).get(id=seminar_id, owner=request.user)
         except Seminar.DoesNotExist:
             return MyResponse(code=404, error="Seminar not exists", status=status.HTTP_404_NOT_FOUND)
-        serializer = SeminarSerializer(seminar)
+        serializer = SeminarSerializer(seminar, expand=expand)
         return MyResponse(data=serializer.data)
 
+    @retry_on_locked
     def put(self, request, seminar_id):
         new_state = request.data.get('state', None)
         if new_state not in ['archived', 'draft', None]:
@@ -193,7 +402,13 @@ class SeminarDetailView(APIView):
 
         if fromto == 'draft-archived':
             try:
-                GenerationOrder.objects.create(seminar=serializer.instance)
+                with transaction.atomic():
+                    generation_order = GenerationOrder.objects.create(seminar=serializer.instance)
+                    if settings.GENERATION_ORDER_DISPATCH_ENABLED:
+                        outbox.enqueue_generation_order(generation_order)
+            except OperationalError:
+                # 锁冲突交给 retry_on_locked 整体回滚重试
+                raise
             except Exception as e:
                 _logger.error(f"创建生成任务失败: {str(e)}", exc_info=True)
                 return MyResponse(code=400, error=f"创建生成任务失败 {e}", status=status.HTTP_400_BAD_REQUEST)
@@ -203,7 +418,8 @@ class SeminarDetailView(APIView):
             serializer.instance.status.update(dict(step=2))
 
         if serializer.is_valid():
-            serializer.save()
+            seminar = serializer.save()
+            push_seminar(seminar)
             return MyResponse(data=serializer.data)
         return MyResponse(code=400, error=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -215,8 +431,69 @@ class SeminarDetailView(APIView):
         return MyResponse(status=status.HTTP_204_NO_CONTENT)
 
 
+def _sse_event(data, event='progress'):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _seminar_progress(seminar_id):
+    return Seminar.objects.filter(id=seminar_id).values('state', 'status').first()
+
+
+async def _seminar_event_stream(seminar_id, initial):
+    """
+    推送微课 state / status 的变化：先发送当前值，之后只在变化时发送。
+
+    没有进程内事件时每 SEMINAR_EVENTS_POLL_INTERVAL 秒回查数据库（geminar-admin 的写入），
+    连接超过 SEMINAR_EVENTS_MAX_DURATION 后结束，由客户端（EventSource）自动重连。
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.SEMINAR_EVENTS_MAX_DURATION
+    subscription = seminar_events.broker.subscribe(seminar_id)
+    last = initial
+    last_sent = loop.time()
+    try:
+        yield f"retry: {int(settings.SEMINAR_EVENTS_POLL_INTERVAL * 1000)}\n"
+        yield _sse_event(initial)
+        while loop.time() < deadline:
+            data = await subscription.wait(settings.SEMINAR_EVENTS_POLL_INTERVAL)
+            if data is None:
+                data = await sync_to_async(_seminar_progress, thread_sensitive=False)(seminar_id)
+                if data is None:
+                    yield _sse_event({}, event='deleted')
+                    return
+            current = {'state': data['state'], 'status': data['status']}
+            if current != last:
+                last = current
+                last_sent = loop.time()
+                yield _sse_event(current)
+            elif loop.time() - last_sent >= settings.SEMINAR_EVENTS_KEEPALIVE:
+                last_sent = loop.time()
+                yield ": keepalive\n\n"
+    finally:
+        seminar_events.broker.unsubscribe(subscription)
+
+
+async def seminar_events_view(request, seminar_id):
+    """微课生成进度 SSE（text/event-stream），只推送 state / status"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+    initial = await sync_to_async(
+        lambda: Seminar.objects.filter(id=seminar_id, owner=user).values('state', 'status').first()
+    )()
+    if initial is None:
+        return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+
+    response = StreamingHttpResponse(_seminar_event_stream(seminar_id, initial), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # 关闭 nginx 缓冲，事件立即送达
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 class SeminarsView(APIView):
     permission_classes = [IsAuthenticated]
+    read_replica = True
     pagination_class = DefaultPagination
 
     def get(self, request):
@@ -234,16 +511,31 @@ class SeminarsView(APIView):
         if param_name and len(param_name.strip()) > 0:
             query &= Q(title__icontains=param_name)
 
-        seminars = Seminar.objects.filter(query).order_by('-date')
-
-        paginator = self.pagination_class()
+        fields, expand = list_options(request)
+        seminars = with_expand(Seminar.objects.filter(query).defer('resources').order_by('-date'), SeminarListSerializer, expand)
+
+        # 全文搜索标题和简介，按相关度排序；计数与分页在索引查询中完成
+        param_search = request.query_params.get('search', '').strip()
+        if param_search:
+            ranked = search.search_seminars(user.id, param_search, seminars)
+            if ranked is None:
+                seminars = seminars.filter(Q(title__icontains=param_search) | Q(description__icontains=param_search))
+            else:
+                seminars = ranked
+
+        if param_search:
+            # 按相关度排序时不支持游标分页
+            paginator = self.pagination_class()
+        else:
+            paginator = get_paginator(request, self.pagination_class, ('-date', 'id'))
         page = paginator.paginate_queryset(seminars, request)
         if page is not None:
-            serializer = SeminarSerializer(page, many=True)
+            serializer = SeminarListSerializer(page, many=True, fields=fields, expand=expand)
             return paginator.get_paginated_response(serializer.data)
 
         return MyResponse(code=404, error="未找到微课", status=status.HTTP_404_NOT_FOUND)
 
+    @retry_on_locked
     def post(self, request):
         title = request.data.get('title')
         description = request.data.get('description', '')
@@ -273,23 +565,40 @@ class SeminarsView(APIView):
 
 class AvatarsView(APIView):
     permission_classes = [IsAuthenticated]
+    read_replica = True
     pagination_class = DefaultPagination
 
     def get(self, request):
-        avatars = Avatar.objects.filter(Q(type='system') | Q(owner=request.user))
-        paginator = self.pagination_class()
+        fields, expand = list_options(request)
+        expand = sorted(expand)
+        paginator = get_paginator(request, self.pagination_class, ('id',))
+
+        def avatars_of(query):
+            return with_expand(Avatar.objects.filter(query), AvatarListSerializer, expand)
+
+        if not isinstance(paginator, KeysetPagination):
+            return cached_catalog_response(
+                request, 'avatar', paginator,
+                lambda: AvatarListSerializer(avatars_of(Q(type='system')), many=True, expand=expand).data,
+                lambda: AvatarListSerializer(avatars_of(Q(owner=request.user) & ~Q(type='system')), many=True, expand=expand).data,
+                variant=','.join(expand),
+                fields=fields,
+            )
+
+        avatars = avatars_of(Q(type='system') | Q(owner=request.user))
         page = paginator.paginate_queryset(avatars, request)
         if page is not None:
-            serializer = AvatarSerializer(page, many=True)
+            serializer = AvatarListSerializer(page, many=True, fields=fields, expand=expand)
             return paginator.get_paginated_response(serializer.data)
         return MyResponse(code=404, error="未找到头像", status=status.HTTP_404_NOT_FOUND)
 
 
 class AvatarDetailView(APIView):
     permission_classes = [IsAuthenticated]
+    read_replica = True
 
     def get(self, request, avatar_id):
-        avatar = Avatar.objects.get(id=avatar_id)
+        avatar = Avatar.objects.prefetch_related('actions').get(id=avatar_id)
         serializer = AvatarDetailSerializer(avatar)
         return MyResponse(data=serializer.data)
 
@@ -311,13 +620,15 @@ class AvatarDetailView(APIView):
 
 class SpeakerDetailView(APIView):
     permission_classes = [IsAuthenticated]
+    read_replica = True
 
     def get(self, request, speaker_id):
+        _, expand = list_options(request)
         try:
-            speaker = Speaker.objects.get(id=speaker_id, owner=request.user)
+            speaker = with_expand(Speaker.objects, SpeakerSerializer, expand).get(id=speaker_id, owner=request.user)
         except Speaker.DoesNotExist:
             return MyResponse(code=404, error="Speaker not exists", status=status.HTTP_404_NOT_FOUND)
-        serializer = SpeakerSerializer(speaker)
+        serializer = SpeakerSerializer(speaker, expand=expand)
         return MyResponse(data=serializer.data)
 
     def put(self, request, speaker_id):
@@ -338,28 +649,69 @@ class SpeakerDetailView(APIView):
 
 class SpeakersView(APIView):
     permission_classes = [IsAuthenticated]
+    read_replica = True
     pagination_class = DefaultPagination
 
     def get(self, request):
-        speakers = Speaker.objects.filter(Q(type='system') | Q(owner=request.user))
-        paginator = self.pagination_class()
+        fields, expand = list_options(request)
+        expand = sorted(expand)
+        paginator = get_paginator(request, self.pagination_class, ('id',))
+
+        def speakers_of(query):
+            return with_expand(Speaker.objects.filter(query), SpeakerListSerializer, expand)
+
+        if not isinstance(paginator, KeysetPagination):
+            return cached_catalog_response(
+                request, 'speaker', paginator,
+                lambda: SpeakerListSerializer(speakers_of(Q(type='system')), many=True, expand=expand).data,
+                lambda: SpeakerListSerializer(speakers_of(Q(owner=request.user) & ~Q(type='system')), many=True, expand=expand).data,
+                variant=','.join(expand) + ':' + catalog_cache.dependency_stamp(
+                    set(split_expand(expand)) & set(SpeakerListSerializer.expandable_fields), request.user.id
+                ),
+                fields=fields,
+            )
+
+        speakers = speakers_of(Q(type='system') | Q(owner=request.user))
         page = paginator.paginate_queryset(speakers, request)
         if page is not None:
-            serializer = SpeakerSerializer(page, many=True)
+            serializer = SpeakerListSerializer(page, many=True, fields=fields, expand=expand)
             return paginator.get_paginated_response(serializer.data)
         return MyResponse(code=404, error="未找到讲师", status=status.HTTP_404_NOT_FOUND)
 
+    @staticmethod
+    async def _fetch_user_photo(username, access_token):
+        """
+        获取用户照片，同时预热服务 token，两个上游请求并发进行。
+
+        由同步视图经 async_to_sync 调用，每次都在新的事件循环中运行，使用用后即关的客户端。
+        """
+        user_photo_url = f"{settings.OAUTH2_USER_PHOTO_URL}?userId={username}"
+        async with upstream_client() as client:
+            photo, _ = await asyncio.gather(
+                client.get(user_photo_url, headers={'Authorization': f"Bearer {access_token}"}),
+                sync_to_async(get_service_token, thread_sensitive=False)(),
+            )
+        return photo
+
+    def initialize_request(self, request, *args, **kwargs):
+        # 上传的照片直接落盘，不在内存中保留完整文件
+        if request.method == 'POST':
+            request.upload_handlers = [TemporaryFileUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
     def _verify_face(self, new_photo, user_avatar):
-        client = BackendApplicationClient(client_id=settings.OAUTH2_CLIENT_ID)
-        session = OAuth2Session(client=client)
-        token = session.fetch_token(
-            token_url=settings.OAUTH2_TOKEN_URL,
-            client_secret=settings.OAUTH2_CLIENT_SECRET,
-            include_client_id=True
-        )
+        """new_photo / user_avatar 为处理后的图片文件，请求体边读边编码"""
         headers = {'Content-Type': 'application/json'}
-        data = {'image1': new_photo, 'image2': user_avatar}
-        response = session.post(url=settings.OAUTH2_FACE_COMPARE_URL, headers=headers, json=data)
+
+        def compare():
+            body = Base64JSONBody([('image1', new_photo), ('image2', user_avatar)])
+            return service_session().post(url=settings.OAUTH2_FACE_COMPARE_URL, headers=headers, data=body)
+
+        response = compare()
+        if response.status_code == 401:
+            # 缓存的 token 已被上游作废，刷新后重试一次
+            get_service_token_cache().invalidate()
+            response = compare()
         if response.status_code == 200:
             result = response.json()
             confidence = result['data']['confidence']
@@ -372,35 +724,41 @@ class SpeakersView(APIView):
         portrait = request.FILES.get('portrait')
         if not portrait:
             return MyResponse(code=400, error="未提供照片", status=status.HTTP_400_BAD_REQUEST)
-        portrait_content = portrait.read()
-
-        # 人脸验证（可通过 FACE_VERIFY_ENABLED 配置关闭）
-        if settings.FACE_VERIFY_ENABLED:
-            oauth2_token = request.session.get('oauth2_token')
-            if not oauth2_token:
-                return MyResponse(code=400, error="人脸验证需要 OAuth2 登录", status=status.HTTP_400_BAD_REQUEST)
-
-        user_photo_url = f"{settings.OAUTH2_USER_PHOTO_URL}?userId={request.user.username}"
-            oauth2_session = OAuth2Session(settings.OAUTH2_CLIENT_ID, token=oauth2_token)
-        response = oauth2_session.get(user_photo_url)
-        if response.status_code != 200:
-            return MyResponse(code=400, error=f"获取用户头像失败", status=status.HTTP_400_BAD_REQUEST)
-
-        user_avatar = response.content
-        if not user_avatar:
-            return MyResponse(code=400, error="用户没有头像", status=status.HTTP_400_BAD_REQUEST)
-
-        encoded_portrait = base64.b64encode(portrait_content).decode('utf-8')
-        encoded_user_avatar = base64.b64encode(user_avatar).decode('utf-8')
-        if not self._verify_face(encoded_portrait, encoded_user_avatar):
-            return MyResponse(code=400, error="人脸验证失败", status=status.HTTP_400_BAD_REQUEST)
-
-        random_suffix = ''.join(random.choices(string.ascii_letters + string.digits, k=8))
-        new_avatar = Avatar.objects.create(
-            name=f"{request.user.username}-{random_suffix}",
-            portrait=portrait,
-            owner=request.user
-        )
+        try:
+            processed_portrait = normalize_image(portrait, settings.SPEAKER_PORTRAIT_MAX_SIDE)
+        except InvalidImage:
+            return MyResponse(code=400, error="照片格式无效", status=status.HTTP_400_BAD_REQUEST)
+        finally:
+            portrait.close()
+
+        with processed_portrait:
+            # 人脸验证（可通过 FACE_VERIFY_ENABLED 配置关闭）
+            if settings.FACE_VERIFY_ENABLED:
+                oauth2_token = request.session.get('oauth2_token')
+                if not oauth2_token:
+                    return MyResponse(code=400, error="人脸验证需要 OAuth2 登录", status=status.HTTP_400_BAD_REQUEST)
+
+                response = async_to_sync(self._fetch_user_photo)(request.user.username, oauth2_token.get('access_token'))
+                if response.status_code != 200:
+                    return MyResponse(code=400, error=f"获取用户头像失败", status=status.HTTP_400_BAD_REQUEST)
+
+                if not response.content:
+                    return MyResponse(code=400, error="用户没有头像", status=status.HTTP_400_BAD_REQUEST)
+                try:
+                    user_avatar = normalize_image(io.BytesIO(response.content), settings.SPEAKER_PORTRAIT_MAX_SIDE)
+                except InvalidImage:
+                    return MyResponse(code=400, error="用户头像格式无效", status=status.HTTP_400_BAD_REQUEST)
+
+                with user_avatar:
+                    if not self._verify_face(processed_portrait, user_avatar):
+                        return MyResponse(code=400, error="人脸验证失败", status=status.HTTP_400_BAD_REQUEST)
+
+            random_suffix = ''.join(random.choices(string.ascii_letters + string.digits, k=8))
+            new_avatar = Avatar.objects.create(
+                name=f"{request.user.username}-{random_suffix}",
+                portrait=processed_file(processed_portrait, portrait.name),
+                owner=request.user
+            )
 
         voice_id = request.POST.get('voice', None)
         if not voice_id:
@@ -419,41 +777,65 @@ class SpeakersView(APIView):
         return MyResponse(data=serializer.data, status=status.HTTP_201_CREATED)
 
 
+class MediaView(APIView):
+    """媒体文件下载（头像、讲师封面、音色样本），检查访问权限后由 nginx 发送"""
+    permission_classes = [IsAuthenticated]
+    read_replica = True
+
+    def get(self, request, name):
+        if media.media_path(name) is None or not media.can_access(request.user, name):
+            return MyResponse(code=404, error="文件不存在", status=status.HTTP_404_NOT_FOUND)
+        return media.serve_file(request, name)
+
+
 class VoicesView(APIView):
     permission_classes = [IsAuthenticated]
+    read_replica = True
 
     def get(self, request):
         """
         获取可用音色列表。
         
         Query params:
-            source: 数据源，'tts' 从 TTS 服务获取，默认从数据库
+            source: 数据源，'tts' 从 TTS 服务获取，'all' 合并数据库和 TTS 服务，默认从数据库
         """
         source = request.query_params.get('source', 'db')
-        
-        if source == 'tts':
-            # 从 TTS 服务获取
+
+        if source in ('tts', 'all'):
+            # 从 TTS 服务获取（进程内缓存，过期后台刷新）
             try:
-                from dataclasses import asdict
-                from text_to_speech import StreamTTSProvider
-                provider = StreamTTSProvider()
-                voices = provider.list_voices()
-                data = [asdict(v) for v in voices]
-                return MyResponse(data=data)
+                tts_voices = get_tts_voice_catalog().get_voices()
             except ImportError:
                 return MyResponse(code=500, error="TTS 功能未启用", status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             except Exception as e:
                 return MyResponse(code=500, error=str(e), status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
+            if source == 'tts':
+                return MyResponse(data=tts_voices)
+
+            db_voices, _ = catalog_cache.get_catalog(
+                'voice', None, lambda: list(VoiceSerializer(Voice.objects.all(), many=True).data)
+            )
+            return MyResponse(data=merge_voices(db_voices, tts_voices))
+
         # 默认从数据库获取
-        voices = Voice.objects.all()
-        serializer = VoiceSerializer(voices, many=True)
-        return MyResponse(data=serializer.data)
+        return cached_catalog_response(
+            request, 'voice', None,
+            lambda: VoiceSerializer(Voice.objects.all(), many=True).data,
+        )
+
+
+class CatalogCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """资源目录缓存命中统计（仅本 worker 进程，多 worker 时分别统计）"""
+        return MyResponse(data=catalog_cache.catalog_cache_stats())
 
 
 class GenerationOrdersView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @retry_on_locked
     def post(self, request):
         seminar_id = request.data.get('seminar', None)
         if not Seminar.objects.filter(id=seminar_id).exists():
@@ -468,45 +850,123 @@ class GenerationOrdersView(APIView):
         return MyResponse(data=serializer.data)
 
 
+def _parse_datetime_param(value, end_of_day=False):
+    """解析 ISO 日期/时间查询参数，纯日期按当天开始（或结束）处理"""
+    try:
+        moment = parse_datetime(value)
+        day = parse_date(value) if moment is None else None
+    except ValueError:
+        return None
+    if moment is None:
+        if day is None:
+            return None
+        moment = datetime.datetime.combine(day, datetime.time.max if end_of_day else datetime.time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
 class TTSOrdersView(APIView):
     """TTS 转换任务 API"""
     permission_classes = [IsAuthenticated]
+    read_replica = True
+
+    pagination_class = DefaultPagination
+    text_preview_length = 100
 
     def get(self, request):
-        """获取当前用户的 TTS 任务列表"""
-        orders = TTSOrder.objects.filter(owner=request.user)
-        serializer = TTSOrderSerializer(orders, many=True)
-        return MyResponse(data=serializer.data)
+        """
+        获取当前用户的 TTS 任务列表（分页，不含完整文本）。
 
+        Query params:
+            state: 状态过滤，多个用逗号分隔
+            created_after / created_before: 创建时间范围（ISO 日期或时间）
+        """
+        query = Q(owner=request.user)
+
+        param_state = request.query_params.get('state', None)
+        states = [s.strip() for s in param_state.split(',')] if param_state else []
+        if states and not (len(states) == 1 and states[0] in ['all', '全部']):
+            query &= Q(state__in=states)
+
+        for param, lookup in (('created_after', 'created_at__gte'), ('created_before', 'created_at__lte')):
+            value = request.query_params.get(param, None)
+            if not value:
+                continue
+            moment = _parse_datetime_param(value, end_of_day=(param == 'created_before'))
+            if moment is None:
+                return MyResponse(code=400, error=f"{param} 格式错误", status=status.HTTP_400_BAD_REQUEST)
+            query &= Q(**{lookup: moment})
+
+        orders = (
+            TTSOrder.objects.filter(query)
+            .only('id', 'spk_id', 'state', 'status', 'output_file', 'created_at', 'updated_at')
+            .annotate(text_preview=Substr('text', 1, self.text_preview_length))
+            .order_by('-created_at')
+        )
+
+        paginator = get_paginator(request, self.pagination_class, ('-created_at', 'id'))
+        page = paginator.paginate_queryset(orders, request)
+        serializer = TTSOrderListSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @retry_on_locked
     def post(self, request):
         """创建 TTS 转换任务"""
         serializer = TTSOrderCreateSerializer(data=request.data)
         if not serializer.is_valid():
             return MyResponse(code=400, error=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        # 创建任务
-        order = TTSOrder.objects.create(
-            text=serializer.validated_data['text'],
-            spk_id=serializer.validated_data['spk_id'],
-            owner=request.user
-        )
-
-        # 发送到消息队列（由 geminar-worker 处理）
-        try:
-            from .tasks import send_tts_order_to_queue
-            send_tts_order_to_queue(order)
-        except Exception as e:
-            order.state = 'failed'
-            order.status = {'error': f'发送任务失败: {str(e)}'}
-            order.save()
-            return MyResponse(code=500, error=f"任务创建失败: {str(e)}", status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        # 创建任务，同一事务写入 outbox，由 relay_outbox 发送到消息队列（由 geminar-worker 处理）
+        with transaction.atomic():
+            order = TTSOrder.objects.create(
+                text=serializer.validated_data['text'],
+                spk_id=serializer.validated_data['spk_id'],
+                owner=request.user
+            )
+            outbox.enqueue_tts_orders([order])
 
         return MyResponse(data=TTSOrderSerializer(order).data)
 
 
+class TTSOrdersBatchView(APIView):
+    """TTS 批量转换任务 API"""
+    permission_classes = [IsAuthenticated]
+    max_batch_size = 200
+
+    @retry_on_locked
+    def post(self, request):
+        """
+        批量创建 TTS 转换任务。
+
+        Body: [{"text": "...", "spk_id": "..."}, ...]，或 {"items": [...]}
+        """
+        items = request.data.get('items') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return MyResponse(code=400, error="items 必须为非空列表", status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.max_batch_size:
+            return MyResponse(code=400, error=f"单次最多提交 {self.max_batch_size} 个任务", status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = TTSOrderCreateSerializer(data=items, many=True)
+        if not serializer.is_valid():
+            return MyResponse(code=400, error=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        orders = [
+            TTSOrder(text=item['text'], spk_id=item['spk_id'], owner=request.user)
+            for item in serializer.validated_data
+        ]
+        with transaction.atomic():
+            TTSOrder.objects.bulk_create(orders)
+            outbox.enqueue_tts_orders(orders)
+
+        results = [{'id': str(order.id), 'state': order.state} for order in orders]
+        return MyResponse(data=results, status=status.HTTP_201_CREATED)
+
+
 class TTSOrderDetailView(APIView):
     """TTS 任务详情 API"""
     permission_classes = [IsAuthenticated]
+    read_replica = True
 
     def get(self, request, order_id):
         """获取 TTS 任务详情"""
@@ -517,28 +977,84 @@ class TTSOrderDetailView(APIView):
         return MyResponse(data=TTSOrderSerializer(order).data)
 
 
+class TTSOrderAudioView(APIView):
+    """TTS 任务音频下载（支持 Range，文件由 nginx 发送）"""
+    permission_classes = [IsAuthenticated]
+    read_replica = True
+
+    def get(self, request, order_id):
+        output_file = TTSOrder.objects.filter(id=order_id, owner=request.user).values_list('output_file', flat=True).first()
+        if output_file is None:
+            return MyResponse(code=404, error="任务不存在", status=status.HTTP_404_NOT_FOUND)
+        name = media.output_name(output_file)
+        if not name:
+            return MyResponse(code=404, error="音频尚未生成", status=status.HTTP_404_NOT_FOUND)
+        return media.serve_file(request, name, filename=os.path.basename(name))
+
+
 class TTSOrderCallbackView(APIView):
     """TTS 任务回调 API（供 worker 调用）"""
     permission_classes = []  # Worker 内部调用，不需要认证
 
+    @retry_on_locked
     def post(self, request, order_id):
-        """更新 TTS 任务状态"""
-        try:
-            order = TTSOrder.objects.get(id=order_id)
-        except TTSOrder.DoesNotExist:
-            return MyResponse(code=404, error="任务不存在", status=status.HTTP_404_NOT_FOUND)
+        """
+        更新 TTS 任务状态。
 
+        只写入变化的字段；乱序的旧进度和终态之后的回调会被忽略（applied=false）。
+        """
+        if not isinstance(request.data, dict):
+            return MyResponse(code=400, error="请求体必须为对象", status=status.HTTP_400_BAD_REQUEST)
         state = request.data.get('state')
         status_data = request.data.get('status', {})
         output_file = request.data.get('output_file', '')
+        error = tts_callbacks.validate_callback(state, status_data, output_file)
+        if error:
+            return MyResponse(code=400, error=error, status=status.HTTP_400_BAD_REQUEST)
 
-        if state:
-            order.state = state
-        if status_data:
-            order.status = status_data
-        if output_file:
-            order.output_file = output_file
-        order.save()
+        try:
+            data, applied = tts_callbacks.submit_callback(order_id, state, status_data, output_file)
+        except tts_callbacks.OrderNotFound:
+            return MyResponse(code=404, error="任务不存在", status=status.HTTP_404_NOT_FOUND)
 
-        return MyResponse(data=TTSOrderSerializer(order).data)
+        return MyResponse(data={
+            'id': str(order_id),
+            'state': data.get('state'),
+            'status': data.get('status'),
+            'output_file': data.get('output_file'),
+            'applied': applied,
+        })
+
+
+class CallbackBatchView(APIView):
+    """批量回调 API（供 worker 按固定节奏汇总上报）"""
+    authentication_classes = []
+    permission_classes = [HasWorkerToken]  # Worker 内部调用，校验共享 token
+    max_batch_size = 1000
+
+    @retry_on_locked
+    def post(self, request):
+        """
+        批量更新任务状态，一个事务内完成。
+
+        Body: {
+            "tts_orders": [{"id", "state", "status", "output_file"}, ...],
+            "seminars": [{"id", "state", "status"}, ...],
+            "generation_orders": [{"id", "state", "status"}, ...]
+        }
+        每一类均可省略，每条只接受上述字段；按提交顺序返回每条的处理结果（applied / skipped / not_found / invalid）
+        """
+        if not isinstance(request.data, dict):
+            return MyResponse(code=400, error="请求体必须为对象", status=status.HTTP_400_BAD_REQUEST)
+
+        batches = {}
+        for kind in ('tts_orders', 'seminars', 'generation_orders'):
+            items = request.data.get(kind) or []
+            if not isinstance(items, list):
+                return MyResponse(code=400, error=f"{kind} 必须为列表", status=status.HTTP_400_BAD_REQUEST)
+            batches[kind] = items
+        if sum(len(items) for items in batches.values()) > self.max_batch_size:
+            return MyResponse(code=400, error=f"单次最多提交 {self.max_batch_size} 条更新", status=status.HTTP_400_BAD_REQUEST)
+
+        return MyResponse(data=batch_callbacks.apply_batch(**batches))
 
@@ -0,0 +1,139 @@
+"""
+TTS 音色目录缓存 - VoicesView?source=tts
+
+StreamTTSProvider 进程内只创建一次，list_voices() 的结果缓存 TTS_VOICES_TTL 秒。
+过期后先返回旧数据，同时在后台线程刷新（stale-while-revalidate），
+请求不会因为 TTS 服务慢而阻塞；只有首次加载需要同步等待。
+刷新失败时继续返回旧数据，TTS_VOICES_RETRY_INTERVAL 秒后再重试；
+首次加载失败后同样在重试间隔内直接返回上次的错误，不会每个请求都打到 TTS 服务。
+"""
+import time
+import logging
+import threading
+from dataclasses import asdict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# TTS 音色中可能作为 ID 的字段，用于与数据库 Voice.code 去重
+_VOICE_ID_FIELDS = ('id', 'spk_id', 'code')
+
+
+def _default_provider_factory():
+    from text_to_speech import StreamTTSProvider
+    return StreamTTSProvider()
+
+
+class TTSVoiceCatalog:
+
+    def __init__(self, provider_factory=_default_provider_factory, ttl=300, retry_interval=30):
+        self.provider_factory = provider_factory
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self._provider = None
+        self._voices = None
+        self._loaded_at = 0
+        self._error = None
+        self._failed_at = 0
+        # _load_lock 串行化对 TTS 服务的请求；_flag_lock 只保护 _refreshing，不会等待慢请求
+        self._load_lock = threading.Lock()
+        self._flag_lock = threading.Lock()
+        self._refreshing = False
+
+    def _get_provider(self):
+        if self._provider is None:
+            self._provider = self.provider_factory()
+        return self._provider
+
+    def _load(self):
+        voices = [asdict(v) for v in self._get_provider().list_voices()]
+        self._voices = voices
+        self._loaded_at = time.monotonic()
+        self._error = None
+        return voices
+
+    def _refresh_in_background(self):
+        with self._flag_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                with self._load_lock:
+                    self._load()
+            except Exception as e:
+                # 推迟下次刷新，重试间隔内继续返回旧数据
+                self._loaded_at = time.monotonic() - self.ttl + self.retry_interval
+                logger.warning(f"Failed to refresh TTS voices, keep serving stale list: {e}")
+            finally:
+                with self._flag_lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name='tts-voice-refresh', daemon=True).start()
+
+    def _load_first(self):
+        with self._load_lock:
+            if self._voices is not None:
+                return self._voices
+            if self._error is not None and time.monotonic() - self._failed_at < self.retry_interval:
+                raise self._error
+            try:
+                return self._load()
+            except ImportError:
+                raise
+            except Exception as e:
+                self._error = e
+                self._failed_at = time.monotonic()
+                raise
+
+    def get_voices(self):
+        """
+        获取 TTS 音色列表（dict 列表）。
+
+        Raises:
+            ImportError: 未安装 TTS 功能
+        """
+        voices = self._voices
+        if voices is None:
+            return self._load_first()
+        if time.monotonic() - self._loaded_at > self.ttl:
+            self._refresh_in_background()
+        return voices
+
+    def invalidate(self):
+        self._voices = None
+
+
+def voice_id(voice):
+    for field in _VOICE_ID_FIELDS:
+        if voice.get(field):
+            return str(voice[field])
+    return None
+
+
+def merge_voices(db_voices, tts_voices):
+    """
+    合并数据库音色和 TTS 服务音色，TTS 音色与数据库 Voice.code 相同时以数据库为准。
+    """
+    merged = [dict(v, source='db') for v in db_voices]
+    known = {str(v.get('code')) for v in db_voices}
+    for voice in tts_voices:
+        if voice_id(voice) in known:
+            continue
+        merged.append(dict(voice, source='tts'))
+    return merged
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_tts_voice_catalog():
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = TTSVoiceCatalog(ttl=settings.TTS_VOICES_TTL, retry_interval=settings.TTS_VOICES_RETRY_INTERVAL)
+    return _catalog
@@ -2,13 +2,17 @@ import os
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
+from channels.security.websocket import AllowedHostsOriginValidator
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'geminar_console.settings')
 
 django_asgi_app = get_asgi_application()
 
+from console_app.routing import websocket_urlpatterns  # noqa: E402  需在 Django 初始化之后导入
+
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
-    # WebSocket routes can be added here
+    "websocket": AllowedHostsOriginValidator(
+        AuthMiddlewareStack(URLRouter(websocket_urlpatterns))
+    ),
 })
-
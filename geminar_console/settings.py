@@ -5,6 +5,7 @@ Django settings for geminar-console
 from pathlib import Path
 from decouple import config
 from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
 import os
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -72,9 +73,54 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD', default=''),
         'HOST': config('DB_HOST', default=''),
         'PORT': config('DB_PORT', default=''),
+        # 持久连接，避免每个请求重新建立连接（SQLite 还需重新执行 pragma）
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# SQLite 调优：busy_timeout 在锁冲突时等待而不是立即报错
+DB_BUSY_TIMEOUT = config('DB_BUSY_TIMEOUT', default=5, cast=float)
+SQLITE_PRAGMAS = {
+    'busy_timeout': int(DB_BUSY_TIMEOUT * 1000),
+    'mmap_size': config('DB_SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int),
+    'cache_size': -config('DB_SQLITE_CACHE_KB', default=64 * 1024, cast=int),
+    'temp_store': 'MEMORY',
+}
+# WAL 允许读写并发，但需要与数据库同目录的 -wal / -shm 文件：只在所有容器（含 geminar-admin）
+# 都挂载数据库所在目录、且位于同一主机时开启（DB_SQLITE_JOURNAL_MODE=WAL），默认不修改
+DB_SQLITE_JOURNAL_MODE = config('DB_SQLITE_JOURNAL_MODE', default='')
+if DB_SQLITE_JOURNAL_MODE:
+    SQLITE_PRAGMAS['journal_mode'] = DB_SQLITE_JOURNAL_MODE
+    if DB_SQLITE_JOURNAL_MODE.upper() == 'WAL':
+        SQLITE_PRAGMAS['synchronous'] = 'NORMAL'
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default']['OPTIONS'] = {'timeout': DB_BUSY_TIMEOUT}
+    # Django 5.1+：IMMEDIATE 事务在开始时即获取写锁，避免读锁升级写锁时直接失败
+    DB_SQLITE_TRANSACTION_MODE = config('DB_SQLITE_TRANSACTION_MODE', default='')
+    if DB_SQLITE_TRANSACTION_MODE:
+        DATABASES['default']['OPTIONS']['transaction_mode'] = DB_SQLITE_TRANSACTION_MODE
+
+# 只读副本（可选）：配置 DB_REPLICA_NAME 后，只读视图的 GET 请求读副本，
+# 同一客户端写操作后 DB_REPLICA_STICKY_SECONDS 秒内仍读主库
+DB_REPLICA_NAME = config('DB_REPLICA_NAME', default='')
+DB_REPLICA_STICKY_SECONDS = config('DB_REPLICA_STICKY_SECONDS', default=5, cast=int)
+if DB_REPLICA_NAME:
+    DATABASES['replica'] = dict(
+        DATABASES['default'],
+        NAME=DB_REPLICA_NAME,
+        USER=config('DB_REPLICA_USER', default=DATABASES['default']['USER']),
+        PASSWORD=config('DB_REPLICA_PASSWORD', default=DATABASES['default']['PASSWORD']),
+        HOST=config('DB_REPLICA_HOST', default=DATABASES['default']['HOST']),
+        PORT=config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+    )
+    DATABASE_ROUTERS = ['console_app.db.ReplicaRouter']
+    MIDDLEWARE.append('console_app.middleware.ReplicaRoutingMiddleware')
+
+# 写操作遇到 "database is locked" 时的重试
+DB_LOCKED_RETRIES = config('DB_LOCKED_RETRIES', default=5, cast=int)
+DB_LOCKED_RETRY_BACKOFF = config('DB_LOCKED_RETRY_BACKOFF', default=0.05, cast=float)
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -93,9 +139,19 @@ STATIC_ROOT = BASE_DIR / 'statics'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# 测试时创建共享表（managed = False）
+TEST_RUNNER = 'console_app.test_runner.ConsoleTestRunner'
+
 MEDIA_URL = config('MEDIA_URL', default='/medias/')
 MEDIA_ROOT = config('MEDIA_ROOT', default=BASE_DIR / 'medias')
 
+# 内容寻址存储（头像 / 音色样本）：MEDIA_ROOT 下的目录，及其文件的缓存时间（秒）
+CONTENT_STORAGE_PREFIX = config('CONTENT_STORAGE_PREFIX', default='cas')
+CONTENT_STORAGE_MAX_AGE = config('CONTENT_STORAGE_MAX_AGE', default=31536000, cast=int)
+
+# /media/ 与 TTS 音频下载：nginx 中对应 MEDIA_ROOT 的 internal location，为空时由 Django 发送文件
+MEDIA_ACCEL_REDIRECT_PREFIX = config('MEDIA_ACCEL_REDIRECT_PREFIX', default='')
+
 # OAuth2
 OAUTH2_CLIENT_ID = config('OAUTH2_CLIENT_ID', default='')
 OAUTH2_CLIENT_SECRET = config('OAUTH2_CLIENT_SECRET', default='')
@@ -108,6 +164,21 @@ OAUTH2_LOGOUT_URL = 'https://api.ecnu.edu.cn/user/logout'
 OAUTH2_USER_PHOTO_URL = 'https://api.ecnu.edu.cn/api/v1/user/photo'
 OAUTH2_FACE_COMPARE_URL = 'https://api.ecnu.edu.cn/api/v1/face/compare'
 
+# 出站 HTTP 连接池（OAuth2 / 人脸比对等上游接口，按 host 复用 keep-alive 连接）
+UPSTREAM_HTTP_POOL_SIZE = config('UPSTREAM_HTTP_POOL_SIZE', default=20, cast=int)
+UPSTREAM_HTTP_CONNECT_TIMEOUT = config('UPSTREAM_HTTP_CONNECT_TIMEOUT', default=3.0, cast=float)
+UPSTREAM_HTTP_READ_TIMEOUT = config('UPSTREAM_HTTP_READ_TIMEOUT', default=10.0, cast=float)
+UPSTREAM_HTTP_RETRIES = config('UPSTREAM_HTTP_RETRIES', default=2, cast=int)
+
+# 服务间调用 token（client credentials）缓存，过期前 REFRESH_MARGIN 秒刷新
+# 配置 SERVICE_TOKEN_CACHE_ALIAS（Django cache 别名）后多进程共享
+SERVICE_TOKEN_REFRESH_MARGIN = config('SERVICE_TOKEN_REFRESH_MARGIN', default=60, cast=int)
+SERVICE_TOKEN_CACHE_ALIAS = config('SERVICE_TOKEN_CACHE_ALIAS', default='')
+
+# worker 批量回调的共享 token，请求头 Authorization: Bearer <token> 或 X-Worker-Token: <token>
+# 未配置时批量回调接口拒绝所有请求
+WORKER_CALLBACK_TOKEN = config('WORKER_CALLBACK_TOKEN', default='')
+
 LOGIN_REDIRECT_URL = '/#/welcome'
 LOGOUT_REDIRECT_URL = '/login/'
 
@@ -120,12 +191,84 @@ REST_FRAMEWORK = {
 
 SESSION_COOKIE_AGE = 3600
 
-CSRF_TRUSTED_ORIGINS = config('CSRF_TRUSTED_ORIGINS', default='').split(',')
+# Django cache：配置 CACHE_REDIS_URL 时使用 Redis，多进程共享；否则为进程内缓存（LocMem），
+# 多 worker 部署下各进程的缓存互不可见，依赖失效的缓存（如资源目录）会自动停用
+CACHE_REDIS_URL = config('CACHE_REDIS_URL', default='')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# 会话存储：db（默认）/ cached_db / cache / signed_cookies
+# cached_db / cache 在多进程部署时需要共享缓存（如 Redis），否则退出登录只在当前进程生效；
+# signed_cookies 不访问数据库，但会话内容（含 oauth2_token）保存在 cookie 中
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + config('SESSION_BACKEND', default='db')
+SESSION_CACHE_ALIAS = config('SESSION_CACHE_ALIAS', default='default')
+
+# 登录用户进程内缓存时间（秒），0（默认）表示不缓存，每个请求查询 auth_user
+# 失效只在本进程内生效：多 worker 部署时，其他进程中停用 / 改密的用户最迟 TTL 秒后才失效
+USER_CACHE_TTL = config('USER_CACHE_TTL', default=0, cast=int)
+if USER_CACHE_TTL > 0:
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('django.contrib.auth.middleware.AuthenticationMiddleware') + 1,
+        'console_app.middleware.CachedUserMiddleware',
+    )
+
+CSRF_TRUSTED_ORIGINS = [o for o in config('CSRF_TRUSTED_ORIGINS', default='').split(',') if o]
 
 # CORS 配置
-CORS_ALLOWED_ORIGINS = config('CORS_ALLOWED_ORIGINS', default='').split(',')
+CORS_ALLOWED_ORIGINS = [o for o in config('CORS_ALLOWED_ORIGINS', default='').split(',') if o]
 CORS_ALLOW_CREDENTIALS = True
 
+# 用户头像缓存：locmem（进程内 LRU）/ filesystem（MEDIA_ROOT 下）/ django（Django cache）
+PORTRAIT_CACHE_BACKEND = config('PORTRAIT_CACHE_BACKEND', default='locmem')
+PORTRAIT_CACHE_ALIAS = config('PORTRAIT_CACHE_ALIAS', default='default')
+PORTRAIT_CACHE_TTL = config('PORTRAIT_CACHE_TTL', default=3600, cast=int)
+PORTRAIT_CACHE_MAX_BYTES = config('PORTRAIT_CACHE_MAX_BYTES', default=32 * 1024 * 1024, cast=int)
+
+# TTS 回调进度合并写入间隔（秒），0 表示每次回调立即写入；终态始终立即写入
+TTS_CALLBACK_COALESCE_INTERVAL = config('TTS_CALLBACK_COALESCE_INTERVAL', default=0, cast=float)
+
+# 资源目录（声音/头像/讲师列表）缓存；geminar-admin 的修改最迟 TTL 秒后可见
+# 多 worker（WEB_CONCURRENCY > 1）时 CATALOG_CACHE_ALIAS 须为共享缓存（CACHE_REDIS_URL），否则不缓存
+CATALOG_CACHE_ALIAS = config('CATALOG_CACHE_ALIAS', default='default')
+CATALOG_CACHE_TTL = config('CATALOG_CACHE_TTL', default=60, cast=int)
+
+# TTS 服务音色列表缓存时间（秒），过期后后台刷新
+TTS_VOICES_TTL = config('TTS_VOICES_TTL', default=300, cast=int)
+# 刷新失败后的重试间隔（秒），期间继续返回旧列表
+TTS_VOICES_RETRY_INTERVAL = config('TTS_VOICES_RETRY_INTERVAL', default=30, cast=int)
+
+# 微课进度 SSE：无事件时回查数据库的间隔、心跳间隔、单个连接最长持续时间（秒）
+SEMINAR_EVENTS_POLL_INTERVAL = config('SEMINAR_EVENTS_POLL_INTERVAL', default=5, cast=float)
+SEMINAR_EVENTS_KEEPALIVE = config('SEMINAR_EVENTS_KEEPALIVE', default=15, cast=float)
+SEMINAR_EVENTS_MAX_DURATION = config('SEMINAR_EVENTS_MAX_DURATION', default=600, cast=float)
+
+# 讲师照片上传后缩小到的长边像素，人脸比对与数字人形象共用
+SPEAKER_PORTRAIT_MAX_SIDE = config('SPEAKER_PORTRAIT_MAX_SIDE', default=1920, cast=int)
+
+# 缩略图（头像 / 讲师封面）：尺寸名:长边像素，格式 webp / jpeg
+THUMBNAIL_SIZES = {
+    label: int(size) for label, size in (
+        item.split(':') for item in config('THUMBNAIL_SIZES', default='small:160,medium:480').split(',') if item
+    )
+}
+THUMBNAIL_FORMAT = config('THUMBNAIL_FORMAT', default='webp')
+THUMBNAIL_QUALITY = config('THUMBNAIL_QUALITY', default=80, cast=int)
+# 缩略图缺失时是否在请求中按需生成（默认不生成：返回原图，由保存时的信号或 generate_thumbnails 补齐）
+THUMBNAIL_LAZY = config('THUMBNAIL_LAZY', default=False, cast=bool)
+# 缩略图状态（已生成 / 原图缺失）在 Django cache 中的记录时间（秒）
+THUMBNAIL_STATE_TTL = config('THUMBNAIL_STATE_TTL', default=86400, cast=int)
+
 # 是否启用人脸验证（创建讲师时验证上传照片是否为本人）
 FACE_VERIFY_ENABLED = config('FACE_VERIFY_ENABLED', default=True, cast=bool)
 
@@ -135,11 +278,51 @@ RABBITMQ_PORT = config('RABBITMQ_PORT', default=5672, cast=int)
 RABBITMQ_USER = config('RABBITMQ_USER', default='guest')
 RABBITMQ_PASSWORD = config('RABBITMQ_PASSWORD', default='guest')
 
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer"
+# Celery producer（每个 worker 进程共享一个 broker 连接池）
+CELERY_BROKER_POOL_LIMIT = config('CELERY_BROKER_POOL_LIMIT', default=4, cast=int)
+CELERY_BROKER_HEARTBEAT = config('CELERY_BROKER_HEARTBEAT', default=30, cast=int)
+CELERY_BROKER_CONNECTION_TIMEOUT = config('CELERY_BROKER_CONNECTION_TIMEOUT', default=4, cast=float)
+CELERY_PUBLISH_MAX_RETRIES = config('CELERY_PUBLISH_MAX_RETRIES', default=3, cast=int)
+CELERY_PUBLISH_RETRY_BACKOFF = config('CELERY_PUBLISH_RETRY_BACKOFF', default=0.2, cast=float)
+CELERY_PUBLISH_RETRY_BACKOFF_MAX = config('CELERY_PUBLISH_RETRY_BACKOFF_MAX', default=1.0, cast=float)
+
+# 事务性 outbox（由 manage.py relay_outbox 发送到 Celery）
+OUTBOX_RELAY_BATCH_SIZE = config('OUTBOX_RELAY_BATCH_SIZE', default=100, cast=int)
+OUTBOX_RELAY_INTERVAL = config('OUTBOX_RELAY_INTERVAL', default=0.5, cast=float)
+OUTBOX_MAX_ATTEMPTS = config('OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+OUTBOX_RETRY_BACKOFF = config('OUTBOX_RETRY_BACKOFF', default=2.0, cast=float)
+# relay 认领一批消息后，其他 relay 在此秒数内不会重复取到（relay 中途退出时到期后重新发送）
+OUTBOX_CLAIM_SECONDS = config('OUTBOX_CLAIM_SECONDS', default=60, cast=int)
+OUTBOX_RETENTION_SECONDS = config('OUTBOX_RETENTION_SECONDS', default=7 * 24 * 3600, cast=int)
+
+# 微课生成任务是否经 outbox 发送到 worker（关闭时由 geminar-admin 轮询处理）
+GENERATION_ORDER_DISPATCH_ENABLED = config('GENERATION_ORDER_DISPATCH_ENABLED', default=False, cast=bool)
+GENERATION_ORDER_TASK = config('GENERATION_ORDER_TASK', default='worker.tasks.handle_generation_order_created')
+
+# Channel layer（WebSocket 进度推送）
+# 多进程部署时需配置 CHANNEL_REDIS_URL，使用 Redis 在进程间转发消息；
+# 内存 channel layer 只在本进程内转发，其他 worker 上的连接收不到推送
+WEB_CONCURRENCY = config('WEB_CONCURRENCY', default=1, cast=int)
+CHANNEL_REDIS_URL = config('CHANNEL_REDIS_URL', default='')
+if WEB_CONCURRENCY > 1 and not CHANNEL_REDIS_URL:
+    raise ImproperlyConfigured('WEB_CONCURRENCY > 1 requires CHANNEL_REDIS_URL (Redis channel layer)')
+if CHANNEL_REDIS_URL:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {
+                "hosts": [CHANNEL_REDIS_URL],
+                "capacity": config('CHANNEL_LAYER_CAPACITY', default=1000, cast=int),
+                "expiry": 30,
+            },
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer"
+        }
     }
-}
 
 LOGGING = {
     'version': 1,
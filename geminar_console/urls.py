@@ -1,13 +1,28 @@
+import os
+
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from django.views.static import serve
+
+from console_app.storage import content_prefix, immutable_cache_control
 
 urlpatterns = [
     path('', include('console_app.urls')),
 ]
 
+
+def serve_content(request, path, document_root=None):
+    """内容寻址的文件内容不会改变，使用 immutable 长期缓存"""
+    response = serve(request, path, document_root)
+    response['Cache-Control'] = immutable_cache_control()
+    return response
+
+
 if settings.DEBUG:
+    urlpatterns += static(f"{settings.MEDIA_URL}{content_prefix()}/", serve_content,
+                          document_root=os.path.join(settings.MEDIA_ROOT, content_prefix()))
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 